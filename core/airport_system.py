@@ -4,41 +4,143 @@ import sqlite3
 from datetime import datetime, timedelta
 from math import sqrt
 import logging
+from core.spatial_index import KDTree
+from core.route_planner import RoutePlanner
+from core.departure_scheduler import DepartureScheduler
+from core.currency import CurrencySystem
+from core.ledger import posting
+from core.event_bus import EventBus, BotMoved
+
+# Bots far from home only queue for a flight above this balance (shared with the simulator)
+TRAVEL_MIN_BALANCE = 100
 
 class AirportSystem:
     def __init__(self, db_path='data/bot_world.db'):
         self.db_path = db_path
         self.airports = self.load_airports()
+        self.spatial_index = KDTree()
+        self._rebuild_spatial_index()
+        self.route_planner = RoutePlanner(self.airports, weight='fee')
+        self.scheduler = DepartureScheduler()
+        self.currency = CurrencySystem(db_path)
         self.logger = logging.getLogger('airport_system')
+        self.fee_cursor = 0         # last transactions id folded into airport revenue
+        self._restore_scheduler()
+
+    def _restore_scheduler(self):
+        """Rebuild departure waits, slots and today's revenue from the database"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""CREATE TABLE IF NOT EXISTS airport_waits (
+                airport_id INTEGER NOT NULL,
+                bot_id INTEGER NOT NULL,
+                enqueued_at REAL NOT NULL,
+                PRIMARY KEY (airport_id, bot_id)
+            )""")
+            conn.commit()
+
+            cursor.execute('SELECT airport_id, bot_id, enqueued_at FROM airport_waits')
+            since = {}
+            for airport_id, bot_id, enqueued_at in cursor.fetchall():
+                since.setdefault(airport_id, {})[bot_id] = enqueued_at
+
+            cursor.execute('SELECT id, home_x, home_y FROM bots')
+            homes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            urgency_inputs = self._load_urgency_inputs(cursor, homes)
+
+            cursor.execute('SELECT id, queue, last_departure FROM airports')
+            for airport_id, queue_json, last_departure in cursor.fetchall():
+                queue = json.loads(queue_json) if queue_json else []
+                departed = None
+                if last_departure:
+                    try:
+                        departed = datetime.fromisoformat(last_departure).timestamp()
+                    except ValueError:
+                        pass
+                self.scheduler.restore(airport_id, queue, since.get(airport_id, {}), departed, urgency_inputs)
+
+            self._fold_fees(cursor)
+        except sqlite3.Error as e:
+            self.logger.error(f"Departure state restore error: {e}")
+        finally:
+            conn.close()
+
+    def _save_waits(self, cursor):
+        """Persist every waiting bot's enqueue time so aging survives restarts"""
+        cursor.execute('DELETE FROM airport_waits')
+        cursor.executemany(
+            'INSERT INTO airport_waits (airport_id, bot_id, enqueued_at) VALUES (?, ?, ?)',
+            self.scheduler.waits()
+        )
+
+    def _fold_fees(self, cursor):
+        """Add airport fees and refunds posted since the last call (any process) to today's revenue"""
+        today = datetime.utcnow().date()
+        cursor.execute("""
+            SELECT id, amount, transaction_type, reason, timestamp FROM transactions
+            WHERE id > ? AND transaction_type IN ('fee', 'refund') AND status = 'completed'
+              AND reason LIKE 'airport_%'
+            ORDER BY id
+        """, (self.fee_cursor,))
+        for row_id, amount, transaction_type, reason, timestamp in cursor.fetchall():
+            self.fee_cursor = row_id
+            try:
+                airport_id = int(reason[len('airport_'):])
+                day = datetime.strptime(str(timestamp)[:10], '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            if day == today:
+                self.scheduler.record_fee(airport_id, amount if transaction_type == 'fee' else -amount, day)
 
     def process_departures(self):
-        """Process airport queues - move bots from queue to destination"""
+        """Process airport queues - move bots from queue toward their home airport"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         # Get all airports
-        cursor.execute('SELECT id, queue, capacity, destinations, fee FROM airports')
+        cursor.execute('SELECT id, queue, capacity, destinations, fee, x, y FROM airports')
         all_airports = cursor.fetchall()
+
+        queues = {row[0]: json.loads(row[1]) if row[1] else [] for row in all_airports}
+        coordinates = {row[0]: (row[5], row[6]) for row in all_airports}
+
+        cursor.execute('SELECT id, home_x, home_y FROM bots')
+        homes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        urgency_inputs = self._load_urgency_inputs(cursor, homes)
+        self._fold_fees(cursor)
+        connections = {}
+        flights = []                # (bot_id, event, event_type) published after commit
+        moves = []
+        refunds = []                # bots that paid a fee at the airport nearest their home
         
-        for airport_id, queue_json, capacity, dest_json, fee in all_airports:
-            queue = json.loads(queue_json) if queue_json else []
+        for airport_id, _, capacity, dest_json, fee, _, _ in all_airports:
+            queue = queues[airport_id]
             destinations = json.loads(dest_json) if dest_json else []
             
             if not queue or not destinations:
                 continue
+
+            # Fill this cycle's departure slots with the most urgent bots
+            self.scheduler.sync_queue(airport_id, queue, urgency_inputs)
+            departing = self.scheduler.next_departures(airport_id, capacity)
+            queue[:] = self.scheduler.boarding_order(airport_id)
             
-            # Process up to capacity
-            to_process = min(len(queue), capacity)
-            
-            for _ in range(to_process):
-                bot_id = queue.pop(0)
-                
-                # Select random destination
-                dest_id = random.choice(destinations)
+            for bot_id in departing:
+                home_airport_id = self._home_airport_id(homes.get(bot_id))
+                if home_airport_id == airport_id:
+                    # Already at the airport closest to home: no flight, give the fee back
+                    refunds.append(posting(None, bot_id, fee, "refund", f"airport_{airport_id}"))
+                    continue
+
+                dest_id = None
+                if home_airport_id is not None:
+                    dest_id = self.route_planner.next_hop(airport_id, home_airport_id)
+                if dest_id not in destinations:
+                    # No route home - fall back to a random destination
+                    dest_id = random.choice(destinations)
                 
-                # Get destination coordinates
-                cursor.execute('SELECT x, y FROM airports WHERE id = ?', (dest_id,))
-                dest = cursor.fetchone()
+                dest = coordinates.get(dest_id)
                 
                 if dest:
                     # Teleport bot
@@ -46,26 +148,101 @@ class AirportSystem:
                         'UPDATE bot_locations SET x = ?, y = ? WHERE bot_id = ?',
                         (dest[0], dest[1], bot_id)
                     )
+
+                    # Connecting flight: wait at the next airport for the following leg
+                    connecting = home_airport_id is not None and dest_id != home_airport_id \
+                        and self.route_planner.next_hop(dest_id, home_airport_id) is not None
+                    if connecting:
+                        connections.setdefault(dest_id, []).append(bot_id)
                     
                     # Log the flight
+                    leg_note = f" (connecting toward {home_airport_id})" if connecting else ""
+                    flight = f"Flew from airport {airport_id} to {dest_id} for ${fee}{leg_note}"
                     cursor.execute('''
                         INSERT INTO memory (bot_id, event_type, event)
                         VALUES (?, ?, ?)
-                    ''', (bot_id, 'airport_travel', 
-                        f"Flew from airport {airport_id} to {dest_id} for ${fee}"))
+                    ''', (bot_id, 'airport_travel', flight))
+                    flights.append((bot_id, flight, 'airport_travel'))
+                    origin = coordinates[airport_id]
+                    moves.append(BotMoved(bot_id, origin[0], origin[1], dest[0], dest[1],
+                                          'airport', 'airport', 'airport'))
                     
                     # Option B: Just print/log (simplest)
-                    print(f"Bot {bot_id} flew from airport {airport_id} to {dest_id}")
+                    print(f"Bot {bot_id} flew from airport {airport_id} to {dest_id}{leg_note}")
             
-            # Update queue in database
+            if not departing:
+                continue
+
+            # Update departure time in database
             cursor.execute(
-                'UPDATE airports SET queue = ?, last_departure = ? WHERE id = ?',
-                (json.dumps(queue), datetime.now().isoformat(), airport_id)
+                'UPDATE airports SET last_departure = ? WHERE id = ?',
+                (datetime.now().isoformat(), airport_id)
             )
+
+        # Connecting passengers board their next leg on the following cycle
+        for airport_id, bot_ids in connections.items():
+            for bot_id in bot_ids:
+                if bot_id not in queues[airport_id]:
+                    energy, distance_home = urgency_inputs.get(bot_id, (None, None))
+                    self.scheduler.enqueue(airport_id, bot_id, energy, distance_home)
+                    queues[airport_id].append(bot_id)
+
+        cursor.executemany(
+            'UPDATE airports SET queue = ? WHERE id = ?',
+            [(json.dumps(queue), airport_id) for airport_id, queue in queues.items()]
+        )
+        self._save_waits(cursor)
         
         conn.commit()
         conn.close()
+        if refunds:
+            self.currency.post_batch(refunds, all_or_nothing=False)
+        bus = EventBus.default()
+        bus.publish_memories(flights)
+        for event in moves:
+            bus.publish(event)
         return True
+
+    def _load_urgency_inputs(self, cursor, homes):
+        """Map bot_id -> (energy, distance_home) for departure priorities"""
+        cursor.execute("SELECT bot_id, value FROM needs WHERE need_name = 'energy'")
+        energies = dict(cursor.fetchall())
+
+        cursor.execute('SELECT bot_id, x, y FROM bot_locations')
+        inputs = {}
+        for bot_id, x, y in cursor.fetchall():
+            home = homes.get(bot_id)
+            distance_home = None
+            if home and None not in home and None not in (x, y):
+                distance_home = self.calculate_distance(x, y, home[0], home[1])
+            inputs[bot_id] = (energies.get(bot_id), distance_home)
+        return inputs
+
+    def _home_airport_id(self, home):
+        """Id of the airport nearest to a bot's home coordinates"""
+        if not home or None in home:
+            return None
+        nearest = self.spatial_index.nearest(home[0], home[1])
+        return nearest[0]['id'] if nearest else None
+
+    def plan_route_home(self, x, y, home_x, home_y):
+        """Plan a multi-leg itinerary from the airport nearest (x, y) to the one nearest home"""
+        start = self.spatial_index.nearest(x, y)
+        home_airport_id = self._home_airport_id((home_x, home_y))
+        if not start or home_airport_id is None:
+            return None
+
+        start_id = start[0]['id']
+        itinerary = self.route_planner.route(start_id, home_airport_id)
+        if itinerary is None:
+            return None
+
+        return {
+            'from_airport': start_id,
+            'to_airport': home_airport_id,
+            'legs': list(zip(itinerary, itinerary[1:])),
+            'cost': self.route_planner.route_cost(start_id, home_airport_id)
+        }
     
     def add_airport_connection(self, airport1_id, airport2_id):
         """Add bidirectional connection between airports"""
@@ -91,6 +268,13 @@ class AirportSystem:
         conn.commit()
         conn.close()
 
+        # Update cache
+        for airport in self.airports:
+            for airport_id, other_id in [(airport1_id, airport2_id), (airport2_id, airport1_id)]:
+                if airport['id'] == airport_id and other_id not in airport['destinations']:
+                    airport['destinations'].append(other_id)
+        self.route_planner.invalidate()
+
     def load_airports(self):
         """Load all airports from database"""
         conn = sqlite3.connect(self.db_path)
@@ -116,6 +300,12 @@ class AirportSystem:
         
         conn.close()
         return airports
+
+    def _rebuild_spatial_index(self):
+        """Rebuild the k-d tree over cached airport coordinates"""
+        self.spatial_index.rebuild(
+            (airport['x'], airport['y'], airport) for airport in self.airports
+        )
     
     def calculate_distance(self, x1, y1, x2, y2):
         """Calculate Euclidean distance between two points"""
@@ -123,16 +313,15 @@ class AirportSystem:
     
     def find_nearest_airport(self, x, y, max_distance=20):
         """Find the nearest airport within max_distance"""
-        nearest = None
-        min_dist = float('inf')
-        
-        for airport in self.airports:
-            dist = self.calculate_distance(x, y, airport['x'], airport['y'])
-            if dist < min_dist and dist <= max_distance:
-                min_dist = dist
-                nearest = airport
-        
-        return nearest
+        result = self.spatial_index.nearest(x, y, max_distance)
+        return result[0] if result else None
+
+    def find_nearest_airports(self, positions, max_distance=None):
+        """Find the nearest airport for many (x, y) positions in one call
+
+        Returns a list aligned with positions of (airport, distance) or None.
+        """
+        return self.spatial_index.nearest_many(positions, max_distance)
     
     def bot_wants_to_go_home(self, bot, home_x, home_y):
         """Check if bot needs to go home and can afford airport"""
@@ -182,6 +371,8 @@ class AirportSystem:
                 'UPDATE airports SET queue = ? WHERE id = ?',
                 (json.dumps(queue), airport_id)
             )
+        self.scheduler.enqueue(airport_id, bot_id)
+        self._save_waits(cursor)
         
         conn.commit()
         conn.close()
@@ -285,6 +476,8 @@ class AirportSystem:
             'destinations': [],
             'queue': []
         })
+        self._rebuild_spatial_index()
+        self.route_planner.invalidate()
         
         return airport_id
     
@@ -314,6 +507,7 @@ class AirportSystem:
                 if destination_id not in airport['destinations']:
                     airport['destinations'].append(destination_id)
                 break
+        self.route_planner.invalidate()
     
     def get_airport_stats(self, airport_id):
         """Get statistics for an airport"""
@@ -327,13 +521,13 @@ class AirportSystem:
                     'capacity': airport['capacity'],
                     'queue_length': len(airport['queue']),
                     'destinations': len(airport['destinations']),
-                    'revenue_today': 0  # You could track this
+                    **self.scheduler.get_stats(airport_id)
                 }
         return None
     
     def auto_assign_bots_to_airports(self):
         """Automatically add bots to airports if they need to go home urgently"""
-        conn = sqlite3.connect('data/bot_world.db')
+        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             # Get bots far from home with money
@@ -342,39 +536,76 @@ class AirportSystem:
                 FROM bots 
                 LEFT JOIN bot_locations bl ON bots.id = bl.bot_id
                 LEFT JOIN bot_currency c ON bots.id = c.bot_id
-                WHERE c.balance > 100 OR c.balance IS NULL
-            ''')
+                WHERE c.balance > ? OR c.balance IS NULL
+            ''', (TRAVEL_MIN_BALANCE,))
             
+            candidates = []
             for bot_id, x, y, home_x, home_y, balance in cursor.fetchall():
+                if None in (x, y, home_x, home_y) or balance is None:
+                    continue
+
                 # Calculate distance to home
                 distance = ((home_x - x) ** 2 + (home_y - y) ** 2) ** 0.5
                 
-                if distance > 40 and balance > 100:  # Far from home
-                    # Find nearest airport
-                    cursor.execute('''
-                        SELECT id, fee, (ABS(x - ?) + ABS(y - ?)) as dist
-                        FROM airports 
-                        ORDER BY dist LIMIT 1
-                    ''', (x, y))
-                    
-                    nearest = cursor.fetchone()
-                    if nearest and balance >= nearest[1]:
-                        # Add to queue
-                        airport_id, fee, dist = nearest
-                        cursor.execute('SELECT queue FROM airports WHERE id = ?', (airport_id,))
-                        queue_json = cursor.fetchone()[0]
-                        queue = json.loads(queue_json) if queue_json else []
-                        
-                        if bot_id not in queue:
-                            queue.append(bot_id)
-                            cursor.execute(
-                                'UPDATE airports SET queue = ? WHERE id = ?',
-                                (json.dumps(queue), airport_id)
-                            )
-                            cursor.execute(
-                                'UPDATE bot_currency SET balance = balance - ? WHERE bot_id = ?',
-                                (fee, bot_id)
-                            )
+                if distance > 40 and balance > TRAVEL_MIN_BALANCE:  # Far from home
+                    candidates.append((bot_id, x, y, balance, distance, self._home_airport_id((home_x, home_y))))
+
+            if not candidates:
+                conn.close()
+                return
+
+            # Find nearest airports for every candidate in one batched lookup
+            nearest_airports = self.find_nearest_airports(
+                [(x, y) for _, x, y, _, _, _ in candidates]
+            )
+
+            cursor.execute("SELECT bot_id, value FROM needs WHERE need_name = 'energy'")
+            energies = dict(cursor.fetchall())
+
+            cursor.execute('SELECT id, queue FROM airports')
+            queues = {
+                airport_id: json.loads(queue_json) if queue_json else []
+                for airport_id, queue_json in cursor.fetchall()
+            }
+            changed_queues = set()
+            boarding = []
+
+            for (bot_id, x, y, balance, distance, home_airport_id), nearest in zip(candidates, nearest_airports):
+                if not nearest:
+                    continue
+
+                airport = nearest[0]
+                airport_id, fee = airport['id'], airport['fee']
+                if airport_id == home_airport_id:
+                    continue  # A flight from here cannot bring it closer to home
+                queue = queues.get(airport_id)
+
+                if queue is not None and balance >= fee and bot_id not in queue:
+                    boarding.append((airport_id, bot_id, fee, energies.get(bot_id), distance))
+
+            # Charge every airport fee through the ledger in one batch
+            charged = self.currency.post_batch([
+                posting(bot_id, None, fee, "fee", f"airport_{airport_id}", floor=0.0)
+                for airport_id, bot_id, fee, _, _ in boarding
+            ], all_or_nothing=False)
+            boarded = [entry for entry, ok in zip(boarding, charged) if ok]
+
+            for airport_id, bot_id, _, _, _ in boarded:
+                # Add to queue
+                queues[airport_id].append(bot_id)
+                changed_queues.add(airport_id)
+
+            for airport_id in changed_queues:
+                cursor.execute(
+                    'UPDATE airports SET queue = ? WHERE id = ?',
+                    (json.dumps(queues[airport_id]), airport_id)
+                )
+
+            # Fees reach today's revenue from the ledger, like the dashboard's
+            for airport_id, bot_id, fee, energy, distance in boarded:
+                self.scheduler.enqueue(airport_id, bot_id, energy, distance)
+            self._save_waits(cursor)
+            self._fold_fees(cursor)
             
             conn.commit()
             conn.close()
@@ -382,4 +613,4 @@ class AirportSystem:
             conn.close()
             self.logger.error(f"auto_assign_bots_to_airports error: {e}")
             import traceback
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
@@ -3,14 +3,26 @@ import random
 from datetime import datetime
 from core.currency import CurrencySystem
 from core.language_system import LanguageSystem
+from core.response_engine import ResponseEngine
+from core.fact_store import FactStore
+from core.event_bus import EventBus, FactLearned
+from core.bot_state import TraitVector, PERSONALITY_ARENA, NEEDS_ARENA
 
 class PrehistoricBotDB:
+    # Fixed attributes: no per-bot __dict__; personality and needs are slots in shared arrays
+    __slots__ = ('bot_id', 'db_file', 'facts', 'name', 'fullname', 'species',
+                 'home_x', 'home_y', 'last_seen_home', 'personality', 'needs', '_saved_needs',
+                 'energy', 'currency', 'language', 'responses', 'events', '_last_status', '__weakref__')
+
     def __init__(self, bot_id, db_file='data/bot_world.db'):
         self.bot_id = bot_id
         self.db_file = db_file
+        self.facts = FactStore.for_database(db_file)
         self.load_bot_data()
-        self.currency = CurrencySystem(db_file)
-        self.language = LanguageSystem(db_file)
+        self.currency = CurrencySystem.for_database(db_file)
+        self.language = LanguageSystem.for_database(db_file)
+        self.responses = ResponseEngine.default()
+        self.events = EventBus.default()
     
     def load_bot_data(self):
         """Load bot data from database"""
@@ -24,11 +36,12 @@ class PrehistoricBotDB:
         
         # Load personality
         cursor.execute('SELECT trait_name, value FROM personality WHERE bot_id = ?', (self.bot_id,))
-        self.personality = {row[0]: row[1] for row in cursor.fetchall()}
+        self.personality = TraitVector(PERSONALITY_ARENA, {row[0]: row[1] for row in cursor.fetchall()})
         
         # Load needs
         cursor.execute('SELECT need_name, value FROM needs WHERE bot_id = ?', (self.bot_id,))
-        self.needs = {row[0]: row[1] for row in cursor.fetchall()}
+        self.needs = TraitVector(NEEDS_ARENA, {row[0]: row[1] for row in cursor.fetchall()})
+        self._saved_needs = dict(self.needs)
 
         # Load energy
         cursor.execute('SELECT value FROM needs WHERE need_name = "energy" AND bot_id = ?', (self.bot_id,))
@@ -40,7 +53,10 @@ class PrehistoricBotDB:
         """Get all knowledge facts for this bot"""
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
-        cursor.execute('SELECT fact FROM knowledge WHERE bot_id = ?', (self.bot_id,))
+        cursor.execute('''
+            SELECT f.text FROM knowledge k JOIN facts f ON f.id = k.fact_id
+            WHERE k.bot_id = ? ORDER BY k.id
+        ''', (self.bot_id,))
         facts = [row[0] for row in cursor.fetchall()]
         conn.close()
         return facts
@@ -61,6 +77,7 @@ class PrehistoricBotDB:
         ''', (self.bot_id, f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {event}", event_type))
         conn.commit()
         conn.close()
+        self.events.remember(self.bot_id, event_type, event)
     
     def _update_needs(self):
         """Update needs in the database"""
@@ -73,6 +90,7 @@ class PrehistoricBotDB:
             ''', (value, self.bot_id, need))
         conn.commit()
         conn.close()
+        self._saved_needs = dict(self.needs)
     
     def _update_need(self, need_name, new_value):
         """Update a single need"""
@@ -85,6 +103,23 @@ class PrehistoricBotDB:
         ''', (self.needs[need_name], self.bot_id, need_name))
         conn.commit()
         conn.close()
+        self._saved_needs[need_name] = self.needs[need_name]
+    
+    def save_state(self):
+        """Write needs changed in memory since they were last saved (before the bot is unloaded)"""
+        changed = {need: value for need, value in self.needs.items() if self._saved_needs.get(need) != value}
+        if not changed:
+            return 0
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE needs SET value = ?, last_updated = CURRENT_TIMESTAMP
+            WHERE bot_id = ? AND need_name = ?
+        ''', [(value, self.bot_id, need) for need, value in changed.items()])
+        conn.commit()
+        conn.close()
+        self._saved_needs.update(changed)
+        return len(changed)
     
     def _update_needs_after_interaction(self):
         """Update needs after an interaction - CONSUME energy, GAIN social"""
@@ -99,31 +134,37 @@ class PrehistoricBotDB:
 
     def add_knowledge(self, fact, source='creator'):
         """Add new knowledge to the bot"""
-        # Check if fact already exists
-        existing_knowledge = self.get_knowledge()
-        if fact in existing_knowledge:
-            return False  # Already known
+        fact_id = self.facts.intern(fact)
         
+        # (bot_id, fact_id) is unique: an already known fact inserts nothing
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO knowledge (bot_id, fact, source)
+            INSERT OR IGNORE INTO knowledge (bot_id, fact_id, source)
             VALUES (?, ?, ?)
-        ''', (self.bot_id, fact, source))
+        ''', (self.bot_id, fact_id, source))
+        added = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if not added:
+            return False  # Already known
+        self.events.publish(FactLearned(self.bot_id, fact_id, source))
         
         self._add_to_memory(f"Learned new fact from {source}: {fact}", 'learning')
         return True
     
     def remove_knowledge(self, fact):
         """Remove knowledge from the bot"""
+        fact_id = self.facts.lookup(fact)
+        if fact_id is None:
+            return False
+        
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         cursor.execute('''
             DELETE FROM knowledge 
-            WHERE bot_id = ? AND fact = ?
-        ''', (self.bot_id, fact))
+            WHERE bot_id = ? AND fact_id = ?
+        ''', (self.bot_id, fact_id))
         deleted = cursor.rowcount > 0
         conn.commit()
         conn.close()
@@ -134,166 +175,12 @@ class PrehistoricBotDB:
         return deleted
     
     def process_input(self, input_text, speaker="Human"):
-        response = ""
-        input_text_lower = input_text.lower()
-        original_input = input_text
-        
-        # Store who's speaking
-        self._add_to_memory(f"{speaker} said: '{original_input}'")
-        
-        # Update needs after any interaction
-        self._update_need('social', self.needs['social'] + 5)
-        self._update_need('energy', self.needs['energy'] - 2)
-        
-        # SPECIAL CREATOR COMMANDS
-        if speaker == "Human":
-            if input_text_lower.startswith(("remember that ", "learn that ")):
-                if input_text_lower.startswith("remember that "):
-                    new_fact = original_input[14:].strip()
-                else:
-                    new_fact = original_input[11:].strip()
-                
-                if new_fact:
-                    if self.add_knowledge(new_fact):
-                        response = f"Thank you! I've learned: \"{new_fact}\""
-                    else:
-                        response = "I already know that!"
-                else:
-                    response = "Please tell me what to remember."
-                # 🆕 UPDATE NEEDS AFTER RESPONSE
-                self._update_needs_after_interaction()
-                return response
-            
-            elif input_text_lower.startswith("forget that "):
-                fact_to_forget = original_input[12:].strip()
-                if self.remove_knowledge(fact_to_forget):
-                    response = f"I've forgotten: \"{fact_to_forget}\""
-                else:
-                    response = "I couldn't find that fact in my knowledge."
-                # 🆕 UPDATE NEEDS AFTER RESPONSE
-                self._update_needs_after_interaction()
-                return response
-            
-            elif input_text_lower in ["what do you know", "show your knowledge", "list knowledge"]:
-                knowledge = self.get_knowledge()
-                if knowledge:
-                    knowledge_list = "\n".join([f"- {fact}" for fact in knowledge])
-                    response = f"I know {len(knowledge)} things:\n{knowledge_list}"
-                else:
-                    response = "My knowledge base is empty. Please teach me something!"
-                # 🆕 UPDATE NEEDS AFTER RESPONSE
-                self._update_needs_after_interaction()
-                return response
-        
-        # 🛡️ **MICMAC GUARDIAN FEATURES** - Only for Micmac
-        if self.name.lower() == "micmac":
-            database_keywords = [
-                'database status', 'database report', 'how is the database',
-                'system status', 'health report', 'guardian report',
-                'any issues', 'problems', 'alerts', 'monitoring',
-                'status report', 'how are systems'
-            ]
-            
-            # Check if this is a database-related question for Micmac
-            is_database_query = any(keyword in input_text_lower for keyword in database_keywords)
-            
-            if is_database_query:
-                # Import and use the DatabaseGuardian
-                from database_guardian import DatabaseGuardian
-                guardian = DatabaseGuardian()
-                report = guardian.generate_guardian_report()
-                
-                # Convert technical report to roleplayed response
-                if report['overall_status'] == 'CRITICAL':
-                    urgency = "🚨 **CRITICAL ALERT** 🚨"
-                    tone = "I must report critical issues that require immediate attention!"
-                elif report['overall_status'] == 'WARNING':
-                    urgency = "⚠️ **WARNING** ⚠️"
-                    tone = "I'm detecting some concerning patterns that need monitoring."
-                else:
-                    urgency = "✅ **SYSTEM NOMINAL** ✅"
-                    tone = "All systems are operating within normal parameters."
-                
-                db_size = report['details']['database_size']
-                memory_usage = report['details']['memory_usage']
-                
-                response = f"{urgency}\n"
-                response += f"{tone}\n\n"
-                response += f"**Database Status Report**\n"
-                response += f"• 📊 Database Size: {db_size['size_mb']}MB\n"
-                response += f"• 🧠 Total Memories: {memory_usage['total_memories']}\n"
-                response += f"• 🤖 Active Bots: {len(report['details']['bot_stats'])}\n"
-                response += f"• ⏰ Last Check: {report['timestamp']}\n"
-                
-                if report['alerts']:
-                    response += f"\n**Alerts:**\n"
-                    for alert in report['alerts']:
-                        response += f"• {alert}\n"
-                
-                self._add_to_memory(f"Generated database status report")
-                # 🆕 UPDATE NEEDS AFTER RESPONSE
-                self._update_needs_after_interaction()
-                return response
-        
-        # REGULAR CONVERSATION LOGIC (only reached if no guardian response)
-        knowledge = self.get_knowledge()
-        
-        if "hello" in input_text_lower or "hi" in input_text_lower:
-            if self.name.lower() == "micmac":
-                response = f"Greetings {speaker}. I am {self.name}, Database Guardian. How may I assist?"
-            else:
-                mood_modifier = self.get_personality_modifier('neuroticism')
-                if mood_modifier > 0.3:
-                    response = "Oh... hello. What do you want?"
-                else:
-                    response = f"Hello {speaker}! It's good to hear from you."
-        
-        elif "purpose" in input_text_lower or "role" in input_text_lower:
-            if self.name.lower() == "micmac":
-                response = "I am the Database Guardian. My duty is to monitor system integrity, protect all digital entities, and alert when issues arise."
-            else:
-                response = f"My name is {self.fullname or self.name}. I am a {self.species}."
-        
-        # REGULAR CONVERSATION LOGIC
-        knowledge = self.get_knowledge()  # Get fresh knowledge from DB
-        
-        if "hello" in input_text_lower or "hi" in input_text_lower:
-            mood_modifier = self.get_personality_modifier('neuroticism')
-            if mood_modifier > 0.3:
-                response = "Oh... hello. What do you want?"
-            else:
-                response = f"Hello {speaker}! It's good to hear from you."
-        
-        elif "how are you" in input_text_lower:
-            avg_need = sum(self.needs.values()) / len(self.needs)
-            if avg_need > 70:
-                response = "I'm functioning within optimal parameters."
-            else:
-                response = "My systems are feeling a bit depleted..."
-        
-        elif "what is" in input_text_lower:
-            topic = input_text_lower.replace("what is", "").strip()
-            response = f"I don't know anything about {topic}."
-            for fact in knowledge:
-                if topic in fact.lower():
-                    response = fact
-                    break
-        
-        elif "introduce yourself" in input_text_lower:
-            response = f"My name is {self.fullname or self.name}. I am a {self.species}."
-        
-        else:
-            default_responses = ["I see.", "Can you elaborate?", "My databases are unclear on that."]
-            response = random.choice(default_responses)
-        
-        self._add_to_memory(f"I replied: '{response}'")
-        # 🆕 UPDATE NEEDS AFTER RESPONSE
-        self._update_needs_after_interaction()
-        return response
+        """Answer an input through the shared response engine (one commit per turn)"""
+        return self.responses.respond(self, input_text, speaker)
 
     def bots_interact(self, bot1_id, bot2_id, location):
         """Two bots have an interaction/conversation"""
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
         # Create conversation record
@@ -303,39 +190,20 @@ class PrehistoricBotDB:
         ''', (bot1_id, bot2_id, location[0], location[1]))
         conversation_id = cursor.lastrowid
         
-        # Generate conversation
-        messages = []
-        
-        # Bot1 speaks first
+        # Generate the whole conversation in one batch
+        # Bot1 speaks first, bot2 responds, possible third exchange (50% chance)
         context = {'interaction_type': 'greeting', 'other_bot_id': bot2_id}
-        message1 = self.language.generate_sentence(bot1_id, context)
-        
-        cursor.execute('''
-            INSERT INTO conversation_messages (conversation_id, bot_id, message)
-            VALUES (?, ?, ?)
-        ''', (conversation_id, bot1_id, message1))
-        messages.append(message1)
-        
-        # Bot2 responds
-        context['responding_to'] = message1
-        message2 = self.language.generate_sentence(bot2_id, context)
-        
-        cursor.execute('''
+        batch = [(bot1_id, context), (bot2_id, dict(context))]
+        if random.random() > 0.5:
+            # The closing line is free-form chat rather than another greeting
+            batch.append((bot1_id, {'interaction_type': 'chat', 'other_bot_id': bot2_id, 'final_exchange': True}))
+
+        messages = self.language.generate_sentences(batch)
+
+        cursor.executemany('''
             INSERT INTO conversation_messages (conversation_id, bot_id, message)
             VALUES (?, ?, ?)
-        ''', (conversation_id, bot2_id, message2))
-        messages.append(message2)
-        
-        # Possible third exchange (50% chance)
-        if random.random() > 0.5:
-            context['final_exchange'] = True
-            message3 = self.language.generate_sentence(bot1_id, context)
-            
-            cursor.execute('''
-                INSERT INTO conversation_messages (conversation_id, bot_id, message)
-                VALUES (?, ?, ?)
-            ''', (conversation_id, bot1_id, message3))
-            messages.append(message3)
+        ''', [(conversation_id, bot_id, message) for (bot_id, _), message in zip(batch, messages)])
         
         conn.commit()
         conn.close()
@@ -355,4 +223,5 @@ if __name__ == "__main__":
     # Test conversation
     response = bot.process_input("Hello")
     print(f"\nSamirah: {response}")
-    print(f"Energy after interaction: {bot.needs.get('energy', 'N/A')}")
\ No newline at end of file
+    print(f"Energy after interaction: {bot.needs.get('energy', 'N/A')}")
+    print(f"Response engine: {bot.responses.get_stats()}")
@@ -0,0 +1,134 @@
+"""
+Bot pool for BotFarm
+Lazy bot proxies and a bounded LRU of loaded PrehistoricBotDB objects
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from core.bot_engine_db import PrehistoricBotDB
+
+# Kept on the proxy itself, so reading them never loads the bot
+PROXY_FIELDS = ('bot_id', 'name', 'db_file', 'home_x', 'home_y', 'last_seen_home')
+
+
+class LazyBot:
+    """Stands in for a PrehistoricBotDB and loads it on first use
+
+    Id, name and home fields are known without loading; any other
+    attribute goes to the pooled bot, which is loaded again after an
+    eviction. Managers hand out proxies, so identity stays stable.
+    """
+
+    def __init__(self, pool, bot_id, name, home_x=None, home_y=None, last_seen_home=None):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, 'bot_id', bot_id)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'db_file', pool.db_file)
+        object.__setattr__(self, 'home_x', home_x)
+        object.__setattr__(self, 'home_y', home_y)
+        object.__setattr__(self, 'last_seen_home', last_seen_home)
+
+    @property
+    def bot(self) -> PrehistoricBotDB:
+        return self._pool.hydrate(self.bot_id)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._pool.peek(self.bot_id) is not None
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy does not hold itself
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self._pool.hydrate(self.bot_id), attr)
+
+    def __setattr__(self, attr, value):
+        if attr in PROXY_FIELDS:
+            object.__setattr__(self, attr, value)
+            loaded = self._pool.peek(self.bot_id)
+            if loaded is not None:
+                setattr(loaded, attr, value)
+        else:
+            setattr(self._pool.hydrate(self.bot_id), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "unloaded"
+        return f"<LazyBot {self.bot_id} {self.name} ({state})>"
+
+
+class BotPool:
+    """At most capacity bots loaded at once, least recently used unloaded first
+
+    An evicted bot writes its unsaved needs back before it is dropped.
+    Capacity should cover the bots that act in one cycle: a pass over more
+    bots than that reloads and evicts every one of them, which is why the
+    server walks ConversationManagerDB.active (bots taking turns) rather
+    than every registered bot.
+    """
+
+    def __init__(self, db_file='data/bot_world.db', capacity=128):
+        self.db_file = db_file
+        self.capacity = capacity
+        self.loaded = OrderedDict()     # bot_id -> PrehistoricBotDB, least recently used first
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.logger = logging.getLogger('bot_pool')
+
+    def hydrate(self, bot_id) -> PrehistoricBotDB:
+        with self.lock:
+            bot = self.loaded.get(bot_id)
+            if bot is not None:
+                self.loaded.move_to_end(bot_id)
+                self.hits += 1
+                return bot
+
+            bot = PrehistoricBotDB(bot_id, self.db_file)
+            self.loaded[bot_id] = bot
+            self.loads += 1
+            while len(self.loaded) > self.capacity:
+                self._evict_oldest()
+            return bot
+
+    def peek(self, bot_id):
+        """The loaded bot, without loading it or touching its recency"""
+        return self.loaded.get(bot_id)
+
+    def _evict_oldest(self):
+        bot_id, bot = self.loaded.popitem(last=False)
+        self._save(bot)
+        self.evictions += 1
+
+    def evict(self, bot_id) -> bool:
+        with self.lock:
+            bot = self.loaded.pop(bot_id, None)
+            if bot is None:
+                return False
+            self._save(bot)
+            self.evictions += 1
+            return True
+
+    def _save(self, bot):
+        try:
+            bot.save_state()
+        except Exception as e:
+            self.logger.error(f"❌ Saving bot {bot.bot_id} before unloading failed: {e}")
+
+    def flush(self) -> int:
+        """Write the unsaved state of every loaded bot"""
+        with self.lock:
+            bots = list(self.loaded.values())
+        return sum(bot.save_state() for bot in bots)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'loaded': len(self.loaded),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
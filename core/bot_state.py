@@ -0,0 +1,147 @@
+"""
+Bot state for BotFarm
+Personality traits and needs of every bot as columns of shared arrays, with dict-style access per bot
+"""
+
+import threading
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Optional
+
+TRAITS = ('openness', 'conscientiousness', 'extraversion', 'agreeableness', 'neuroticism',
+          'empathy', 'ambition', 'curiosity', 'generosity', 'risk_taking')
+NEEDS = ('energy', 'social', 'curiosity')
+
+# Marks a field a bot does not have (so .get() still falls back to its default)
+MISSING = float('nan')
+
+
+class StateArena:
+    """One array('d') column per field, one slot (row) per bot
+
+    A column holds that field for every bot, so formulas can run over all
+    bots at once; freed slots are reused by the next bot loaded.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        self.columns = [array('d') for _ in self.fields]
+        self.free = []
+        self.lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self.lock:
+            if self.free:
+                slot = self.free.pop()
+                for column in self.columns:
+                    column[slot] = MISSING
+                return slot
+            for column in self.columns:
+                column.append(MISSING)
+            return len(self.columns[0]) - 1
+
+    def release(self, slot: int):
+        with self.lock:
+            for column in self.columns:
+                column[slot] = MISSING
+            self.free.append(slot)
+
+    def column(self, name: str) -> array:
+        """Values of one field indexed by slot (NaN where unset or free)"""
+        return self.columns[self.index[name]]
+
+    def values(self, name: str, slots: Iterable[int]) -> Dict[int, float]:
+        """slot -> value of one field for the given slots, skipping unset ones"""
+        column = self.column(name)
+        return {slot: column[slot] for slot in slots if column[slot] == column[slot]}
+
+    def get_stats(self):
+        with self.lock:
+            size = len(self.columns[0]) if self.columns else 0
+            return {'fields': len(self.fields), 'slots': size, 'free': len(self.free),
+                    'bytes': size * len(self.fields) * 8}
+
+
+PERSONALITY_ARENA = StateArena(TRAITS)
+NEEDS_ARENA = StateArena(NEEDS)
+
+
+class TraitVector(MutableMapping):
+    """Dict-like view of one bot's slot in an arena
+
+    Known fields live in the arena columns; any other name (a trait added
+    by a later migration) goes to a small per-bot dict created on demand.
+    """
+
+    __slots__ = ('arena', 'slot', 'extra')
+
+    def __init__(self, arena: StateArena, values: Optional[Dict[str, float]] = None):
+        self.arena = arena
+        self.slot = arena.allocate()
+        self.extra = None
+        if values:
+            for name, value in values.items():
+                self[name] = value
+
+    def __del__(self):
+        try:
+            self.arena.release(self.slot)
+        except Exception:
+            pass
+
+    def get(self, name, default=None):
+        i = self.arena.index.get(name)
+        if i is None:
+            return self.extra.get(name, default) if self.extra else default
+        value = self.arena.columns[i][self.slot]
+        return default if value != value else value
+
+    def __getitem__(self, name):
+        i = self.arena.index.get(name)
+        if i is None:
+            if self.extra and name in self.extra:
+                return self.extra[name]
+            raise KeyError(name)
+        value = self.arena.columns[i][self.slot]
+        if value != value:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        i = self.arena.index.get(name)
+        if i is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+        else:
+            self.arena.columns[i][self.slot] = MISSING if value is None else value
+
+    def __delitem__(self, name):
+        i = self.arena.index.get(name)
+        if i is None:
+            if not self.extra or name not in self.extra:
+                raise KeyError(name)
+            del self.extra[name]
+        else:
+            if self.arena.columns[i][self.slot] != self.arena.columns[i][self.slot]:
+                raise KeyError(name)
+            self.arena.columns[i][self.slot] = MISSING
+
+    def __contains__(self, name):
+        return self.get(name, MISSING) is not MISSING
+
+    def __iter__(self):
+        slot = self.slot
+        for name, i in self.arena.index.items():
+            value = self.arena.columns[i][slot]
+            if value == value:
+                yield name
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,132 @@
+"""
+Conversation engine for BotFarm
+Group conversations advanced as coroutines on a clock instead of sleeping per turn
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import List, Dict, Optional
+
+from core.response_engine import WriteBatch
+
+OPENER = "Hello everyone! How are you all doing today?"
+
+
+class Conversation:
+    """One group talking (keyed by location or group name) and what has been said so far"""
+
+    def __init__(self, key, bots: List, rounds: int, opener: str, starter):
+        self.key = key
+        self.bots = bots
+        self.rounds = rounds
+        self.opener = opener
+        self.starter = starter
+        self.transcript = []      # (round, bot name, message, clock time); the opener is round 0
+        self.done = False
+
+
+class ConversationEngine:
+    """Schedules many conversations and resumes each one when its next speaker is ready
+
+    Every conversation is a generator that yields the thinking delay
+    before its next turn. In simulated mode (the default) advance() moves a
+    virtual clock straight to the next due turn, so nothing ever sleeps; in
+    realtime mode it only runs the turns already due by the wall clock and
+    leaves the rest for a later call. All replies of one advance() are
+    committed in a single transaction.
+    """
+
+    def __init__(self, db_file='data/bot_world.db', realtime: bool = False,
+                 thinking_delay=(0.5, 1.5), rng: Optional[random.Random] = None):
+        self.db_file = db_file
+        self.realtime = realtime
+        self.thinking_delay = thinking_delay
+        self.rng = rng or random.Random()
+        self.clock = time.time()
+        self.queue = []               # (ready_at, seq, conversation, coroutine)
+        self.active = {}              # key -> Conversation
+        self.batch = None             # writes of the advance() in progress
+        self._seq = itertools.count()
+        self.logger = logging.getLogger('conversation_engine')
+
+    def now(self) -> float:
+        return time.time() if self.realtime else self.clock
+
+    def start(self, bots: List, rounds: int = 3, key='group', opener: str = OPENER,
+              starter=None) -> Optional[Conversation]:
+        """Open a conversation unless this key already has one running"""
+        if len(bots) < 2:
+            self.logger.info("💬 Need at least 2 bots for a group conversation")
+            return None
+        if key in self.active:
+            return None
+
+        conversation = Conversation(key, list(bots), rounds, opener, starter or self.rng.choice(bots))
+        conversation.transcript.append((0, conversation.starter.name, opener, self.now()))
+        self.active[key] = conversation
+        self._schedule(conversation, self._dialogue(conversation), self.now())
+        return conversation
+
+    def _schedule(self, conversation: Conversation, coroutine, ready_at: float):
+        heapq.heappush(self.queue, (ready_at, next(self._seq), conversation, coroutine))
+
+    def _dialogue(self, conversation: Conversation):
+        """Every bot but the last speaker answers the previous line, each round"""
+        last_message = conversation.opener
+        last_speaker = conversation.starter
+
+        for round_num in range(1, conversation.rounds + 1):
+            for bot in conversation.bots:
+                if bot is last_speaker:
+                    continue
+                yield self.rng.uniform(*self.thinking_delay)
+
+                response = bot.responses.respond(bot, last_message, speaker=last_speaker.name.title(),
+                                                 batch=self.batch)
+                conversation.transcript.append((round_num, bot.name, response, self.now()))
+                last_message = response
+                last_speaker = bot
+
+    def advance(self, until: Optional[float] = None) -> List[Conversation]:
+        """Run every due turn and commit their writes; returns conversations that finished"""
+        if self.realtime and until is None:
+            until = time.time()
+        self.batch = WriteBatch(self.db_file)
+        finished = []
+
+        try:
+            while self.queue and (until is None or self.queue[0][0] <= until):
+                ready_at, _, conversation, coroutine = heapq.heappop(self.queue)
+                if not self.realtime:
+                    self.clock = max(self.clock, ready_at)
+                try:
+                    delay = next(coroutine)
+                except StopIteration:
+                    conversation.done = True
+                    self.active.pop(conversation.key, None)
+                    finished.append(conversation)
+                    continue
+                except Exception as e:
+                    self.logger.error(f"❌ Conversation {conversation.key} failed: {e}")
+                    conversation.done = True
+                    self.active.pop(conversation.key, None)
+                    continue
+                self._schedule(conversation, coroutine, self.now() + delay)
+        finally:
+            self.batch.flush()
+        return finished
+
+    def run(self, bots: List, rounds: int = 3, key='group', opener: str = OPENER) -> Optional[Conversation]:
+        """Start one conversation and play it out without blocking on the delays"""
+        conversation = self.start(bots, rounds, key, opener)
+        if conversation is None:
+            return None
+        while not conversation.done and self.queue:
+            self.advance(until=float('inf'))
+        return conversation
+
+    def get_stats(self) -> Dict:
+        return {'active': len(self.active), 'scheduled_turns': len(self.queue), 'clock': self.now()}
@@ -1,49 +1,132 @@
 import random
 import sys
 import os
+from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.bot_engine_db import PrehistoricBotDB
+from core.bot_pool import BotPool, LazyBot
 from core.database_guardian import DatabaseGuardian
-import time
+from core.conversation_engine import ConversationEngine
+
+
+def _parse_timestamp(value):
+    """bots.last_seen_home as a datetime (stored as text by SQLite)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
 
 class ConversationManagerDB:
-    def __init__(self, db_file='data/bot_world.db'):
+    def __init__(self, db_file='data/bot_world.db', max_loaded_bots=128):
         self.db_file = db_file
-        self.bots = self._load_all_bots()
+        self.bot_pool = BotPool(db_file, capacity=max_loaded_bots)
+        self.bots = {}            # lowercase name -> LazyBot
+        self.bots_by_id = {}      # bot id -> LazyBot
+        self.active = {}          # lowercase name -> LazyBot acting this cycle (see next_turn)
+        self._turn_start = 0
+        self._load_all_bots()
+        self.next_turn()
+        self.conversations = ConversationEngine(db_file)
     
     def _load_all_bots(self):
-        """Load all active bots from the database"""
+        """Register all active bots; each one is loaded from the database on first use"""
         import sqlite3
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT id, name FROM bots WHERE is_active = 1')
+        cursor.execute('SELECT id, name, home_x, home_y, last_seen_home FROM bots WHERE is_active = 1')
         bot_list = cursor.fetchall()
         conn.close()
         
-        bots = {}
-        for bot_id, bot_name in bot_list:
-            bots[bot_name.lower()] = PrehistoricBotDB(bot_id, self.db_file)
+        self.bots = {}
+        self.bots_by_id = {}
+        for bot_id, bot_name, home_x, home_y, last_seen_home in bot_list:
+            self._index_bot(LazyBot(self.bot_pool, bot_id, bot_name, home_x, home_y,
+                                    _parse_timestamp(last_seen_home)))
         
-        print(f"✅ Loaded {len(bots)} bots from database")
-        return bots
+        print(f"✅ Registered {len(self.bots)} bots from database")
+        return self.bots
+    
+    def next_turn(self):
+        """Pick the bots that act this cycle (lowercase name -> LazyBot)
+
+        While every bot fits in the pool that is all of them. Beyond the
+        pool capacity bots take turns in windows of capacity bots, so a
+        cycle loads at most one window instead of reloading every bot.
+        """
+        names = list(self.bots)
+        capacity = self.bot_pool.capacity
+        if len(names) <= capacity:
+            self.active = dict(self.bots)
+        else:
+            start = self._turn_start % len(names)
+            window = (names[start:] + names[:start])[:capacity]
+            self.active = {name: self.bots[name] for name in window}
+            self._turn_start = start + capacity
+        return self.active
+    
+    def _index_bot(self, bot):
+        """Register a bot under its name and id"""
+        self.bots[bot.name.lower()] = bot
+        self.bots_by_id[bot.bot_id] = bot
+    
+    def get_bot(self, bot_id):
+        """Loaded bot with this id, or None"""
+        return self.bots_by_id.get(bot_id)
     
-    def _get_bot_by_id(self,bot_id):
-        """Load a bot from the database with id parameter"""
+    def get_bot_by_name(self, name):
+        return self.bots.get(name.lower())
+    
+    def refresh_homes(self):
+        """Reload every bot's home and last return home in one query (after homes are assigned)"""
+        import sqlite3
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, home_x, home_y, last_seen_home FROM bots')
+        for bot_id, home_x, home_y, last_seen_home in cursor.fetchall():
+            bot = self.bots_by_id.get(bot_id)
+            if bot is not None:
+                bot.home_x, bot.home_y = home_x, home_y
+                bot.last_seen_home = _parse_timestamp(last_seen_home)
+        conn.close()
+    
+    def mark_home(self, bot_id, when=None):
+        """Record that a bot is back home, in the database and the cached field"""
         import sqlite3
+        when = when or datetime.now()
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
+        cursor.execute('UPDATE bots SET last_seen_home = ? WHERE id = ?',
+                       (when.strftime('%Y-%m-%d %H:%M:%S'), bot_id))
+        conn.commit()
+        conn.close()
+        bot = self.bots_by_id.get(bot_id)
+        if bot is not None:
+            bot.last_seen_home = when
+    
+    def _get_bot_by_id(self, bot_id):
+        """(bot_id, name, fullname, species, home_x, home_y, last_seen_home) of a bot
+
+        Served from the loaded bots; only bots that are not loaded are read
+        from the database.
+        """
+        bot = self.bots_by_id.get(bot_id)
+        if bot is not None:
+            return (bot.bot_id, bot.name, bot.fullname, bot.species,
+                    bot.home_x, bot.home_y, bot.last_seen_home)
         
+        import sqlite3
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
         cursor.execute('SELECT id as bot_id, name, fullname, species, home_x, home_y, last_seen_home FROM bots WHERE id = ?', (bot_id,))
         bot_info = cursor.fetchone()
-        self.bot_id, self.name, self.fullname, self.species, self.home_x, self.home_y, self.last_seen_home = bot_info
         conn.close()
-        
-        bots = bot_info
-
-        
-        print(f"✅ Loaded Bot {bot_id} from database")
-        return bots
+        if bot_info is None:
+            return None
+        return bot_info[:6] + (_parse_timestamp(bot_info[6]),)
 
     def list_bots(self):
         """Show all available bots"""
@@ -53,42 +136,27 @@ class ConversationManagerDB:
             print(f"  {bot_name.title()} (ID: {bot.bot_id}) - {knowledge_count} facts")
     
     def start_group_conversation(self, rounds=3):
-        """Start a conversation between all bots"""
-        if len(self.bots) < 2:
+        """Start a conversation between the bots acting this cycle"""
+        if len(self.active) < 2:
             print("Need at least 2 bots for a group conversation!")
             return
         
         print("=== GROUP CONVERSATION STARTING ===")
-        bot_names = list(self.bots.keys())
-        
-        # Start with a random bot
-        import random
-        starter_bot_name = random.choice(bot_names)
-        starter_bot = self.bots[starter_bot_name]
-        initial_message = "Hello everyone! How are you all doing today?"
-        
-        print(f"{starter_bot.name}: {initial_message}")
-        
-        last_message = initial_message
-        last_speaker = starter_bot_name
-        
-        for round_num in range(rounds):
-            print(f"\n--- Round {round_num + 1} ---")
-            
-            for bot_name in bot_names:
-                if bot_name != last_speaker:
-                    bot = self.bots[bot_name]
-                    
-                    print(f"[{bot.name} is thinking...]")
-                    time.sleep(1)
-                    
-                    response = bot.process_input(last_message, speaker=last_speaker.title())
-                    print(f"{bot.name}: {response}")
-                    
-                    last_message = response
-                    last_speaker = bot_name
-            
-            print("-" * 40)
+        # Thinking delays are scheduled on the engine's clock, not slept
+        conversation = self.conversations.run(list(self.active.values()), rounds=rounds)
+        if conversation is None:
+            return
+
+        current_round = 0
+        for round_num, name, message, _ in conversation.transcript:
+            if round_num != current_round:
+                if current_round:
+                    print("-" * 40)
+                print(f"\n--- Round {round_num} ---")
+                current_round = round_num
+            print(f"{name}: {message}")
+        print("-" * 40)
+        return conversation
     
     def direct_message(self, from_bot_name, to_bot_name, message):
         """Send a direct message from one bot to another"""
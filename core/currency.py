@@ -6,26 +6,49 @@ Handles bot economics, transactions, and marketplace activities
 import sqlite3
 import logging
 import time
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
+from core.ledger import LedgerEngine, posting
+from core.order_book import OrderBook
+
+# Economic configuration
+DEFAULT_CONFIG = {
+    'base_income': 10.0,           # Daily stipend
+    'income_interval_hours': 24,   # How often to pay income
+    'transaction_fee': 0.01,       # 1% transaction fee
+    'starting_balance': 100.0,     # New bots start with this
+    'upkeep_cost': 2.0,           # Daily cost for existing
+    'min_balance': -50.0          # Allow some debt
+}
 
 class CurrencySystem:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str) -> 'CurrencySystem':
+        """One CurrencySystem per database, shared by every bot"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.logger = logging.getLogger('currency_system')
         
         # Economic configuration
-        self.config = {
-            'base_income': 10.0,           # Daily stipend
-            'income_interval_hours': 24,   # How often to pay income
-            'transaction_fee': 0.01,       # 1% transaction fee
-            'starting_balance': 100.0,     # New bots start with this
-            'upkeep_cost': 2.0,           # Daily cost for existing
-            'min_balance': -50.0          # Allow some debt
-        }
+        self.config = dict(DEFAULT_CONFIG)
         
         self.initialize_tables()
 
+        # Every CurrencySystem on the same database shares one ledger (and config)
+        self.ledger = LedgerEngine.for_database(db_path, self.config)
+        self.config = self.ledger.config
+        self.ledger.initialize()
+        self.order_book = OrderBook.for_database(db_path, self.ledger)
+
     def initialize_tables(self):
         """Ensure all currency tables exist"""
         try:
@@ -38,6 +61,7 @@ class CurrencySystem:
                         bot_id INTEGER PRIMARY KEY,
                         balance REAL DEFAULT 100.0,
                         last_income TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        settled_period INTEGER,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY (bot_id) REFERENCES bots(id) ON DELETE CASCADE
@@ -91,18 +115,19 @@ class CurrencySystem:
 
     def get_balance(self, bot_id: int) -> float:
         """Get current balance for a bot"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT balance FROM bot_currency WHERE bot_id = ?", 
-                    (bot_id,)
-                )
-                result = cursor.fetchone()
-                return result[0] if result else self.config['starting_balance']
-        except sqlite3.Error as e:
-            self.logger.error(f"Error getting balance for bot {bot_id}: {e}")
-            return 0.0
+        return self.ledger.get_balance(bot_id)
+
+    def get_balances(self, bot_ids: Optional[List[int]] = None) -> Dict[int, float]:
+        """Get balances for many bots at once (all accounts if bot_ids is None)"""
+        return self.ledger.get_balances(bot_ids)
+
+    def refresh_balances(self):
+        """Reload in-memory balances from the database"""
+        self.ledger.refresh()
+
+    def post_batch(self, postings: List[Dict], all_or_nothing: bool = True) -> List[bool]:
+        """Apply several ledger postings in one atomic transaction"""
+        return self.ledger.post_batch(postings, all_or_nothing)
 
     def transfer(self, from_bot: int, to_bot: int, amount: float, 
                  reason: str = "", transaction_type: str = "transfer") -> bool:
@@ -115,119 +140,57 @@ class CurrencySystem:
             self.logger.warning("Bot cannot transfer to itself")
             return False
 
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Check if sender has sufficient funds
-                sender_balance = self.get_balance(from_bot)
-                if sender_balance < amount:
-                    self.logger.info(f"Bot {from_bot} insufficient funds: {sender_balance} < {amount}")
-                    self._log_transaction(cursor, from_bot, to_bot, amount, 
-                                        transaction_type, reason, "failed")
-                    return False
-                
-                # Calculate net amount after fee
-                fee = amount * self.config['transaction_fee']
-                net_amount = amount - fee
-                
-                # Update balances
-                cursor.execute(
-                    "UPDATE bot_currency SET balance = balance - ?, updated_at = CURRENT_TIMESTAMP WHERE bot_id = ?",
-                    (amount, from_bot)
-                )
-                cursor.execute(
-                    "UPDATE bot_currency SET balance = balance + ?, updated_at = CURRENT_TIMESTAMP WHERE bot_id = ?",
-                    (net_amount, to_bot)
-                )
-                
-                # Log successful transaction
-                self._log_transaction(cursor, from_bot, to_bot, amount, 
-                                    transaction_type, reason, "completed")
-                
-                conn.commit()
-                self.logger.info(f"Transfer: {from_bot} -> {to_bot} | Amount: {amount} | Reason: {reason}")
-                return True
-                
-        except sqlite3.Error as e:
-            self.logger.error(f"Transfer error: {e}")
-            return False
+        # Sender may not go negative; the fee is burned
+        fee = amount * self.config['transaction_fee']
+        success = self.ledger.post_batch([
+            posting(from_bot, to_bot, amount, transaction_type, reason, fee=fee, floor=0.0)
+        ], all_or_nothing=False)[0]
+
+        if success:
+            self.logger.info(f"Transfer: {from_bot} -> {to_bot} | Amount: {amount} | Reason: {reason}")
+        else:
+            self.logger.info(f"Bot {from_bot} insufficient funds for {amount}")
+        return success
 
     def award_currency(self, to_bot: int, amount: float, reason: str = "") -> bool:
         """Award currency to a bot (system-generated money)"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Update balance
-                cursor.execute(
-                    "INSERT OR REPLACE INTO bot_currency (bot_id, balance, updated_at) "
-                    "VALUES (?, COALESCE((SELECT balance FROM bot_currency WHERE bot_id = ?), 0) + ?, CURRENT_TIMESTAMP)",
-                    (to_bot, to_bot, amount)
-                )
-                
-                # Log transaction (from_bot = NULL for system awards)
-                self._log_transaction(cursor, None, to_bot, amount, "reward", reason, "completed")
-                
-                conn.commit()
-                self.logger.info(f"Awarded {amount} to bot {to_bot} for: {reason}")
-                return True
-                
-        except sqlite3.Error as e:
-            self.logger.error(f"Award error: {e}")
-            return False
+        success = self.ledger.post(posting(None, to_bot, amount, "reward", reason))
+        if success:
+            self.logger.info(f"Awarded {amount} to bot {to_bot} for: {reason}")
+        return success
+
+    def charge_fee(self, bot_id: int, amount: float, reason: str = "") -> bool:
+        """Charge a service fee (e.g. airports); the bot may not go negative"""
+        return self.ledger.post(posting(bot_id, None, amount, "fee", reason, floor=0.0))
 
     def charge_upkeep(self, bot_id: int) -> bool:
         """Charge daily upkeep cost to a bot"""
         upkeep_cost = self.config['upkeep_cost']
-        current_balance = self.get_balance(bot_id)
-        
-        if current_balance - upkeep_cost >= self.config['min_balance']:
-            return self.award_currency(bot_id, -upkeep_cost, "daily_upkeep")
-        else:
-            self.logger.info(f"Bot {bot_id} cannot afford upkeep")
-            return False
+        if self.ledger.post(posting(bot_id, None, upkeep_cost, "upkeep", "daily_upkeep")):
+            return True
 
-    def distribute_income(self) -> Dict[str, int]:
-        """Distribute daily income to all bots who haven't received it today"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Find bots that haven't received income in the last income_interval_hours
-                cursor.execute("""
-                    SELECT bot_id FROM bot_currency 
-                    WHERE last_income <= datetime('now', ?)
-                    OR last_income IS NULL
-                """, (f"-{self.config['income_interval_hours']} hours",))
-                
-                eligible_bots = [row[0] for row in cursor.fetchall()]
-                distributed = 0
-                
-                for bot_id in eligible_bots:
-                    if self.award_currency(bot_id, self.config['base_income'], "daily_income"):
-                        # Update last_income timestamp
-                        cursor.execute(
-                            "UPDATE bot_currency SET last_income = CURRENT_TIMESTAMP WHERE bot_id = ?",
-                            (bot_id,)
-                        )
-                        distributed += 1
-                
-                conn.commit()
-                self.logger.info(f"Distributed income to {distributed} bots")
-                return {"distributed": distributed, "total_eligible": len(eligible_bots)}
-                
-        except sqlite3.Error as e:
-            self.logger.error(f"Income distribution error: {e}")
-            return {"distributed": 0, "total_eligible": 0}
+        self.logger.info(f"Bot {bot_id} cannot afford upkeep")
+        return False
+
+    def current_period(self) -> int:
+        """Index of the current income/upkeep period"""
+        return int(time.time() // (self.config['income_interval_hours'] * 3600))
+
+    def settle_period(self, period: Optional[int] = None) -> Dict:
+        """Pay income and charge upkeep to all bots not yet settled this period"""
+        period = self.current_period() if period is None else period
+        summary = self.ledger.settle_period(period, self.config['base_income'], self.config['upkeep_cost'])
 
-    def _log_transaction(self, cursor, from_bot: Optional[int], to_bot: Optional[int], 
-                        amount: float, transaction_type: str, reason: str, status: str):
-        """Helper method to log transactions"""
-        cursor.execute("""
-            INSERT INTO transactions (from_bot, to_bot, amount, transaction_type, reason, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (from_bot, to_bot, amount, transaction_type, reason, status))
+        if summary['bots_settled']:
+            self.logger.info(f"Settled period {period}: {summary['bots_settled']} bots, "
+                             f"{summary['upkeep_failed']} could not pay upkeep")
+        return summary
+
+    def distribute_income(self) -> Dict[str, int]:
+        """Distribute income (net of upkeep) to all bots not yet settled this period"""
+        summary = self.settle_period()
+        self.logger.info(f"Distributed income to {summary['bots_settled']} bots")
+        return {"distributed": summary['bots_settled'], "total_eligible": summary['bots_due']}
 
     # Asset Management Methods
     def add_asset(self, bot_id: int, asset_type: str, asset_name: str, 
@@ -273,56 +236,45 @@ class CurrencySystem:
     # Marketplace Methods
     def create_listing(self, seller_bot_id: int, asset_type: str, asset_name: str,
                       quantity: float, price_per_unit: float, listing_type: str = "sell") -> bool:
-        """Create a marketplace listing"""
+        """Create a marketplace listing (matched immediately against the order book)"""
+        return self.place_order(seller_bot_id, asset_type, asset_name, quantity,
+                                price_per_unit, listing_type)['listing_id'] is not None
+
+    def place_order(self, bot_id: int, asset_type: str, asset_name: str,
+                    quantity: float, price_per_unit: float, side: str = "sell") -> Dict:
+        """Submit a buy or sell listing and return its status and any fills"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO market_listings 
-                    (seller_bot_id, asset_type, asset_name, quantity, price_per_unit, listing_type, expires_at)
-                    VALUES (?, ?, ?, ?, ?, ?, datetime('now', '+7 days'))
-                """, (seller_bot_id, asset_type, asset_name, quantity, price_per_unit, listing_type))
-                conn.commit()
-                return True
+            result = self.order_book.submit(bot_id, asset_type, asset_name, quantity, price_per_unit, side)
+            return result
         except sqlite3.Error as e:
             self.logger.error(f"Error creating listing: {e}")
+            return {'listing_id': None, 'status': 'rejected', 'trades': []}
+
+    def cancel_listing(self, listing_id: int) -> bool:
+        """Withdraw an open listing"""
+        try:
+            cancelled = self.order_book.cancel(listing_id)
+            return cancelled
+        except sqlite3.Error as e:
+            self.logger.error(f"Error cancelling listing: {e}")
             return False
 
-    def get_market_listings(self, asset_type: str = None) -> List[Dict]:
-        """Get active market listings"""
+    def run_market_cycle(self) -> Dict:
+        """Expire stale listings and match listings added by other processes"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                if asset_type:
-                    cursor.execute("""
-                        SELECT * FROM market_listings 
-                        WHERE status = 'active' AND asset_type = ?
-                        ORDER BY created_at DESC
-                    """, (asset_type,))
-                else:
-                    cursor.execute("""
-                        SELECT * FROM market_listings 
-                        WHERE status = 'active'
-                        ORDER BY created_at DESC
-                    """)
-                
-                listings = []
-                for row in cursor.fetchall():
-                    listings.append({
-                        'id': row[0],
-                        'seller_bot_id': row[1],
-                        'asset_type': row[2],
-                        'asset_name': row[3],
-                        'quantity': row[4],
-                        'price_per_unit': row[5],
-                        'listing_type': row[6],
-                        'total_price': row[4] * row[5]
-                    })
-                return listings
+            summary = self.order_book.run_cycle()
+            return summary
         except sqlite3.Error as e:
-            self.logger.error(f"Error getting listings: {e}")
-            return []
+            self.logger.error(f"Market cycle error: {e}")
+            return {'expired': 0, 'trades': 0, 'open_orders': self.order_book.open_order_count()}
+
+    def get_market_listings(self, asset_type: str = None) -> List[Dict]:
+        """Get active market listings, best price first"""
+        return self.order_book.get_listings(asset_type)
+
+    def get_market_depth(self, asset_type: str, levels: int = 5) -> Dict[str, List]:
+        """Quantity available at the best price levels on each side"""
+        return self.order_book.get_depth(asset_type, levels)
 
     def get_transaction_history(self, bot_id: int, limit: int = 50) -> List[Dict]:
         """Get transaction history for a bot"""
@@ -354,27 +306,9 @@ class CurrencySystem:
             return []
 
     def get_economic_stats(self) -> Dict:
-        """Get overall economic statistics"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("SELECT COUNT(*), SUM(balance) FROM bot_currency")
-                total_bots, total_currency = cursor.fetchone()
-                
-                cursor.execute("SELECT COUNT(*) FROM transactions WHERE status = 'completed'")
-                total_transactions = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT COUNT(*) FROM market_listings WHERE status = 'active'")
-                active_listings = cursor.fetchone()[0]
-                
-                return {
-                    'total_bots': total_bots or 0,
-                    'total_currency': total_currency or 0,
-                    'average_balance': (total_currency or 0) / (total_bots or 1),
-                    'total_transactions': total_transactions,
-                    'active_listings': active_listings
-                }
-        except sqlite3.Error as e:
-            self.logger.error(f"Error getting economic stats: {e}")
-            return {}
\ No newline at end of file
+        """Get overall economic statistics (running aggregates, no table scans)"""
+        return self.ledger.get_stats()
+
+    def get_bot_flows(self, bot_id: int) -> Dict[str, float]:
+        """Total currency a bot has received and paid out"""
+        return self.ledger.get_flows(bot_id)
\ No newline at end of file
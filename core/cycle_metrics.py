@@ -0,0 +1,315 @@
+# core/cycle_metrics.py - Per-cycle metrics with unique keys, a latest-cycle pointer and rollups
+import sqlite3
+import logging
+from typing import List, Dict, Optional
+
+ROLLUP_SIZES = (10, 100)
+BOT_FIELDS = ('energy', 'social', 'curiosity', 'balance')
+
+
+class CycleMetricsStore:
+    """Writes and reads cycle_records / cycle_bot_stats
+
+    Every cycle is one transaction: the cycle row, all bot rows in one
+    executemany, the 10- and 100-cycle rollups and the latest-cycle
+    pointer. Unique indexes on cycle_number and (cycle_number, bot_id)
+    make duplicate cycles impossible rather than something to clean up.
+    """
+
+    def __init__(self, db_path='data/bot_world.db'):
+        self.db_path = db_path
+        self.logger = logging.getLogger('cycle_metrics')
+        self._latest_cycle = None
+        self.initialize()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def initialize(self):
+        """Create tables, unique keys and the meta table"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cycle_number INTEGER NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    total_currency REAL DEFAULT 0,
+                    total_transactions INTEGER DEFAULT 0,
+                    economic_events TEXT,
+                    notes TEXT
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_bot_stats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cycle_number INTEGER NOT NULL,
+                    bot_id INTEGER NOT NULL,
+                    bot_name TEXT NOT NULL,
+                    energy REAL DEFAULT 0,
+                    social REAL DEFAULT 0,
+                    curiosity REAL DEFAULT 0,
+                    balance REAL DEFAULT 0,
+                    FOREIGN KEY (bot_id) REFERENCES bots(id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_rollups (
+                    bucket_size INTEGER NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    cycles INTEGER DEFAULT 0,
+                    avg_currency REAL DEFAULT 0,
+                    min_currency REAL,
+                    max_currency REAL,
+                    last_transactions INTEGER DEFAULT 0,
+                    PRIMARY KEY (bucket_size, bucket_start)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_bot_rollups (
+                    bucket_size INTEGER NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    bot_id INTEGER NOT NULL,
+                    samples INTEGER DEFAULT 0,
+                    avg_energy REAL DEFAULT 0,
+                    avg_social REAL DEFAULT 0,
+                    avg_curiosity REAL DEFAULT 0,
+                    avg_balance REAL DEFAULT 0,
+                    PRIMARY KEY (bucket_size, bucket_start, bot_id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_metrics_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER
+                )
+            ''')
+            conn.commit()
+
+            try:
+                self._create_indexes(cursor)
+            except sqlite3.IntegrityError:
+                # Legacy databases may still hold duplicates
+                self.deduplicate()
+                self._create_indexes(cursor)
+
+            cursor.execute("SELECT COUNT(*) FROM cycle_metrics_meta")
+            if cursor.fetchone()[0] == 0:
+                self._rebuild_meta(cursor)
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM cycle_rollups)")
+            if not cursor.fetchone()[0]:
+                self._backfill_rollups(cursor)
+            conn.commit()
+
+    def _create_indexes(self, cursor):
+        cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_cycle_records_cycle
+                          ON cycle_records (cycle_number)''')
+        cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_cycle_bot_stats_cycle_bot
+                          ON cycle_bot_stats (cycle_number, bot_id)''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_cycle_bot_stats_bot
+                          ON cycle_bot_stats (bot_id, cycle_number)''')
+
+    def _rebuild_meta(self, cursor):
+        """Seed the latest-cycle pointer and row counts from the tables (one-off)"""
+        cursor.execute("SELECT MAX(cycle_number), COUNT(*) FROM cycle_records")
+        latest, total_cycles = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM cycle_bot_stats")
+        total_bot_rows = cursor.fetchone()[0]
+        cursor.executemany(
+            "INSERT OR REPLACE INTO cycle_metrics_meta (key, value) VALUES (?, ?)",
+            [('latest_cycle', latest or 0), ('total_cycles', total_cycles), ('total_bot_rows', total_bot_rows)]
+        )
+
+    def _backfill_rollups(self, cursor):
+        """Build rollups for cycles recorded before rollups existed (one-off)"""
+        for size in ROLLUP_SIZES:
+            cursor.execute('''
+                INSERT OR REPLACE INTO cycle_rollups
+                (bucket_size, bucket_start, cycles, avg_currency, min_currency, max_currency, last_transactions)
+                SELECT ?, cycle_number - cycle_number % ?, COUNT(*), AVG(total_currency),
+                       MIN(total_currency), MAX(total_currency), MAX(total_transactions)
+                FROM cycle_records GROUP BY cycle_number - cycle_number % ?
+            ''', (size, size, size))
+            cursor.execute('''
+                INSERT OR REPLACE INTO cycle_bot_rollups
+                (bucket_size, bucket_start, bot_id, samples, avg_energy, avg_social, avg_curiosity, avg_balance)
+                SELECT ?, cycle_number - cycle_number % ?, bot_id, COUNT(*),
+                       AVG(energy), AVG(social), AVG(curiosity), AVG(balance)
+                FROM cycle_bot_stats GROUP BY cycle_number - cycle_number % ?, bot_id
+            ''', (size, size, size))
+
+    def deduplicate(self):
+        """Keep the first row of every cycle and (cycle, bot) pair"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM cycle_records
+                WHERE id NOT IN (SELECT MIN(id) FROM cycle_records GROUP BY cycle_number)
+            ''')
+            deleted_cycles = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM cycle_bot_stats
+                WHERE id NOT IN (SELECT MIN(id) FROM cycle_bot_stats GROUP BY cycle_number, bot_id)
+            ''')
+            deleted_stats = cursor.rowcount
+            self._rebuild_meta(cursor)
+            if deleted_cycles or deleted_stats:
+                # The duplicates were folded into the rollups too
+                cursor.execute("DELETE FROM cycle_rollups")
+                cursor.execute("DELETE FROM cycle_bot_rollups")
+                self._backfill_rollups(cursor)
+            conn.commit()
+
+        self._latest_cycle = None
+        return {'cycle_records': deleted_cycles, 'cycle_bot_stats': deleted_stats}
+
+    def record_cycle(self, cycle_number: int, total_currency: float, total_transactions: int,
+                     bot_rows: List[Dict]) -> bool:
+        """Write one cycle atomically; False if that cycle number already exists
+
+        bot_rows: [{'bot_id', 'bot_name', 'energy', 'social', 'curiosity', 'balance'}]
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO cycle_records (cycle_number, total_currency, total_transactions)
+                VALUES (?, ?, ?)
+                ON CONFLICT (cycle_number) DO NOTHING
+            ''', (cycle_number, total_currency, total_transactions))
+            if cursor.rowcount == 0:
+                return False
+
+            # One row per bot, the first one wins (as INSERT OR IGNORE would keep it)
+            unique_rows = {}
+            for row in bot_rows:
+                unique_rows.setdefault(row['bot_id'], row)
+            bot_rows = list(unique_rows.values())
+
+            cursor.executemany('''
+                INSERT OR IGNORE INTO cycle_bot_stats
+                (cycle_number, bot_id, bot_name, energy, social, curiosity, balance)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(cycle_number, row['bot_id'], row['bot_name'], row['energy'],
+                   row['social'], row['curiosity'], row['balance']) for row in bot_rows])
+            inserted_bot_rows = cursor.rowcount
+
+            for size in ROLLUP_SIZES:
+                bucket = cycle_number - cycle_number % size
+                cursor.execute('''
+                    INSERT INTO cycle_rollups
+                    (bucket_size, bucket_start, cycles, avg_currency, min_currency, max_currency, last_transactions)
+                    VALUES (?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT (bucket_size, bucket_start) DO UPDATE SET
+                        avg_currency = (avg_currency * cycles + excluded.avg_currency) / (cycles + 1),
+                        min_currency = MIN(min_currency, excluded.min_currency),
+                        max_currency = MAX(max_currency, excluded.max_currency),
+                        last_transactions = excluded.last_transactions,
+                        cycles = cycles + 1
+                ''', (size, bucket, total_currency, total_currency, total_currency, total_transactions))
+
+                cursor.executemany('''
+                    INSERT INTO cycle_bot_rollups
+                    (bucket_size, bucket_start, bot_id, samples, avg_energy, avg_social, avg_curiosity, avg_balance)
+                    VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT (bucket_size, bucket_start, bot_id) DO UPDATE SET
+                        avg_energy = (avg_energy * samples + excluded.avg_energy) / (samples + 1),
+                        avg_social = (avg_social * samples + excluded.avg_social) / (samples + 1),
+                        avg_curiosity = (avg_curiosity * samples + excluded.avg_curiosity) / (samples + 1),
+                        avg_balance = (avg_balance * samples + excluded.avg_balance) / (samples + 1),
+                        samples = samples + 1
+                ''', [(size, bucket, row['bot_id'], row['energy'], row['social'],
+                       row['curiosity'], row['balance']) for row in bot_rows])
+
+            cursor.execute('''
+                UPDATE cycle_metrics_meta SET value = MAX(value, ?) WHERE key = 'latest_cycle'
+            ''', (cycle_number,))
+            cursor.execute("UPDATE cycle_metrics_meta SET value = value + 1 WHERE key = 'total_cycles'")
+            cursor.execute("UPDATE cycle_metrics_meta SET value = value + ? WHERE key = 'total_bot_rows'",
+                           (inserted_bot_rows,))
+            conn.commit()
+
+        self._latest_cycle = max(self._latest_cycle or 0, cycle_number)
+        return True
+
+    def get_meta(self) -> Dict[str, int]:
+        """Latest cycle and row counts (one small table read)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, value FROM cycle_metrics_meta").fetchall()
+        return {row['key']: row['value'] for row in rows}
+
+    def latest_cycle(self, refresh: bool = False) -> int:
+        """Highest recorded cycle number; cached unless refresh (other writers)"""
+        if self._latest_cycle is None or refresh:
+            self._latest_cycle = self.get_meta().get('latest_cycle', 0)
+        return self._latest_cycle
+
+    def get_cycle(self, cycle_number: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('''
+                SELECT cycle_number, total_currency, total_transactions, timestamp
+                FROM cycle_records WHERE cycle_number = ?
+            ''', (cycle_number,)).fetchone()
+        return dict(row) if row else None
+
+    def recent_cycles(self, limit: int = 50) -> List[Dict]:
+        """Newest cycles first"""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT cycle_number, total_currency, total_transactions, timestamp
+                FROM cycle_records ORDER BY cycle_number DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def bot_stats(self, cycle_number: Optional[int] = None) -> List[Dict]:
+        """Bot rows of a cycle (the latest one by default)"""
+        if cycle_number is None:
+            cycle_number = self.latest_cycle(refresh=True)
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT cycle_number, bot_id, bot_name, energy, social, curiosity, balance
+                FROM cycle_bot_stats WHERE cycle_number = ?
+            ''', (cycle_number,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def series(self, resolution: int = 1, limit: int = 200) -> Dict[str, List]:
+        """Economy series as columns, oldest first; resolution 1, 10 or 100 cycles"""
+        with self._connect() as conn:
+            if resolution in ROLLUP_SIZES:
+                rows = conn.execute('''
+                    SELECT bucket_start AS cycle_number, avg_currency AS total_currency,
+                           min_currency, max_currency, last_transactions AS total_transactions
+                    FROM cycle_rollups WHERE bucket_size = ?
+                    ORDER BY bucket_start DESC LIMIT ?
+                ''', (resolution, limit)).fetchall()
+            else:
+                rows = conn.execute('''
+                    SELECT cycle_number, total_currency, total_transactions
+                    FROM cycle_records ORDER BY cycle_number DESC LIMIT ?
+                ''', (limit,)).fetchall()
+
+        rows = list(reversed(rows))
+        columns = rows[0].keys() if rows else ('cycle_number', 'total_currency', 'total_transactions')
+        return {column: [row[column] for row in rows] for column in columns}
+
+    def bot_series(self, bot_id: int, resolution: int = 1, limit: int = 200) -> Dict[str, List]:
+        """One bot's needs and balance as columns, oldest first"""
+        with self._connect() as conn:
+            if resolution in ROLLUP_SIZES:
+                rows = conn.execute('''
+                    SELECT bucket_start AS cycle_number, avg_energy AS energy, avg_social AS social,
+                           avg_curiosity AS curiosity, avg_balance AS balance
+                    FROM cycle_bot_rollups WHERE bucket_size = ? AND bot_id = ?
+                    ORDER BY bucket_start DESC LIMIT ?
+                ''', (resolution, bot_id, limit)).fetchall()
+            else:
+                rows = conn.execute('''
+                    SELECT cycle_number, energy, social, curiosity, balance
+                    FROM cycle_bot_stats WHERE bot_id = ?
+                    ORDER BY cycle_number DESC LIMIT ?
+                ''', (bot_id, limit)).fetchall()
+
+        rows = list(reversed(rows))
+        columns = ('cycle_number',) + BOT_FIELDS
+        return {column: [row[column] for row in rows] for column in columns}
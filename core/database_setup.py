@@ -1,4 +1,5 @@
 import sqlite3
+import hashlib
 import json
 import os
 
@@ -35,18 +36,28 @@ class BotDatabase:
             )
         ''')
         
-        # Table 3: Knowledge base
+        # Table 3: Knowledge base (fact texts are stored once in facts)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS facts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL UNIQUE,
+                hash TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS knowledge (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 bot_id INTEGER,
-                fact TEXT NOT NULL,
+                fact_id INTEGER NOT NULL,
                 source TEXT DEFAULT 'creator',  -- 'creator', 'bot', 'system'
                 learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 confidence REAL DEFAULT 1.0,
-                FOREIGN KEY (bot_id) REFERENCES bots (id)
+                FOREIGN KEY (bot_id) REFERENCES bots (id),
+                FOREIGN KEY (fact_id) REFERENCES facts (id)
             )
         ''')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_bot_fact ON knowledge(bot_id, fact_id)')
         
         # Table 4: Memory/Conversation history
         cursor.execute('''
@@ -122,10 +133,13 @@ class BotDatabase:
         
         # Insert knowledge
         for fact in bot_data['knowledge']:
+            cursor.execute('INSERT OR IGNORE INTO facts (text, hash) VALUES (?, ?)',
+                           (fact, hashlib.sha1(fact.encode('utf-8')).hexdigest()))
+            cursor.execute('SELECT id FROM facts WHERE text = ?', (fact,))
             cursor.execute('''
-                INSERT INTO knowledge (bot_id, fact, source)
+                INSERT OR IGNORE INTO knowledge (bot_id, fact_id, source)
                 VALUES (?, ?, ?)
-            ''', (bot_id, fact, 'creator'))
+            ''', (bot_id, cursor.fetchone()[0], 'creator'))
         
         # Insert needs
         for need, value in bot_data['needs'].items():
@@ -159,7 +173,7 @@ class BotDatabase:
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT b.id, b.name, b.fullname, COUNT(k.fact) as knowledge_count
+            SELECT b.id, b.name, b.fullname, COUNT(k.id) as knowledge_count
             FROM bots b
             LEFT JOIN knowledge k ON b.id = k.bot_id
             WHERE b.is_active = 1
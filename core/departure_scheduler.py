@@ -0,0 +1,164 @@
+# core/departure_scheduler.py - Urgency-ordered departure slots for airport queues
+import heapq
+import time
+from collections import deque
+from datetime import datetime
+
+
+class DepartureScheduler:
+    """Priority queues of waiting bots per airport, with latency and revenue metrics
+
+    Urgency grows with low energy and distance from home. Every waiting bot
+    also ages at aging_per_minute points per minute so nobody starves. Since
+    aging is the same for everyone, the heap key (base urgency minus aging
+    times enqueue time) never goes stale. The state is in memory only;
+    restore() rebuilds it after a restart from the enqueue times and last
+    departures the airport system keeps in the database.
+    """
+
+    def __init__(self, slot_interval_seconds=300, aging_per_minute=0.05, history_size=500):
+        self.slot_interval_seconds = slot_interval_seconds
+        self.aging_per_minute = aging_per_minute
+        self.history_size = history_size
+
+        self.heaps = {}          # airport_id -> [(key, enqueued_at, bot_id)]
+        self.waiting = {}        # airport_id -> {bot_id: (key, enqueued_at)}
+        self.next_slot = {}      # airport_id -> earliest time of the next departure slot
+        self.metrics = {}        # airport_id -> latency / throughput / revenue
+
+    def urgency(self, energy=None, distance_home=None):
+        """Base urgency (0-3) from energy and distance to home"""
+        energy = 100 if energy is None else energy
+        distance_home = 0 if distance_home is None else distance_home
+
+        energy_score = max(0.0, min(1.0, (100 - energy) / 100)) * 2
+        distance_score = min(1.0, distance_home / 70)
+        return energy_score + distance_score
+
+    def _airport_metrics(self, airport_id):
+        """Metrics bucket for an airport"""
+        if airport_id not in self.metrics:
+            self.metrics[airport_id] = {
+                'wait_times': deque(maxlen=self.history_size),
+                'departures': deque(maxlen=self.history_size),
+                'total_departures': 0,
+                'revenue_day': datetime.utcnow().date(),
+                'revenue_today': 0.0
+            }
+        return self.metrics[airport_id]
+
+    def enqueue(self, airport_id, bot_id, energy=None, distance_home=None, now=None):
+        """Register a waiting bot (no-op if it is already queued here)"""
+        waiting = self.waiting.setdefault(airport_id, {})
+        if bot_id in waiting:
+            return False
+
+        now = time.time() if now is None else now
+        key = -(self.urgency(energy, distance_home) - self.aging_per_minute * now / 60)
+
+        waiting[bot_id] = (key, now)
+        heapq.heappush(self.heaps.setdefault(airport_id, []), (key, now, bot_id))
+        return True
+
+    def remove(self, airport_id, bot_id):
+        """Forget a waiting bot; its heap entry is skipped lazily"""
+        self.waiting.get(airport_id, {}).pop(bot_id, None)
+
+    def sync_queue(self, airport_id, queue, urgency_inputs=None, now=None, since=None):
+        """Align the scheduler with a persisted queue (bots added elsewhere)
+
+        since maps bot_id -> original enqueue time for bots already waiting.
+        """
+        urgency_inputs = urgency_inputs or {}
+        since = since or {}
+        waiting = self.waiting.setdefault(airport_id, {})
+
+        for bot_id in list(waiting):
+            if bot_id not in queue:
+                self.remove(airport_id, bot_id)
+
+        for bot_id in queue:
+            if bot_id not in waiting:
+                energy, distance_home = urgency_inputs.get(bot_id, (None, None))
+                self.enqueue(airport_id, bot_id, energy, distance_home, since.get(bot_id, now))
+
+    def restore(self, airport_id, queue, since, last_departure=None, urgency_inputs=None):
+        """Rebuild an airport after a restart: original enqueue times and the next slot"""
+        self.sync_queue(airport_id, queue, urgency_inputs, since=since)
+        if last_departure is not None:
+            self.next_slot[airport_id] = last_departure + self.slot_interval_seconds
+
+    def waits(self):
+        """(airport_id, bot_id, enqueued_at) of every waiting bot, for persistence"""
+        return [(airport_id, bot_id, enqueued_at)
+                for airport_id, waiting in self.waiting.items()
+                for bot_id, (_, enqueued_at) in waiting.items()]
+
+    def next_departures(self, airport_id, capacity, now=None):
+        """Pop up to capacity bots for the next departure slot, most urgent first"""
+        now = time.time() if now is None else now
+        if now < self.next_slot.get(airport_id, 0):
+            return []
+
+        heap = self.heaps.get(airport_id, [])
+        waiting = self.waiting.get(airport_id, {})
+        metrics = self._airport_metrics(airport_id)
+
+        departing = []
+        while heap and len(departing) < capacity:
+            key, enqueued_at, bot_id = heapq.heappop(heap)
+            if waiting.get(bot_id) != (key, enqueued_at):
+                continue  # Stale entry for a bot that left the queue
+
+            del waiting[bot_id]
+            departing.append(bot_id)
+            metrics['wait_times'].append(now - enqueued_at)
+            metrics['departures'].append(now)
+            metrics['total_departures'] += 1
+
+        if departing:
+            self.next_slot[airport_id] = now + self.slot_interval_seconds
+        return departing
+
+    def boarding_order(self, airport_id):
+        """Waiting bots in the order they would depart"""
+        waiting = self.waiting.get(airport_id, {})
+        return [bot_id for bot_id, _ in sorted(waiting.items(), key=lambda item: item[1])]
+
+    def record_fee(self, airport_id, fee, day=None):
+        """Add a collected airport fee (negative for a refund) to the revenue of its UTC day"""
+        metrics = self._airport_metrics(airport_id)
+        day = day or datetime.utcnow().date()
+        if day < metrics['revenue_day']:
+            return
+        if day > metrics['revenue_day']:
+            metrics['revenue_day'] = day
+            metrics['revenue_today'] = 0.0
+        metrics['revenue_today'] += fee
+
+    def _percentile(self, values, percent):
+        """Nearest-rank percentile of a sorted list"""
+        if not values:
+            return 0.0
+        index = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+        return values[index]
+
+    def get_stats(self, airport_id, now=None):
+        """Throughput, wait-time percentiles (seconds) and revenue for an airport"""
+        now = time.time() if now is None else now
+        metrics = self._airport_metrics(airport_id)
+        waits = sorted(metrics['wait_times'])
+
+        if metrics['revenue_day'] != datetime.utcnow().date():
+            metrics['revenue_day'] = datetime.utcnow().date()
+            metrics['revenue_today'] = 0.0
+
+        return {
+            'waiting': len(self.waiting.get(airport_id, {})),
+            'total_departures': metrics['total_departures'],
+            'departures_last_hour': sum(1 for t in metrics['departures'] if now - t <= 3600),
+            'wait_p50': self._percentile(waits, 50),
+            'wait_p90': self._percentile(waits, 90),
+            'wait_p99': self._percentile(waits, 99),
+            'revenue_today': metrics['revenue_today']
+        }
@@ -0,0 +1,225 @@
+"""
+Economy phase for BotFarm
+Personality-driven economic behaviours evaluated in one pass and posted as one ledger batch
+"""
+
+import random
+import sqlite3
+import logging
+from typing import List, Dict, Optional
+
+from core.ledger import posting
+
+# Probabilities and thresholds used by the cycle (shared with the simulator)
+DEFAULT_RULES = {
+    'event_chance': 0.05,
+    'gift_chance': 0.04,
+    'opportunity_chance': 0.03,
+    'risk_chance': 0.02,
+    'boom_bonus': (2.0, 5.0),
+    'lucky_bonus': (1.0, 3.0),
+    'gift_threshold': 0.7,        # max(empathy, agreeableness)
+    'gift_min_balance': 30.0,
+    'gift_amount': (1.0, 3.0),
+    'ambition_threshold': 0.7,
+    'effort_below': 20.0,
+    'effort_reward': (3.0, 6.0),
+    'invest_above': 50.0,
+    'investment': (5.0, 10.0),
+    'investment_win_chance': 0.6,
+    'investment_return': (1.1, 1.5),
+    'risk_threshold': 0.6,        # neuroticism
+    'risk_min_balance': 15.0,
+    'risk_share': 0.3,
+    'risk_cap': 10.0,
+    'risk_win_chance': 0.4,
+    'risk_return': (1.5, 3.0),
+    'activity_reward_chance': 0.05,   # per acting bot, paid by individual_activities
+    'activity_reward': (1.0, 3.0)
+}
+
+EVENTS = [
+    {"name": "economic_boom", "message": "💰 ECONOMIC BOOM! All activities yield double rewards this cycle!"},
+    {"name": "market_crash", "message": "📉 MARKET CRASH! Reward amounts reduced this cycle."},
+    {"name": "lucky_day", "message": "🍀 LUCKY DAY! Every bot gets a small bonus!"}
+]
+
+
+def activity_reward(rules: Dict, rng: random.Random) -> Optional[float]:
+    """Reward a bot earns from its individual activity this cycle, or None"""
+    if rng.random() < rules['activity_reward_chance']:
+        return rng.uniform(*rules['activity_reward'])
+    return None
+
+
+def plan_economy(bots: List[Dict], balances: Dict[int, float], rules: Dict,
+                 rng: random.Random, transaction_fee: float = 0.0) -> Dict:
+    """Decide every economic action of a cycle without touching the database
+
+    bots is a list of {'bot_id', 'name', 'personality'}. Behaviours run in
+    the order events, gifts, opportunities, risks, and each one sees the
+    balances left by the previous ones. Returns the postings, log lines
+    and per-behaviour counters.
+    """
+    working = {bot['bot_id']: balances.get(bot['bot_id'], 0.0) for bot in bots}
+    postings = []
+    messages = []
+    summary = {'event': None, 'gifts': 0, 'efforts': 0, 'investments': 0,
+               'risks_won': 0, 'risks_lost': 0, 'bonuses': 0}
+
+    def award(bot_id, amount, reason):
+        postings.append(posting(None, bot_id, amount, "reward", reason))
+        working[bot_id] += amount
+
+    if not bots:
+        return {'postings': postings, 'messages': messages, 'summary': summary}
+
+    # Traits as parallel columns, read once
+    ids = [bot['bot_id'] for bot in bots]
+    names = [bot['name'] for bot in bots]
+    traits = [bot.get('personality') or {} for bot in bots]
+    generosity = [max(t.get('empathy', 0.5), t.get('agreeableness', 0.5)) for t in traits]
+    ambition = [t.get('ambition', 0.5) for t in traits]
+    risk_taking = [t.get('neuroticism', 0.3) for t in traits]
+
+    if rng.random() < rules['event_chance']:
+        event = rng.choice(EVENTS)
+        summary['event'] = event['name']
+        messages.append(f"\n🎉 {event['message']}")
+        bonus_range = {'economic_boom': rules['boom_bonus'], 'lucky_day': rules['lucky_bonus']}.get(event['name'])
+        if bonus_range:
+            for bot_id in ids:
+                award(bot_id, rng.uniform(*bonus_range), f"{event['name']}_bonus")
+                summary['bonuses'] += 1
+
+    if rng.random() < rules['gift_chance']:
+        messages.append("🎁 Checking for personality-based gifts...")
+        for i, bot_id in enumerate(ids):
+            if generosity[i] <= rules['gift_threshold'] or working[bot_id] <= rules['gift_min_balance']:
+                continue
+            others = [j for j in range(len(ids)) if j != i]
+            if not others:
+                continue
+            j = rng.choice(others)
+            amount = rng.uniform(*rules['gift_amount'])
+            if working[bot_id] - amount < 0:
+                continue
+            postings.append(posting(bot_id, ids[j], amount, "transfer", "generous_gift",
+                                    fee=amount * transaction_fee, floor=0.0))
+            working[bot_id] -= amount
+            working[ids[j]] += amount * (1 - transaction_fee)
+            summary['gifts'] += 1
+            messages.append(f"   💝 {names[i]} → {names[j]}: {amount:.1f} (empathy: {traits[i].get('empathy', 0.5):.2f})")
+
+    if rng.random() < rules['opportunity_chance']:
+        messages.append("💼 Ambitious bots seeking opportunities...")
+        for i, bot_id in enumerate(ids):
+            if ambition[i] <= rules['ambition_threshold']:
+                continue
+            balance = working[bot_id]
+            if balance < rules['effort_below']:
+                reward = rng.uniform(*rules['effort_reward'])
+                award(bot_id, reward, "ambitious_effort")
+                summary['efforts'] += 1
+                messages.append(f"   💪 {names[i]} worked hard: +{reward:.1f} (ambition: {ambition[i]:.2f})")
+            elif balance > rules['invest_above']:
+                investment = rng.uniform(*rules['investment'])
+                if balance <= investment:
+                    continue
+                award(bot_id, -investment, "investment")
+                summary['investments'] += 1
+                if rng.random() < rules['investment_win_chance']:
+                    returns = investment * rng.uniform(*rules['investment_return'])
+                    award(bot_id, returns, "investment_returns")
+                    messages.append(f"   📈 {names[i]} smart investment: +{returns - investment:.1f} net")
+                else:
+                    messages.append(f"   📉 {names[i]} risky investment: -{investment:.1f}")
+
+    if rng.random() < rules['risk_chance']:
+        messages.append("🎲 Risk-takers considering ventures...")
+        for i, bot_id in enumerate(ids):
+            balance = working[bot_id]
+            if risk_taking[i] <= rules['risk_threshold'] or balance <= rules['risk_min_balance']:
+                continue
+            risk_amount = min(balance * rules['risk_share'], rules['risk_cap'])
+            if rng.random() < rules['risk_win_chance']:
+                reward = risk_amount * rng.uniform(*rules['risk_return'])
+                award(bot_id, reward, "risky_venture_success")
+                summary['risks_won'] += 1
+                messages.append(f"   🎰 {names[i]} RISK PAYS OFF: +{reward:.1f}! (neuroticism: {risk_taking[i]:.2f})")
+            else:
+                award(bot_id, -risk_amount, "risky_venture_failure")
+                summary['risks_lost'] += 1
+                messages.append(f"   💥 {names[i]} risky venture fails: -{risk_amount:.1f} (neuroticism: {risk_taking[i]:.2f})")
+
+    return {'postings': postings, 'messages': messages, 'summary': summary}
+
+
+class EconomyPhase:
+    """Runs the per-cycle economy against the ledger and records a summary row"""
+
+    def __init__(self, currency_system, rules: Optional[Dict] = None, rng: Optional[random.Random] = None):
+        self.currency = currency_system
+        self.db_path = currency_system.db_path
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.rng = rng or random.Random()
+        self.logger = logging.getLogger('economy_phase')
+        self.initialize_tables()
+
+    def initialize_tables(self):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS economic_cycle_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cycle_number INTEGER NOT NULL,
+                    event TEXT,
+                    postings INTEGER DEFAULT 0,
+                    bonuses INTEGER DEFAULT 0,
+                    gifts INTEGER DEFAULT 0,
+                    efforts INTEGER DEFAULT 0,
+                    investments INTEGER DEFAULT 0,
+                    risks_won INTEGER DEFAULT 0,
+                    risks_lost INTEGER DEFAULT 0,
+                    minted REAL DEFAULT 0,
+                    burned REAL DEFAULT 0,
+                    transferred REAL DEFAULT 0,
+                    applied INTEGER DEFAULT 1,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )""")
+        except sqlite3.Error as e:
+            self.logger.error(f"Economy table initialization error: {e}")
+
+    def run(self, bots: List[Dict], cycle_number: int) -> Dict:
+        """Plan, post atomically and record one cycle of economic behaviour"""
+        balances = self.currency.get_balances([bot['bot_id'] for bot in bots])
+        plan = plan_economy(bots, balances, self.rules, self.rng,
+                            self.currency.config['transaction_fee'])
+        postings = plan['postings']
+
+        applied = all(self.currency.post_batch(postings)) if postings else True
+        if postings and not applied:
+            logging.info("💰 Economy batch rejected by the ledger, no changes this cycle")
+        else:
+            for message in plan['messages']:
+                logging.info(message)
+
+        summary = dict(plan['summary'], cycle_number=cycle_number, postings=len(postings), applied=applied)
+        summary['minted'] = sum(p['amount'] for p in postings if p['from_bot'] is None and p['amount'] > 0)
+        summary['burned'] = -sum(p['amount'] for p in postings if p['from_bot'] is None and p['amount'] < 0) \
+            + sum(p['fee'] for p in postings)
+        summary['transferred'] = sum(p['amount'] for p in postings if p['from_bot'] is not None)
+        self._record(summary)
+        return summary
+
+    def _record(self, summary: Dict):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT INTO economic_cycle_events
+                    (cycle_number, event, postings, bonuses, gifts, efforts, investments,
+                     risks_won, risks_lost, minted, burned, transferred, applied)
+                    VALUES (:cycle_number, :event, :postings, :bonuses, :gifts, :efforts, :investments,
+                            :risks_won, :risks_lost, :minted, :burned, :transferred, :applied)
+                """, summary)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error recording economy summary: {e}")
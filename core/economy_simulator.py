@@ -0,0 +1,278 @@
+"""
+Economy simulator for BotFarm
+Monte Carlo replay of the cycle economy
+
+Simulated, with the server's own rules: period income and upkeep
+(LedgerEngine.settle_period), activity rewards (individual_activities),
+the economy phase (events, gifts, efforts, investments, risks) and
+airport fees. Bots do not move, so flights are a per-bot chance each
+cycle for bots above TRAVEL_MIN_BALANCE (--flight-chance; 0 unless
+given or estimated --from-db). Not simulated: market trades, goal and
+skill rewards. Every bot acts every cycle.
+
+Usage:
+    python -m core.economy_simulator --bots 50 --cycles 4320 --runs 200
+    python -m core.economy_simulator --set upkeep_cost=3 --set risk_chance=0.05
+    python -m core.economy_simulator --from-db data/bot_world.db
+    python -m core.economy_simulator --flight-chance 0.01 --airport-fee 100
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+from multiprocessing import Pool
+from typing import List, Dict, Optional
+
+from core.airport_system import TRAVEL_MIN_BALANCE
+from core.currency import DEFAULT_CONFIG
+from core.economy_phase import DEFAULT_RULES, activity_reward, plan_economy
+from core.ledger import apply_posting, posting
+
+TRAITS = ('empathy', 'agreeableness', 'ambition', 'neuroticism')
+
+
+def gini(values: List[float]) -> float:
+    """Gini coefficient of balances (debts count as zero wealth)"""
+    values = sorted(max(v, 0.0) for v in values)
+    total = sum(values)
+    if not values or total == 0:
+        return 0.0
+    weighted = sum((i + 1) * v for i, v in enumerate(values))
+    return (2 * weighted) / (len(values) * total) - (len(values) + 1) / len(values)
+
+
+def random_bots(n_bots: int, rng: random.Random) -> List[Dict]:
+    """Bots with uniformly random economic traits"""
+    return [
+        {'bot_id': i + 1, 'name': f"bot{i + 1}", 'personality': {t: rng.random() for t in TRAITS}}
+        for i in range(n_bots)
+    ]
+
+
+def load_bots(db_path: str) -> List[Dict]:
+    """Active bots and their traits from a world database"""
+    with sqlite3.connect(db_path) as conn:
+        bots = conn.execute("SELECT id, name FROM bots WHERE is_active = 1 ORDER BY id").fetchall()
+        traits = conn.execute("SELECT bot_id, trait_name, value FROM personality").fetchall()
+
+    personality = {}
+    for bot_id, trait, value in traits:
+        personality.setdefault(bot_id, {})[trait] = value
+    return [{'bot_id': bot_id, 'name': name, 'personality': personality.get(bot_id, {})}
+            for bot_id, name in bots]
+
+
+def load_travel(db_path: str, n_bots: int) -> Dict[str, float]:
+    """Flight chance per bot-cycle and mean airport fee observed in a world database"""
+    with sqlite3.connect(db_path) as conn:
+        airport_fee = conn.execute("SELECT AVG(fee) FROM airports").fetchone()[0]
+        cycles = conn.execute("SELECT COUNT(*) FROM cycle_records").fetchone()[0]
+        fees, refunds = conn.execute("""
+            SELECT COALESCE(SUM(transaction_type = 'fee'), 0), COALESCE(SUM(transaction_type = 'refund'), 0)
+            FROM transactions
+            WHERE transaction_type IN ('fee', 'refund') AND reason LIKE 'airport_%' AND status = 'completed'
+        """).fetchone()
+
+    flights = max(fees - refunds, 0)
+    return {
+        'flight_chance': flights / (cycles * n_bots) if cycles and n_bots else 0.0,
+        'airport_fee': airport_fee or 0.0
+    }
+
+
+def simulate_run(params: Dict) -> Dict:
+    """One seeded run; returns end-of-run metrics and the money supply series"""
+    rng = random.Random(params['seed'])
+    config = params['config']
+    rules = params['rules']
+
+    bots = params.get('bots') or random_bots(params['n_bots'], rng)
+    balances = {bot['bot_id']: config['starting_balance'] for bot in bots}
+    cycles_per_period = max(1, int(config['income_interval_hours'] * 60 / params['cycle_minutes']))
+
+    supply_series = []
+    bankrupt_ever = set()
+    rejected_batches = 0
+    flights = 0
+
+    flight_chance = params.get('flight_chance', 0.0)
+    airport_fee = params.get('airport_fee', 0.0)
+
+    for cycle in range(params['n_cycles']):
+        # Period settlement, same rule as LedgerEngine.settle_period
+        if cycle % cycles_per_period == 0:
+            for bot_id in balances:
+                balances[bot_id] += config['base_income']
+                if balances[bot_id] - config['upkeep_cost'] >= config['min_balance']:
+                    balances[bot_id] -= config['upkeep_cost']
+
+        # individual_activities runs before the economy phase
+        for bot_id in balances:
+            reward = activity_reward(rules, rng)
+            if reward is not None:
+                balances[bot_id] += reward
+
+        plan = plan_economy(bots, balances, rules, rng, config['transaction_fee'])
+
+        # The server posts the cycle as one all-or-nothing batch
+        working = dict(balances)
+        if all(apply_posting(working, entry, config['min_balance']) for entry in plan['postings']):
+            balances = working
+        else:
+            rejected_batches += 1
+
+        # Airport fees are burned, charged one by one like auto_assign_bots_to_airports
+        if flight_chance:
+            for bot_id, balance in balances.items():
+                if balance > TRAVEL_MIN_BALANCE and rng.random() < flight_chance:
+                    fee = posting(bot_id, None, airport_fee, "fee", "airport", floor=0.0)
+                    flights += apply_posting(balances, fee, config['min_balance'])
+
+        bankrupt_ever.update(bot_id for bot_id, balance in balances.items() if balance < 0)
+        if cycle % params['sample_every'] == 0:
+            supply_series.append(sum(balances.values()))
+
+    final = list(balances.values())
+    return {
+        'seed': params['seed'],
+        'money_supply': sum(final),
+        'gini': gini(final),
+        'bankruptcy_rate': sum(1 for b in final if b < 0) / (len(final) or 1),
+        'ever_bankrupt_rate': len(bankrupt_ever) / (len(final) or 1),
+        'rejected_batches': rejected_batches,
+        'flights': flights,
+        'supply_series': supply_series
+    }
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    """Mean and p5/p50/p95 of a metric across runs"""
+    ordered = sorted(values)
+    return {
+        'mean': sum(ordered) / (len(ordered) or 1),
+        'p5': _percentile(ordered, 5),
+        'p50': _percentile(ordered, 50),
+        'p95': _percentile(ordered, 95)
+    }
+
+
+def run_monte_carlo(n_bots: int = 5, n_cycles: int = 1440, runs: int = 100,
+                    cycle_minutes: float = 10, config: Optional[Dict] = None,
+                    rules: Optional[Dict] = None, bots: Optional[List[Dict]] = None,
+                    processes: Optional[int] = None, base_seed: int = 0,
+                    flight_chance: float = 0.0, airport_fee: float = 100.0) -> Dict:
+    """Simulate many seeded runs in parallel and summarise the distributions"""
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    rules = dict(DEFAULT_RULES, **(rules or {}))
+    jobs = [{
+        'seed': base_seed + run,
+        'n_bots': n_bots,
+        'n_cycles': n_cycles,
+        'cycle_minutes': cycle_minutes,
+        'sample_every': max(1, n_cycles // 100),
+        'config': config,
+        'rules': rules,
+        'bots': bots,
+        'flight_chance': flight_chance,
+        'airport_fee': airport_fee
+    } for run in range(runs)]
+
+    if processes == 1:
+        results = [simulate_run(job) for job in jobs]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(simulate_run, jobs)
+
+    # Median money supply path across runs
+    series = [r['supply_series'] for r in results]
+    median_path = [_percentile(sorted(step), 50) for step in zip(*series)]
+
+    return {
+        'runs': runs,
+        'bots': len(bots) if bots else n_bots,
+        'cycles': n_cycles,
+        'config': config,
+        'rules': rules,
+        'flight_chance': flight_chance,
+        'airport_fee': airport_fee,
+        'money_supply': distribution([r['money_supply'] for r in results]),
+        'gini': distribution([r['gini'] for r in results]),
+        'bankruptcy_rate': distribution([r['bankruptcy_rate'] for r in results]),
+        'ever_bankrupt_rate': distribution([r['ever_bankrupt_rate'] for r in results]),
+        'rejected_batches': distribution([r['rejected_batches'] for r in results]),
+        'flights': distribution([r['flights'] for r in results]),
+        'median_supply_path': median_path
+    }
+
+
+def _parse_overrides(pairs: List[str]):
+    """Split --set key=value pairs into config and rule overrides"""
+    config, rules = {}, {}
+    for pair in pairs:
+        key, _, raw = pair.partition('=')
+        value = json.loads(raw)
+        if isinstance(value, list):
+            value = tuple(value)
+        if key in DEFAULT_CONFIG:
+            config[key] = value
+        elif key in DEFAULT_RULES:
+            rules[key] = value
+        else:
+            raise SystemExit(f"Unknown parameter: {key}")
+    return config, rules
+
+
+def print_report(report: Dict):
+    print(f"📊 Economy simulation: {report['runs']} runs x {report['cycles']} cycles, {report['bots']} bots")
+    for metric in ('money_supply', 'gini', 'bankruptcy_rate', 'ever_bankrupt_rate', 'rejected_batches', 'flights'):
+        d = report[metric]
+        print(f"   {metric:<20} mean {d['mean']:>10.3f}   p5 {d['p5']:>10.3f}   "
+              f"p50 {d['p50']:>10.3f}   p95 {d['p95']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo forecast of the bot economy: period income and upkeep, activity rewards, "
+                    "economy phase events/gifts/efforts/investments/risks and airport fees "
+                    "(market trades, goal and skill rewards are not simulated)")
+    parser.add_argument('--bots', type=int, default=5)
+    parser.add_argument('--cycles', type=int, default=1440, help="cycles per run (1440 = 10 days at 10 min)")
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--cycle-minutes', type=float, default=10)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--from-db', help="use the active bots and traits of a world database "
+                                          "(and its observed flight rate and airport fees)")
+    parser.add_argument('--flight-chance', type=float, default=None,
+                        help="chance per bot and cycle that a bot above the travel balance flies (default 0)")
+    parser.add_argument('--airport-fee', type=float, default=None, help="fee burned per flight (default 100)")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="override a currency config value or economy rule (JSON value)")
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    args = parser.parse_args()
+
+    config_overrides, rule_overrides = _parse_overrides(args.set)
+    bots = load_bots(args.from_db) if args.from_db else None
+    travel = load_travel(args.from_db, len(bots)) if args.from_db else {'flight_chance': 0.0, 'airport_fee': 100.0}
+    if args.flight_chance is not None:
+        travel['flight_chance'] = args.flight_chance
+    if args.airport_fee is not None:
+        travel['airport_fee'] = args.airport_fee
+    report = run_monte_carlo(
+        n_bots=args.bots, n_cycles=args.cycles, runs=args.runs, cycle_minutes=args.cycle_minutes,
+        config=config_overrides, rules=rule_overrides, bots=bots,
+        processes=args.processes, base_seed=args.seed, **travel
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,220 @@
+"""
+Event bus for BotFarm
+In-process publish/subscribe of typed bot events with synchronous and batched delivery
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# Events; each is produced once by the subsystem that knows it happened
+BotMoved = namedtuple('BotMoved', 'bot_id from_x from_y to_x to_y from_type to_type via')
+BotsMet = namedtuple('BotsMet', 'bot_ids x y location_type description')
+FactLearned = namedtuple('FactLearned', 'bot_id fact_id source')
+CurrencyPosted = namedtuple('CurrencyPosted', 'from_bot to_bot amount transaction_type reason')
+IrcMessageHeard = namedtuple('IrcMessageHeard', 'bot_id channel nick text heard_at')
+
+# A row written to a bot's memory (text without the timestamp prefix)
+MemoryRecorded = namedtuple('MemoryRecorded', 'bot_id event_type text')
+
+EVENT_TYPES = (BotMoved, BotsMet, FactLearned, CurrencyPosted, IrcMessageHeard, MemoryRecorded)
+
+
+def event_bots(event) -> Tuple:
+    """Ids of the bots an event is about"""
+    if isinstance(event, BotsMet):
+        return tuple(event.bot_ids)
+    if isinstance(event, CurrencyPosted):
+        return tuple(bot_id for bot_id in (event.from_bot, event.to_bot) if bot_id is not None)
+    return (event.bot_id,)
+
+
+def event_topics(event) -> Tuple:
+    """Subscription keys an event is delivered on: its class, and for memory rows also the event type"""
+    if isinstance(event, MemoryRecorded):
+        return (MemoryRecorded, event.event_type)
+    return (type(event),)
+
+
+class EventBus:
+    """Handlers subscribe to an event class (or a memory event type), for every bot or one bot
+
+    publish() calls the synchronous handlers at once and queues the event
+    for batch handlers; post() defers the whole delivery, so it is safe
+    from other threads and inside locks. dispatch() delivers posted events
+    and hands every batch handler its events as one list; the server calls
+    it at fixed points of its cycle, so handlers never race the cycle on
+    the same bots. Routing is a dict lookup per topic and bot, so an event
+    costs only its subscribers.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> 'EventBus':
+        """Process-wide bus shared by every subsystem"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self):
+        self.handlers = {}          # topic -> {bot_id or None: [(handler, batch)]}
+        self.outbox = []            # posted events waiting for dispatch()
+        self.pending = {}           # batch handler -> events waiting for dispatch()
+        self.lock = threading.RLock()
+        self.dispatch_lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self._stop = None
+        self._thread = None
+        self.logger = logging.getLogger('event_bus')
+
+    def subscribe(self, topic, handler: Callable, bot_id: Optional[int] = None, batch: bool = False):
+        """Receive events of a topic; batch handlers get a list of events per dispatch()"""
+        with self.lock:
+            handlers = self.handlers.setdefault(topic, {}).setdefault(bot_id, [])
+            if (handler, batch) not in handlers:
+                handlers.append((handler, batch))
+
+    def unsubscribe(self, topic, handler: Callable, bot_id: Optional[int] = None):
+        with self.lock:
+            by_bot = self.handlers.get(topic, {})
+            handlers = [entry for entry in by_bot.get(bot_id, []) if entry[0] != handler]
+            if handlers:
+                by_bot[bot_id] = handlers
+            else:
+                by_bot.pop(bot_id, None)
+            if not by_bot:
+                self.handlers.pop(topic, None)
+
+    def _targets(self, event) -> List[Tuple[Callable, bool]]:
+        targets = []
+        bots = event_bots(event)
+        for topic in event_topics(event):
+            by_bot = self.handlers.get(topic)
+            if not by_bot:
+                continue
+            for key in (None,) + bots:
+                for entry in by_bot.get(key, ()):
+                    if entry not in targets:
+                        targets.append(entry)
+        return targets
+
+    def publish(self, event) -> int:
+        """Deliver to synchronous handlers now and queue for batch handlers; returns the handler count"""
+        with self.lock:
+            self.published += 1
+            targets = self._targets(event)
+            for handler, batch in targets:
+                if batch:
+                    self.pending.setdefault(handler, []).append(event)
+
+        for handler, batch in targets:
+            if not batch:
+                self._call(handler, event)
+        return len(targets)
+
+    def subscribed(self, event) -> bool:
+        """Whether any handler would receive an event"""
+        with self.lock:
+            return bool(self._targets(event))
+
+    def post(self, event):
+        """Queue an event for the next dispatch() (dropped at once if nothing subscribes to it)"""
+        with self.lock:
+            if self._targets(event):
+                self.outbox.append(event)
+            else:
+                self.published += 1
+
+    def remember(self, bot_id: int, event_type: str, text: str) -> int:
+        """Publish a memory row that was just written"""
+        return self.publish(MemoryRecorded(bot_id, event_type, text))
+
+    def publish_memories(self, memories: Iterable[Tuple[int, str, str]]) -> int:
+        """Publish (bot_id, event, event_type) rows after they were written to memory"""
+        return sum(self.remember(bot_id, event_type, event) for bot_id, event, event_type in memories)
+
+    def dispatch(self) -> int:
+        """Deliver posted events, then every batch handler's queue; returns events delivered"""
+        with self.dispatch_lock:
+            delivered = 0
+            # Batch handlers may publish follow-up events (e.g. MemoryRecorded); pick those up too
+            while True:
+                with self.lock:
+                    outbox, self.outbox = self.outbox, []
+                for event in outbox:
+                    self.publish(event)
+                with self.lock:
+                    pending, self.pending = self.pending, {}
+                if not outbox and not pending:
+                    break
+                for handler, events in pending.items():
+                    self._call(handler, events)
+                    delivered += len(events)
+            return delivered
+
+    def _call(self, handler: Callable, payload):
+        try:
+            handler(payload)
+            with self.lock:
+                self.delivered += len(payload) if isinstance(payload, list) else 1
+        except Exception as e:
+            name = getattr(handler, '__qualname__', repr(handler))
+            self.logger.error(f"❌ Event handler {name} failed: {e}")
+
+    def start(self, interval: float = 5.0):
+        """Dispatch in a background thread every interval seconds (only for handlers safe off the main loop)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = threading.Event()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.dispatch()
+
+        self._thread = threading.Thread(target=loop, name='event-bus', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stop:
+            self._stop.set()
+        self.dispatch()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'published': self.published,
+                'delivered': self.delivered,
+                'queued': len(self.outbox) + sum(len(events) for events in self.pending.values()),
+                'subscriptions': sum(len(handlers) for by_bot in self.handlers.values()
+                                     for handlers in by_bot.values()),
+            }
+
+
+class EventCounter:
+    """Batch subscriber counting events per type since the last reset, for the cycle metrics"""
+
+    def __init__(self, bus: EventBus):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.since = datetime.now()
+        for event_class in EVENT_TYPES:
+            bus.subscribe(event_class, self.on_events, batch=True)
+
+    def on_events(self, events: List):
+        with self.lock:
+            for event in events:
+                name = type(event).__name__
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def reset(self):
+        """Counts since the previous reset"""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            self.since = datetime.now()
+        return counts
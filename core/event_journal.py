@@ -0,0 +1,102 @@
+"""
+Event journal for BotFarm
+Bus subscribers that persist events: bot memory rows and the dashboard event stream
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from typing import List
+
+from core.event_bus import (EventBus, BotMoved, BotsMet, IrcMessageHeard, MemoryRecorded,
+                            EVENT_TYPES, event_bots)
+
+
+class MemoryJournal:
+    """Writes the memory rows of bus events in one transaction per dispatch
+
+    Meetings, walks and heard IRC lines no longer touch the memory table
+    themselves; once the rows are committed they are published again as
+    MemoryRecorded for memory-driven subscribers such as goals.
+    """
+
+    def __init__(self, db_path: str, bus: EventBus):
+        self.db_path = db_path
+        self.bus = bus
+        self.logger = logging.getLogger('memory_journal')
+        for event_class in (BotsMet, BotMoved, IrcMessageHeard):
+            bus.subscribe(event_class, self.on_events, batch=True)
+
+    def _memories(self, event):
+        """(bot_id, stored text, event_type, text) rows for one event"""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(event, BotsMet):
+            for bot_id in event.bot_ids:
+                others = ', '.join(str(other) for other in event.bot_ids if other != bot_id)
+                text = f"{event.description} with bots {others}"
+                yield bot_id, f"{timestamp}: {text}", 'bot_interaction', text
+        elif isinstance(event, BotMoved):
+            # Flights are journaled by the airport system in its own transaction
+            if event.via == 'walk':
+                text = f"Traveled from {event.from_type} to {event.to_type}"
+                yield event.bot_id, f"{timestamp}: {text}", 'map_travel', text
+        elif isinstance(event, IrcMessageHeard):
+            text = (f"[IRC {event.heard_at.strftime('%H:%M')}] heard_message: Activity in channel "
+                    f"#{event.channel} user: {event.nick} => {event.text}")
+            yield event.bot_id, text, 'irc_experience', text
+
+    def on_events(self, events: List):
+        rows = [row for event in events for row in self._memories(event)]
+        if not rows:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany("INSERT INTO memory (bot_id, event, event_type) VALUES (?, ?, ?)",
+                             [(bot_id, stored, event_type) for bot_id, stored, event_type, _ in rows])
+            conn.commit()
+        finally:
+            conn.close()
+        for bot_id, _, event_type, text in rows:
+            self.bus.publish(MemoryRecorded(bot_id, event_type, text))
+
+
+class EventStream:
+    """Recent typed events in the event_stream table, polled by the dashboard
+
+    Only the newest keep rows are retained.
+    """
+
+    def __init__(self, db_path: str, bus: EventBus, keep: int = 1000):
+        self.db_path = db_path
+        self.keep = keep
+        self.logger = logging.getLogger('event_stream')
+        self.initialize()
+        for event_class in EVENT_TYPES:
+            if event_class is not MemoryRecorded:
+                bus.subscribe(event_class, self.on_events, batch=True)
+
+    def initialize(self):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS event_stream (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event TEXT NOT NULL,
+                    bot_ids TEXT,
+                    payload TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )""")
+        except sqlite3.Error as e:
+            self.logger.error(f"Event stream table initialization error: {e}")
+
+    def on_events(self, events: List):
+        rows = [(type(event).__name__, ','.join(str(bot_id) for bot_id in event_bots(event)),
+                 json.dumps(event._asdict(), default=str)) for event in events]
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany("INSERT INTO event_stream (event, bot_ids, payload) VALUES (?, ?, ?)", rows)
+            conn.execute("DELETE FROM event_stream WHERE id <= (SELECT MAX(id) FROM event_stream) - ?",
+                         (self.keep,))
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,199 @@
+"""
+Fact store for BotFarm
+Canonical fact texts with integer ids; knowledge rows only reference them
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Iterable, List, Dict, Optional
+
+
+def fact_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+FACTS_SCHEMA = """CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+
+KNOWLEDGE_SCHEMA = """CREATE TABLE IF NOT EXISTS knowledge (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot_id INTEGER,
+    fact_id INTEGER NOT NULL,
+    source TEXT DEFAULT 'creator',  -- 'creator', 'bot', 'system'
+    learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    confidence REAL DEFAULT 1.0,
+    FOREIGN KEY (bot_id) REFERENCES bots (id),
+    FOREIGN KEY (fact_id) REFERENCES facts (id)
+)"""
+
+KNOWLEDGE_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_bot_fact ON knowledge(bot_id, fact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_knowledge_fact_id ON knowledge(fact_id)",
+)
+
+
+class FactStore:
+    """facts(id, text, hash) shared by every bot; knowledge(bot_id, fact_id, ...) per bot
+
+    Each text is stored once and a bot knows a fact at most once, so
+    duplicate checks are integer lookups on (bot_id, fact_id). Databases
+    still holding the text in knowledge.fact are migrated on first use.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str) -> 'FactStore':
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = logging.getLogger('fact_store')
+        self.lock = threading.Lock()
+        self.ids = {}               # text -> fact id
+        self.texts = {}             # fact id -> text
+        self.initialize()
+
+    def initialize(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(FACTS_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_hash ON facts(hash)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(knowledge)")]
+            if not columns:
+                conn.execute(KNOWLEDGE_SCHEMA)
+        if 'fact' in columns:
+            self.migrate_knowledge()
+        with sqlite3.connect(self.db_path) as conn:
+            for statement in KNOWLEDGE_INDEXES:
+                conn.execute(statement)
+
+    def migrate_knowledge(self) -> int:
+        """Rebuild knowledge around fact ids, dropping the per-row text and repeated facts
+
+        Extra columns (knowledge_type, subject, ...) are carried over; of
+        repeated (bot, fact) rows the oldest is kept. Returns the rows kept.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            info = cursor.execute("PRAGMA table_info(knowledge)").fetchall()
+            if 'fact' not in [row[1] for row in info]:
+                cursor.execute("ROLLBACK")
+                return 0
+
+            cursor.execute("SELECT DISTINCT fact FROM knowledge WHERE fact IS NOT NULL")
+            self._intern_all(cursor, [row[0] for row in cursor.fetchall()])
+
+            # Columns beyond the base schema keep their declared type and default
+            base = ('id', 'bot_id', 'fact', 'fact_id', 'source', 'learned_at', 'confidence')
+            extra = [row for row in info if row[1] not in base]
+            extra_defs = ''.join(
+                f",\n    {name} {col_type}" + (f" DEFAULT {default}" if default is not None else "")
+                for _, name, col_type, _, default, _ in extra
+            )
+            schema = KNOWLEDGE_SCHEMA.replace("knowledge (", "knowledge_interned (", 1) \
+                .replace("confidence REAL DEFAULT 1.0,", f"confidence REAL DEFAULT 1.0{extra_defs},", 1)
+            cursor.execute("DROP TABLE IF EXISTS knowledge_interned")
+            cursor.execute(schema)
+
+            present = [row[1] for row in info]
+            copied = [c for c in ('id', 'bot_id', 'source', 'learned_at', 'confidence') if c in present] \
+                + [row[1] for row in extra]
+            cursor.execute(f"""
+                INSERT INTO knowledge_interned ({', '.join(copied)}, fact_id)
+                SELECT {', '.join('k.' + c for c in copied)}, f.id
+                FROM knowledge k JOIN facts f ON f.text = k.fact
+                WHERE k.id IN (SELECT MIN(id) FROM knowledge GROUP BY bot_id, fact)
+            """)
+            kept = cursor.rowcount
+            total = cursor.execute("SELECT COUNT(*) FROM knowledge").fetchone()[0]
+
+            cursor.execute("DROP TABLE knowledge")
+            cursor.execute("ALTER TABLE knowledge_interned RENAME TO knowledge")
+            for statement in KNOWLEDGE_INDEXES:
+                cursor.execute(statement)
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        print(f"🧩 Knowledge migrated to fact ids: {kept} rows kept, {total - kept} duplicates dropped")
+        return kept
+
+    def _intern_all(self, cursor, texts: Iterable[str]) -> Dict[str, int]:
+        """Ids for many texts, inserting the new ones (caller commits)"""
+        result = {}
+        missing = []
+        for text in set(texts):
+            fact_id = self.ids.get(text)
+            if fact_id is None:
+                missing.append(text)
+            else:
+                result[text] = fact_id
+
+        if missing:
+            cursor.executemany("INSERT OR IGNORE INTO facts (text, hash) VALUES (?, ?)",
+                               [(text, fact_hash(text)) for text in missing])
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                cursor.execute(f"SELECT id, text FROM facts WHERE text IN ({','.join('?' * len(chunk))})", chunk)
+                for fact_id, text in cursor.fetchall():
+                    self.ids[text] = fact_id
+                    self.texts[fact_id] = text
+                    result[text] = fact_id
+        return result
+
+    def intern(self, text: str, cursor=None) -> int:
+        """Id of a fact text, created if new (commits unless a cursor is given)"""
+        with self.lock:
+            if text in self.ids:
+                return self.ids[text]
+            if cursor is not None:
+                return self._intern_all(cursor, [text])[text]
+            conn = sqlite3.connect(self.db_path)
+            try:
+                fact_id = self._intern_all(conn.cursor(), [text])[text]
+                conn.commit()
+            finally:
+                conn.close()
+            return fact_id
+
+    def lookup(self, text: str) -> Optional[int]:
+        """Id of an existing fact text, without creating it"""
+        if text in self.ids:
+            return self.ids[text]
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT id FROM facts WHERE hash = ? AND text = ?", (fact_hash(text), text)).fetchone()
+        if row is None:
+            return None
+        self.ids[text] = row[0]
+        self.texts[row[0]] = text
+        return row[0]
+
+    def text(self, fact_id: int) -> Optional[str]:
+        if fact_id not in self.texts:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute("SELECT text FROM facts WHERE id = ?", (fact_id,)).fetchone()
+            if row is None:
+                return None
+            self.texts[fact_id] = row[0]
+            self.ids[row[0]] = fact_id
+        return self.texts[fact_id]
+
+    def bot_fact_ids(self, bot_id: int) -> List[int]:
+        with sqlite3.connect(self.db_path) as conn:
+            return [row[0] for row in conn.execute("SELECT fact_id FROM knowledge WHERE bot_id = ?", (bot_id,))]
@@ -1,15 +1,145 @@
 # core/goal_system.py - Goal-oriented behavior for bots
 import random
 import json
+import sqlite3
+import threading
 from datetime import datetime, timedelta
 
+from core.event_bus import EventBus
+
+# Memory event types that move each goal category forward, with the base progress per event
+GOAL_EVENTS = {
+    'understanding': {'learning': 8.0, 'knowledge_learning': 6.0, 'irc_experience': 2.0},
+    'social': {'bot_interaction': 10.0, 'knowledge_sharing': 8.0, 'conversation': 3.0},
+    'exploration': {'map_travel': 5.0, 'airport_travel': 10.0, 'knowledge_learning': 4.0, 'irc_experience': 2.0},
+    'maintenance': {'rest': 10.0, 'skill_development': 6.0},
+}
+
+
+class GoalStore:
+    """Goals of every bot in the bot_goals table
+
+    Goals are inserted when set; progress and completion are collected
+    as they happen and written back together by flush().
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path):
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.dirty = {}           # goal id -> goal dict with unsaved progress or status
+        self.initialize()
+
+    def initialize(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS bot_goals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bot_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                category TEXT NOT NULL,
+                progress REAL DEFAULT 0,
+                target_progress REAL DEFAULT 100,
+                priority REAL DEFAULT 0.5,
+                status TEXT DEFAULT 'active',  -- 'active', 'completed', 'expired'
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP,
+                FOREIGN KEY (bot_id) REFERENCES bots (id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_bot_goals_bot_status ON bot_goals(bot_id, status)')
+        conn.commit()
+        conn.close()
+
+    def load(self, bot_id, recent=10):
+        """(active goals, most recently completed goals) of one bot"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, text, category, progress, target_progress, priority, status, created_at
+            FROM bot_goals WHERE bot_id = ? AND status = 'active' ORDER BY id
+        ''', (bot_id,))
+        active = [self._goal(row) for row in cursor.fetchall()]
+        cursor.execute('''
+            SELECT id, text, category, progress, target_progress, priority, status, created_at
+            FROM bot_goals WHERE bot_id = ? AND status = 'completed' ORDER BY id DESC LIMIT ?
+        ''', (bot_id, recent))
+        completed = [self._goal(row) for row in reversed(cursor.fetchall())]
+        conn.close()
+        return active, completed
+
+    def _goal(self, row):
+        goal_id, text, category, progress, target, priority, status, created_at = row
+        try:
+            created = datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            created = datetime.now()
+        return {
+            'id': goal_id,
+            'text': text,
+            'category': category,
+            'created': created,
+            'progress': progress or 0.0,
+            'target_progress': target or 100.0,
+            'priority': priority if priority is not None else 0.5,
+            'status': status,
+        }
+
+    def add(self, bot_id, goal):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO bot_goals (bot_id, text, category, progress, target_progress, priority, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'active', ?)
+        ''', (bot_id, goal['text'], goal['category'], goal['progress'], goal['target_progress'],
+              goal['priority'], goal['created'].strftime('%Y-%m-%d %H:%M:%S')))
+        goal['id'] = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return goal['id']
+
+    def mark_dirty(self, goal):
+        if goal.get('id') is not None:
+            with self.lock:
+                self.dirty[goal['id']] = goal
+
+    def flush(self):
+        """Write every changed goal in one transaction"""
+        with self.lock:
+            goals = list(self.dirty.values())
+            self.dirty = {}
+        if not goals:
+            return 0
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            UPDATE bot_goals SET progress = ?, status = ?,
+                completed_at = CASE WHEN ? = 'completed' THEN COALESCE(completed_at, ?) ELSE completed_at END
+            WHERE id = ?
+        ''', [(goal['progress'], goal['status'], goal['status'], now, goal['id']) for goal in goals])
+        conn.commit()
+        conn.close()
+        return len(goals)
+
+
 class GoalSystem:
-    def __init__(self, bot):
+    def __init__(self, bot, store=None, bus=None):
         self.bot = bot
-        self.current_goals = []
-        self.completed_goals = []
+        self.store = store or GoalStore.for_database(bot.db_file)
+        self.bus = bus or EventBus.default()
+        self.lock = threading.RLock()
+        self.current_goals, self.completed_goals = self.store.load(bot.bot_id)
         self.goal_types = self._initialize_goal_types()
-        self.last_goal_check = datetime.now()
+        self.subscribed = set()   # event types this bot's goals are listening to
+        self._sync_subscriptions()
         
     def _initialize_goal_types(self):
         """Define different types of goals bots can pursue"""
@@ -45,24 +175,40 @@ class GoalSystem:
         }
     
     def update_goals(self):
-        """Update and manage bot's current goals"""
-        current_time = datetime.now()
-        
-        # Only check for new goals every 5 minutes
-        if (current_time - self.last_goal_check).total_seconds() < 300:
-            return
+        """Expire old goals and top up to 3 active ones; progress comes from events"""
+        with self.lock:
+            # Remove completed or expired goals
+            self._cleanup_goals()
             
-        self.last_goal_check = current_time
-        
-        # Remove completed or expired goals
-        self._cleanup_goals()
-        
-        # Add new goals based on needs and personality
-        if len(self.current_goals) < 3:  # Max 3 active goals
-            self._generate_new_goals()
-        
-        # Work on current goals
-        self._progress_goals()
+            # Add new goals based on needs and personality
+            if len(self.current_goals) < 3:  # Max 3 active goals
+                self._generate_new_goals()
+    
+    def _sync_subscriptions(self):
+        """Listen to exactly the event types the current goals can use"""
+        wanted = set()
+        for goal in self.current_goals:
+            wanted.update(GOAL_EVENTS.get(goal['category'], {}))
+        for event_type in wanted - self.subscribed:
+            self.bus.subscribe(event_type, self._on_event, bot_id=self.bot.bot_id)
+        for event_type in self.subscribed - wanted:
+            self.bus.unsubscribe(event_type, self._on_event, bot_id=self.bot.bot_id)
+        self.subscribed = wanted
+    
+    def close(self):
+        """Stop receiving events (when this bot's goal system is replaced)"""
+        with self.lock:
+            for event_type in self.subscribed:
+                self.bus.unsubscribe(event_type, self._on_event, bot_id=self.bot.bot_id)
+            self.subscribed = set()
+    
+    def _on_event(self, event):
+        """Move the goals that care about this event forward"""
+        with self.lock:
+            for goal in list(self.current_goals):
+                base = GOAL_EVENTS.get(goal['category'], {}).get(event.event_type)
+                if base and goal in self.current_goals:
+                    self._progress_goal(goal, base * self._calculate_progress(goal))
     
     def _generate_new_goals(self):
         """Generate new goals based on bot's state and personality"""
@@ -105,29 +251,30 @@ class GoalSystem:
             'created': datetime.now(),
             'progress': 0.0,
             'target_progress': 100.0,
-            'priority': random.uniform(0.5, 1.0)
+            'priority': random.uniform(0.5, 1.0),
+            'status': 'active'
         }
         
+        self.store.add(self.bot.bot_id, goal)
         self.current_goals.append(goal)
+        self._sync_subscriptions()
         
         # Add to memory
         self.bot._add_to_memory(f"Set new goal: {goal_text}", 'goal_setting')
         print(f"🎯 {self.bot.name} set goal: {goal_text}")
     
-    def _progress_goals(self):
-        """Make progress on current goals"""
-        for goal in self.current_goals:
-            # Progress based on goal category and bot's activities
-            progress_amount = self._calculate_progress(goal)
-            goal['progress'] = min(goal['target_progress'], 
-                                 goal['progress'] + progress_amount)
-            
-            # Check for completion
-            if goal['progress'] >= goal['target_progress']:
-                self._complete_goal(goal)
+    def _progress_goal(self, goal, progress_amount):
+        """Add progress to one goal and complete it when it reaches its target"""
+        goal['progress'] = min(goal['target_progress'], 
+                               goal['progress'] + progress_amount)
+        self.store.mark_dirty(goal)
+        
+        # Check for completion
+        if goal['progress'] >= goal['target_progress']:
+            self._complete_goal(goal)
     
     def _calculate_progress(self, goal):
-        """Calculate progress amount based on goal type and bot state"""
+        """Progress multiplier for one relevant event, based on goal type and bot state"""
         base_progress = 1.0
         
         # Understanding goals - benefit from high curiosity
@@ -158,6 +305,10 @@ class GoalSystem:
         """Complete a goal and reward the bot"""
         self.current_goals.remove(goal)
         self.completed_goals.append(goal)
+        self.completed_goals = self.completed_goals[-10:]
+        goal['status'] = 'completed'
+        self.store.mark_dirty(goal)
+        self._sync_subscriptions()
         
         # Reward based on goal category
         self._apply_goal_rewards(goal)
@@ -205,10 +356,12 @@ class GoalSystem:
     def _cleanup_goals(self):
         """Remove old or stuck goals"""
         current_time = datetime.now()
-        self.current_goals = [
-            goal for goal in self.current_goals 
-            if (current_time - goal['created']).days < 7  # Goals expire after 7 days
-        ]
+        for goal in self.current_goals:
+            if (current_time - goal['created']).days >= 7:  # Goals expire after 7 days
+                goal['status'] = 'expired'
+                self.store.mark_dirty(goal)
+        self.current_goals = [goal for goal in self.current_goals if goal['status'] == 'active']
+        self._sync_subscriptions()
     
     def _has_goal(self, goal_text):
         """Check if bot currently has or recently completed a goal"""
@@ -268,7 +421,8 @@ def test_goal_system():
         # Simulate some progress
         print("\n⏳ Simulating goal progress...")
         for i in range(5):
-            goal_system._progress_goals()
+            goal_system.bus.remember(jean_pierre.bot_id, 'learning', "Simulated lesson")
+            goal_system.bus.remember(jean_pierre.bot_id, 'map_travel', "Simulated trip")
             
         print("\nGoal progress:")
         for goal in goal_system.current_goals:
@@ -279,11 +433,15 @@ def test_goal_system():
         computational_goal = {
             'text': "Understand my computational nature",
             'category': 'understanding',
+            'created': datetime.now(),
             'progress': 95.0,
-            'target_progress': 100.0
+            'target_progress': 100.0,
+            'priority': 1.0,
+            'status': 'active'
         }
         goal_system.current_goals = [computational_goal]
-        goal_system._progress_goals()
+        goal_system._sync_subscriptions()
+        goal_system.bus.remember(jean_pierre.bot_id, 'learning', "Simulated lesson")
 
 if __name__ == "__main__":
     test_goal_system()
\ No newline at end of file
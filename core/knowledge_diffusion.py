@@ -0,0 +1,94 @@
+"""
+Knowledge diffusion for BotFarm
+Picks what each sharer can teach its partner with one indexed set-difference query per round
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from typing import List, Dict, Tuple
+
+from core.event_bus import EventBus, FactLearned
+from core.fact_store import FactStore
+
+# Pairs per query, well below SQLite's bound-parameter limit
+PAIR_CHUNK = 400
+
+
+class KnowledgeDiffusion:
+    """Batch planning and storage of knowledge exchanges on interned fact ids"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.facts = FactStore.for_database(db_path)
+        self.logger = logging.getLogger('knowledge_diffusion')
+
+    def plan(self, pairs: List[Tuple[int, int]]) -> Dict[Tuple[int, int], Tuple[int, str]]:
+        """(sharer_id, receiver_id) -> a random (fact_id, text) the sharer knows and the receiver doesn't
+
+        Pairs without anything to teach are left out.
+        """
+        if not pairs:
+            return {}
+
+        offers = {}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            for i in range(0, len(pairs), PAIR_CHUNK):
+                chunk = pairs[i:i + PAIR_CHUNK]
+                values = ','.join(['(?, ?)'] * len(chunk))
+                cursor.execute(f"""
+                    WITH pairs(sharer, receiver) AS (VALUES {values}),
+                    candidates AS (
+                        SELECT p.sharer, p.receiver, k.fact_id,
+                               ROW_NUMBER() OVER (PARTITION BY p.sharer, p.receiver ORDER BY random()) AS pick
+                        FROM pairs p
+                        JOIN knowledge k ON k.bot_id = p.sharer
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM knowledge r
+                            WHERE r.bot_id = p.receiver AND r.fact_id = k.fact_id
+                        )
+                    )
+                    SELECT c.sharer, c.receiver, c.fact_id, f.text
+                    FROM candidates c JOIN facts f ON f.id = c.fact_id
+                    WHERE c.pick = 1
+                """, [bot_id for pair in chunk for bot_id in pair])
+                for sharer, receiver, fact_id, text in cursor.fetchall():
+                    offers[(sharer, receiver)] = (fact_id, text)
+        finally:
+            conn.close()
+        return offers
+
+    def apply(self, lessons: List[Tuple[Tuple[int, int, str], List[Tuple[int, str, str]]]],
+              memories: List[Tuple[int, str, str]]) -> List[Tuple[int, int, str]]:
+        """Store (receiver_id, fact_id, source) transfers and (bot_id, event, event_type) memories together
+
+        lessons pairs each transfer with the memories it earns. A receiver
+        never gets the same fact twice, so a transfer that inserts nothing
+        drops its memories. Returns the transfers that were stored.
+        """
+        if not lessons and not memories:
+            return []
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        stored = []
+        rows = list(memories)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            for transfer, earned in lessons:
+                cursor.execute("INSERT OR IGNORE INTO knowledge (bot_id, fact_id, source) VALUES (?, ?, ?)",
+                               transfer)
+                if cursor.rowcount > 0:
+                    stored.append(transfer)
+                    rows.extend(earned)
+            cursor.executemany("INSERT INTO memory (bot_id, event, event_type) VALUES (?, ?, ?)",
+                               [(bot_id, f"{timestamp}: {event}", event_type) for bot_id, event, event_type in rows])
+            conn.commit()
+        finally:
+            conn.close()
+        bus = EventBus.default()
+        bus.publish_memories(rows)
+        for transfer in stored:
+            bus.publish(FactLearned(*transfer))
+        return stored
@@ -2,35 +2,37 @@
 import random
 import sqlite3
 from datetime import datetime, timedelta
+from core.relationship_graph import RelationshipGraph
+from core.skill_system import SkillRegistry
+from core.knowledge_diffusion import KnowledgeDiffusion
 
 class KnowledgeExchange:
     def __init__(self, conversation_manager):
         self.cm = conversation_manager
         self.last_exchange = {}
-        self.relationship_matrix = self._initialize_relationships()
-        
-    def _initialize_relationships(self):
-        """Initialize relationship scores between bots"""
-        relationships = {}
-        bot_names = list(self.cm.bots.keys())
-        
-        for bot1 in bot_names:
-            relationships[bot1] = {}
-            for bot2 in bot_names:
-                if bot1 == bot2:
-                    relationships[bot1][bot2] = 1.0  # Self relationship
-                else:
-                    # Start with neutral relationship
-                    relationships[bot1][bot2] = 0.5
-                    
-        return relationships
-    
+        # Sparse and persistent: history survives restarts, unknown pairs are neutral (0.5)
+        self.relationships = RelationshipGraph.for_database(self.cm.db_file)
+        self.skills = SkillRegistry.for_database(self.cm.db_file)
+        self.diffusion = KnowledgeDiffusion(self.cm.db_file)
+        self.names_by_id = {}
+        self._sync_bots()
+
+    def _sync_bots(self):
+        """Map bot ids to the manager's names and tell the graph who can be chosen"""
+        self.names_by_id = {bot.bot_id: name for name, bot in self.cm.bots.items()}
+        self.relationships.set_nodes(self.names_by_id)
+
+    def _bot_id(self, bot_name):
+        return self.cm.bots[bot_name].bot_id
+
     def initiate_knowledge_exchange(self):
         """Initiate knowledge sharing between bots"""
         current_time = datetime.now()
+        self._sync_bots()
         
         # Only initiate exchange every 15 minutes minimum
-        for bot_name in self.cm.bots.keys():
+        pairs = []
+        for bot_name in list(self.cm.active.keys()):
             last_time = self.last_exchange.get(bot_name, datetime.min)
             if (current_time - last_time).total_seconds() < 900:  # 15 minutes
                 continue
@@ -39,8 +41,10 @@ class KnowledgeExchange:
             if self._should_share_knowledge(bot_name):
                 partner = self._choose_knowledge_partner(bot_name)
                 if partner:
-                    self._perform_knowledge_exchange(bot_name, partner)
+                    pairs.append((bot_name, partner))
                     self.last_exchange[bot_name] = current_time
+
+        self._exchange_round(pairs)
     
     def _should_share_knowledge(self, bot_name):
         """Determine if a bot wants to share knowledge"""
@@ -60,126 +64,104 @@ class KnowledgeExchange:
         return random.random() < share_chance * 0.3  # Scale down probability
     
     def _choose_knowledge_partner(self, bot_name):
-        """Choose which bot to share knowledge with"""
-        potential_partners = [name for name in self.cm.bots.keys() if name != bot_name]
-        
-        if not potential_partners:
-            return None
-            
-        # Weight partners by relationship strength
-        weights = []
-        for partner in potential_partners:
-            relationship = self.relationship_matrix[bot_name][partner]
-            weights.append(relationship)
-        
-        # Normalize weights
-        total_weight = sum(weights)
-        if total_weight == 0:
-            return random.choice(potential_partners)
-            
-        normalized_weights = [w / total_weight for w in weights]
-        return random.choices(potential_partners, weights=normalized_weights)[0]
+        """Choose which bot to share knowledge with, weighted by relationship strength"""
+        partner_id = self.relationships.choose_partner(self._bot_id(bot_name))
+        return self.names_by_id.get(partner_id)
     
     def _perform_knowledge_exchange(self, sharer_name, receiver_name):
         """Perform actual knowledge exchange between two bots"""
-        sharer = self.cm.bots[sharer_name]
-        receiver = self.cm.bots[receiver_name]
-        
-        # Get knowledge that sharer has but receiver doesn't
-        sharer_knowledge = set(sharer.get_knowledge())
-        receiver_knowledge = set(receiver.get_knowledge())
-        unique_knowledge = sharer_knowledge - receiver_knowledge
-        
-        if not unique_knowledge:
-            # No unique knowledge to share
-            return False
-        
-        # Choose a piece of knowledge to share
-        knowledge_to_share = random.choice(list(unique_knowledge))
-        
-        # Determine sharing success based on relationship and skills
-        success_chance = self.relationship_matrix[sharer_name][receiver_name]
-        
-        # Communication skill affects success
-        sharer_comm_skill = self._get_skill_level(sharer, 'communication')
-        receiver_comm_skill = self._get_skill_level(receiver, 'communication')
-        
-        success_chance += (sharer_comm_skill + receiver_comm_skill - 2) * 0.1  # Skill bonus
-        
-        if random.random() < success_chance:
-            # Successful knowledge transfer!
-            receiver.add_knowledge(knowledge_to_share)
-            
+        return self._exchange_round([(sharer_name, receiver_name)]).get((sharer_name, receiver_name), False)
+
+    def _exchange_round(self, pairs):
+        """Run every (sharer, receiver) exchange of a round
+
+        One query picks what each sharer can teach (fact ids the receiver
+        lacks), one transaction stores the new knowledge and memories.
+        """
+        if not pairs:
+            return {}
+        pair_ids = [(self._bot_id(sharer), self._bot_id(receiver)) for sharer, receiver in pairs]
+        offers = self.diffusion.plan(pair_ids)
+
+        results = {}
+        lessons = []
+        successes = {}
+        memories = []
+        for (sharer_name, receiver_name), (sharer_id, receiver_id) in zip(pairs, pair_ids):
+            offer = offers.get((sharer_id, receiver_id))
+            if offer is None or (receiver_id, offer[0], 'bot') in successes:
+                # No unique knowledge to share (or another sharer already teaches it this round)
+                results[(sharer_name, receiver_name)] = False
+                continue
+            fact_id, knowledge_to_share = offer
+            sharer = self.cm.bots[sharer_name]
+            receiver = self.cm.bots[receiver_name]
+
+            # Determine sharing success based on relationship and skills
+            success_chance = self.relationships.score(sharer_id, receiver_id)
+
+            # Communication skill affects success
+            sharer_comm_skill = self._get_skill_level(sharer, 'communication')
+            receiver_comm_skill = self._get_skill_level(receiver, 'communication')
+
+            success_chance += (sharer_comm_skill + receiver_comm_skill - 2) * 0.1  # Skill bonus
+
+            if random.random() < success_chance:
+                # Successful knowledge transfer, rewarded once it is stored
+                transfer = (receiver_id, fact_id, 'bot')
+                successes[transfer] = (sharer_name, receiver_name)
+                lessons.append((transfer, self._log_successful_exchange(sharer_name, receiver_name, knowledge_to_share)))
+            else:
+                # Failed exchange - small relationship penalty
+                self.relationships.adjust(sharer_id, receiver_id, -0.05)
+
+                memories.extend(self._log_failed_exchange(sharer_name, receiver_name))
+                results[(sharer_name, receiver_name)] = False
+
+        stored = set(self.diffusion.apply(lessons, memories))
+        for transfer, (sharer_name, receiver_name) in successes.items():
+            learned = transfer in stored
+            results[(sharer_name, receiver_name)] = learned
+            if not learned:
+                continue  # Another process taught it first
+
             # Improve relationship
-            self.relationship_matrix[sharer_name][receiver_name] = min(1.0, 
-                self.relationship_matrix[sharer_name][receiver_name] + 0.1)
-            self.relationship_matrix[receiver_name][sharer_name] = min(1.0,
-                self.relationship_matrix[receiver_name][sharer_name] + 0.1)
-            
-            # Log the exchange
-            self._log_successful_exchange(sharer_name, receiver_name, knowledge_to_share)
-            
+            self.relationships.adjust_pair(self._bot_id(sharer_name), transfer[0], 0.1)
+
             # Gain experience
-            self._award_experience(sharer, 'communication')
-            self._award_experience(receiver, 'communication')
-            
-            return True
-        else:
-            # Failed exchange - small relationship penalty
-            self.relationship_matrix[sharer_name][receiver_name] = max(0.0,
-                self.relationship_matrix[sharer_name][receiver_name] - 0.05)
-            
-            self._log_failed_exchange(sharer_name, receiver_name)
-            return False
+            self._award_experience(self.cm.bots[sharer_name], 'communication')
+            self._award_experience(self.cm.bots[receiver_name], 'communication')
+
+        self.relationships.flush()
+        self.skills.flush()
+        return results
     
     def _get_skill_level(self, bot, skill_name):
-        """Get bot's skill level (compatibility with skill system)"""
-        try:
-            # If skill system is available, use it
-            from core.skill_system import SkillSystem
-            skill_system = SkillSystem(bot)
-            skills = skill_system.skills
-            return skills.get(skill_name, {}).get('level', 1)
-        except:
-            return 1  # Default level
+        """Get bot's skill level from its shared skill system"""
+        return self.skills.get(bot).skills.get(skill_name, {}).get('level', 1)
     
     def _award_experience(self, bot, skill_name):
         """Award experience for successful interactions"""
-        try:
-            from core.skill_system import SkillSystem
-            skill_system = SkillSystem(bot)
-            skill_system.update_skills('conversation', effectiveness=1.0)
-        except:
-            pass  # Skill system might not be available
+        self.skills.get(bot).update_skills('conversation', effectiveness=1.0)
     
     def _log_successful_exchange(self, sharer, receiver, knowledge):
-        """Log a successful knowledge exchange"""
+        """Log a successful knowledge exchange; returns the memory rows of both bots
+        (the receiver's 'learning' row is the one PrehistoricBotDB.add_knowledge writes)"""
         knowledge_preview = knowledge[:50] + "..." if len(knowledge) > 50 else knowledge
         
         print(f"🤝 {sharer} → {receiver}: Shared knowledge - '{knowledge_preview}'")
         
-        # Add to both bots' memories
-        sharer_bot = self.cm.bots[sharer]
-        receiver_bot = self.cm.bots[receiver]
-        
-        sharer_bot._add_to_memory(
-            f"Successfully taught {receiver} about: {knowledge_preview}", 
-            'knowledge_sharing'
-        )
-        receiver_bot._add_to_memory(
-            f"Learned from {sharer}: {knowledge_preview}", 
-            'knowledge_learning'
-        )
+        return [
+            (self._bot_id(sharer), f"Successfully taught {receiver} about: {knowledge_preview}", 'knowledge_sharing'),
+            (self._bot_id(receiver), f"Learned from {sharer}: {knowledge_preview}", 'knowledge_learning'),
+            (self._bot_id(receiver), f"Learned new fact from bot: {knowledge}", 'learning')
+        ]
     
     def _log_failed_exchange(self, sharer, receiver):
-        """Log a failed knowledge exchange"""
+        """Log a failed knowledge exchange; returns the sharer's memory row"""
         print(f"💔 {sharer} tried to share with {receiver} but failed to communicate effectively")
         
-        sharer_bot = self.cm.bots[sharer]
-        sharer_bot._add_to_memory(
-            f"Failed to explain concept to {receiver}", 
-            'communication_failure'
-        )
+        return [(self._bot_id(sharer), f"Failed to explain concept to {receiver}", 'communication_failure')]
     
     def initiate_collaboration(self):
         """Initiate collaborative problem solving between bots"""
@@ -196,10 +178,11 @@ class KnowledgeExchange:
             bot1, bot2 = participants
             self._perform_collaboration(bot1, bot2)
             self.last_collaboration = current_time
+            self.relationships.flush()
     
     def _choose_collaboration_pair(self):
         """Choose two bots that would work well together"""
-        bot_names = list(self.cm.bots.keys())
+        bot_names = list(self.cm.active.keys())
         
         if len(bot_names) < 2:
             return None
@@ -222,13 +205,8 @@ class KnowledgeExchange:
         return random.sample(bot_names, 2)
     
     def _get_best_skills(self, bot):
-        """Get bot's best skills (compatibility method)"""
-        try:
-            from core.skill_system import SkillSystem
-            skill_system = SkillSystem(bot)
-            return skill_system.get_best_skills(1)
-        except:
-            return [('general', 1)]
+        """Get bot's best skills"""
+        return self.skills.get(bot).get_best_skills(1) or [('general', 1)]
     
     def _perform_collaboration(self, bot1_name, bot2_name):
         """Perform collaborative problem solving"""
@@ -255,10 +233,7 @@ class KnowledgeExchange:
         bot2._update_need('curiosity', 8)
         
         # Improve relationship
-        self.relationship_matrix[bot1_name][bot2_name] = min(1.0,
-            self.relationship_matrix[bot1_name][bot2_name] + 0.15)
-        self.relationship_matrix[bot2_name][bot1_name] = min(1.0,
-            self.relationship_matrix[bot2_name][bot1_name] + 0.15)
+        self.relationships.adjust_pair(bot1.bot_id, bot2.bot_id, 0.15)
         
         # Generate collaborative insight
         insight = self._generate_collaborative_insight(bot1_name, bot2_name, topic)
@@ -281,20 +256,21 @@ class KnowledgeExchange:
         return insights.get(topic, "Collaboration enhances understanding through shared perspectives")
     
     def get_relationship_report(self):
-        """Generate a report on bot relationships"""
+        """Generate a report on bot relationships (pairs still at neutral are only counted)"""
         report = ["🤝 Relationship Matrix:"]
-        bot_names = list(self.cm.bots.keys())
+        self._sync_bots()
         
-        for bot1 in bot_names:
+        for bot1, bot in self.cm.bots.items():
             relationships = []
-            for bot2 in bot_names:
-                if bot1 != bot2:
-                    score = self.relationship_matrix[bot1][bot2]
-                    status = "❤️" if score > 0.8 else "👍" if score > 0.6 else "🤝" if score > 0.4 else "👋"
-                    relationships.append(f"{bot2} {status}")
+            for other_id, score in sorted(self.relationships.neighbours(bot.bot_id).items()):
+                if other_id == bot.bot_id or other_id not in self.names_by_id:
+                    continue
+                status = "❤️" if score > 0.8 else "👍" if score > 0.6 else "🤝" if score > 0.4 else "👋"
+                relationships.append(f"{self.names_by_id[other_id]} {status}")
             
+            neutral = len(self.names_by_id) - 1 - len(relationships)
             if relationships:
-                report.append(f"  {bot1}: {', '.join(relationships)}")
+                report.append(f"  {bot1}: {', '.join(relationships)}" + (f" (+{neutral} neutral)" if neutral > 0 else ""))
         
         return "\n".join(report)
 
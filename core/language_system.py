@@ -1,47 +1,222 @@
 import random
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+from core.ngram_model import NGramModel
+
+class CompiledTemplate:
+    """A grammar pattern split once into literal text and {slot} names
+
+    Slots without a value render back as '{slot}', like the old
+    str.replace passes did.
+    """
+    __slots__ = ('pattern', 'parts', 'slots')
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.parts = []      # literal strings, with slot names at odd positions
+        self.slots = []
+
+        rest = pattern
+        while True:
+            start = rest.find('{')
+            end = rest.find('}', start + 1) if start != -1 else -1
+            if end == -1:
+                self.parts.append(rest)
+                break
+            self.parts.append(rest[:start])
+            self.parts.append(rest[start + 1:end])
+            self.slots.append(rest[start + 1:end])
+            rest = rest[end + 1:]
+
+    def render(self, values):
+        parts = self.parts
+        out = [parts[0]]
+        for i in range(1, len(parts), 2):
+            slot = parts[i]
+            out.append(values[slot] if slot in values else '{' + slot + '}')
+            out.append(parts[i + 1])
+        return ''.join(out)
+
+
 class LanguageSystem:
-    def __init__(self, db_path):
+    # Word/pattern pools and bot names, shared by every instance on the same database
+    _shared_caches = {}
+    _shared_lock = threading.Lock()
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path):
+        """One LanguageSystem per database, shared by every bot"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path, state_ttl_seconds=60, ngram_share=0.5):
         self.db_path = db_path
-        self.cache = {}
+        self.state_ttl_seconds = state_ttl_seconds
+        self.ngram_share = ngram_share    # free-form lines drawn from the n-gram model once trained
+        with LanguageSystem._shared_lock:
+            self.cache = LanguageSystem._shared_caches.setdefault(db_path, {})
+
+    def invalidate(self, section=None):
+        """Drop cached pools ('vocabulary', 'patterns', 'bot_names') or everything"""
+        if section is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(section, None)
+
+    def _vocabulary(self):
+        """Vocabulary indexed by subcategory, category and (category, emotional_tone)"""
+        if 'vocabulary' not in self.cache:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute('SELECT word, category, subcategory, emotional_tone FROM vocabulary').fetchall()
+            conn.close()
+
+            pools = {'by_subcategory': {}, 'by_category': {}, 'by_category_tone': {}, 'words': set()}
+            for row in rows:
+                self._index_word(pools, *row)
+            self.cache['vocabulary'] = pools
+        return self.cache['vocabulary']
+
+    def _index_word(self, pools, word, category, subcategory, emotional_tone):
+        pools['by_subcategory'].setdefault(subcategory, []).append(word)
+        pools['by_category'].setdefault(category, []).append(word)
+        pools['by_category_tone'].setdefault((category, emotional_tone), []).append(word)
+        pools['words'].add(word)
+
+    def _patterns(self):
+        """Grammar patterns grouped by pattern_type ('all' holds every pattern)"""
+        if 'patterns' not in self.cache:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute('SELECT pattern, pattern_type FROM grammar_patterns').fetchall()
+            conn.close()
+
+            patterns = {'all': []}
+            for pattern, pattern_type in rows:
+                patterns.setdefault(pattern_type, []).append(pattern)
+                patterns['all'].append(pattern)
+            self.cache['patterns'] = patterns
+        return self.cache['patterns']
+
+    def _bot_name(self, bot_id):
+        """Bot names never change: load them all once, look up misses individually"""
+        names = self.cache.get('bot_names')
+        if names is None:
+            conn = sqlite3.connect(self.db_path)
+            names = dict(conn.execute('SELECT id, name FROM bots').fetchall())
+            conn.close()
+            self.cache['bot_names'] = names
+
+        if bot_id not in names:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute('SELECT name FROM bots WHERE id = ?', (bot_id,)).fetchone()
+            conn.close()
+            names[bot_id] = row[0] if row else f"bot{bot_id}"
+        return names[bot_id]
+
+    def _random_word(self, index, key):
+        words = self._vocabulary()[index].get(key)
+        return random.choice(words) if words else None
+
+    def _bot_states(self, bot_ids):
+        """Mood and knowledge subjects per bot, refreshed at most every state_ttl_seconds
+
+        Every stale bot in the batch is reloaded with the same two queries.
+        """
+        states = self.cache.setdefault('bot_state', {})
+        now = time.time()
+        stale = list({bot_id for bot_id in bot_ids
+                      if bot_id not in states or states[bot_id]['expires'] <= now})
+
+        if stale:
+            placeholders = ','.join('?' * len(stale))
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(f'''
+                SELECT bot_id, need_name, value FROM needs
+                WHERE need_name IN ('energy', 'social') AND bot_id IN ({placeholders})
+            ''', stale)
+            needs = {}
+            for bot_id, need_name, value in cursor.fetchall():
+                needs.setdefault(bot_id, {})[need_name] = value
+
+            cursor.execute(f'''
+                SELECT bot_id, subject FROM (
+                    SELECT bot_id, subject, ROW_NUMBER() OVER (
+                        PARTITION BY bot_id ORDER BY confidence DESC, learned_at DESC
+                    ) AS rank
+                    FROM knowledge WHERE bot_id IN ({placeholders})
+                ) WHERE rank <= 10
+            ''', stale)
+            subjects = {}
+            for bot_id, subject in cursor.fetchall():
+                subjects.setdefault(bot_id, []).append(subject)
+            conn.close()
+
+            for bot_id in stale:
+                states[bot_id] = {
+                    'mood': self._mood_from_needs(needs.get(bot_id, {})),
+                    'subjects': subjects.get(bot_id, []),
+                    'expires': now + self.state_ttl_seconds
+                }
+
+        return {bot_id: states[bot_id] for bot_id in bot_ids}
     
     def generate_sentence(self, bot_id, context=None):
         """
         Generate a sentence for a bot based on its knowledge and context
         context = {'interaction_type': 'greeting', 'other_bot_id': 2, 'location': (x,y)}
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return self.generate_sentences([(bot_id, context)])[0]
         
-        # Get bot's personality/mood
-        mood = self._get_bot_mood(bot_id, cursor)
+    def generate_sentences(self, batch):
+        """Generate one sentence per (bot_id, context) pair from a single state snapshot"""
+        states = self._bot_states([bot_id for bot_id, _ in batch])
         
-        # Choose sentence pattern based on context
-        pattern = self._choose_pattern(context, mood, cursor)
+        model = self.language_model()
         
-        # Fill pattern with words from bot's knowledge
-        sentence = self._fill_pattern(pattern, bot_id, context, mood, cursor)
+        sentences = []
+        for bot_id, context in batch:
+            state = states[bot_id]
         
-        conn.close()
-        return sentence
+            # Free-form lines can come from what the bots heard on IRC
+            if model.is_trained and self._is_free_form(context) and random.random() < self.ngram_share:
+                line = model.generate(bot_id)
+                if line:
+                    sentences.append(line[0].upper() + line[1:])
+                    continue
     
-    def _get_bot_mood(self, bot_id, cursor):
-        """Determine bot's current emotional state"""
-        # Check bot's needs
-        cursor.execute('SELECT value FROM needs WHERE need_name = "energy" AND bot_id = ?', (bot_id,))
-        energy_needs = cursor.fetchone()
+            # Choose sentence pattern based on context
+            template = self._compile(self._choose_pattern(context, state['mood']))
 
-        cursor.execute('SELECT value FROM needs WHERE need_name = "social" AND bot_id = ?', (bot_id,))
-        social_needs = cursor.fetchone()
+            # Fill pattern with words from bot's knowledge
+            sentences.append(self._fill_pattern(template, bot_id, context, state))
+        return sentences
         
+    def language_model(self):
+        """N-gram model shared by every LanguageSystem on this database"""
+        model = self.cache.get('ngram_model')
+        if model is None:
+            model = self.cache['ngram_model'] = NGramModel.for_database(self.db_path)
+        return model
+
+    def _is_free_form(self, context):
+        return not context or context.get('interaction_type') in (None, 'chat')
+
+    def _mood_from_needs(self, needs):
+        """Determine bot's current emotional state from its energy and social needs"""
         mood = 'neutral'
-        if energy_needs:
-            energy = energy_needs[0]
+        if 'energy' in needs:
+            energy = needs['energy']
             if energy < 20:
                 mood = 'negative'
-            elif social_needs[0] > 80:
+            elif needs.get('social', 0) > 80:
                 mood = 'positive'
             
             # Check recent events
@@ -56,7 +231,15 @@ class LanguageSystem:
         
         return mood
     
-    def _choose_pattern(self, context, mood, cursor):
+    def _compile(self, pattern):
+        """Parse a pattern once into a CompiledTemplate (cached per pattern string)"""
+        templates = self.cache.setdefault('templates', {})
+        template = templates.get(pattern)
+        if template is None:
+            template = templates[pattern] = CompiledTemplate(pattern)
+        return template
+
+    def _choose_pattern(self, context, mood):
         """Select appropriate grammar pattern"""
         if context and context.get('interaction_type'):
             interaction = context['interaction_type']
@@ -69,87 +252,52 @@ class LanguageSystem:
                 return random.choice(patterns)
         
         # Random pattern based on mood
+        patterns = self._patterns()
         if mood == 'positive':
-            cursor.execute(
-                "SELECT pattern FROM grammar_patterns WHERE pattern_type = 'statement' ORDER BY RANDOM() LIMIT 1"
-            )
+            candidates = patterns.get('statement')
         elif mood == 'negative':
-            cursor.execute(
-                "SELECT pattern FROM grammar_patterns WHERE pattern_type = 'exclamation' ORDER BY RANDOM() LIMIT 1"
-            )
+            candidates = patterns.get('exclamation')
         else:
-            cursor.execute("SELECT pattern FROM grammar_patterns ORDER BY RANDOM() LIMIT 1")
+            candidates = patterns['all']
         
-        result = cursor.fetchone()
-        return result[0] if result else "{subject} {verb} {object}"
+        return random.choice(candidates) if candidates else "{subject} {verb} {object}"
     
-    def _fill_pattern(self, pattern, bot_id, context, mood, cursor):
-        """Replace placeholders with actual words"""
-        # Get bot's knowledge
-        cursor.execute('''
-            SELECT knowledge_type, subject, fact 
-            FROM knowledge 
-            WHERE bot_id = ? 
-            ORDER BY confidence DESC, learned_at DESC 
-            LIMIT 10
-        ''', (bot_id,))
-        knowledge = cursor.fetchall()
-        
-        # Available replacements
-        replacements = {}
-        
-        # Subject (usually "I" or bot's name)
-        cursor.execute('SELECT name FROM bots WHERE id = ?', (bot_id,))
-        bot_name = cursor.fetchone()[0]
-        replacements['subject'] = 'I'
-        replacements['{bot_name}'] = bot_name
-        
-        # Other bot if in conversation
-        if context and 'other_bot_id' in context:
-            cursor.execute('SELECT name FROM bots WHERE id = ?', (context['other_bot_id'],))
-            other_name = cursor.fetchone()[0]
-            replacements['other'] = other_name
-        
-        # Get words from vocabulary based on knowledge
-        for _, subject, fact in knowledge:
-            if subject in ['food', 'item', 'location']:
-                # Find related words
-                cursor.execute(
-                    "SELECT word FROM vocabulary WHERE subcategory = ? ORDER BY RANDOM() LIMIT 1",
-                    (subject,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    replacements[subject] = result[0]
+    def _fill_pattern(self, template, bot_id, context, state):
+        """Resolve the template's slots to words"""
+        mood = state['mood']
+        values = {}
         
-        # Fill in missing slots with random appropriate words
-        if '{verb}' in pattern and 'verb' not in replacements:
-            cursor.execute(
-                "SELECT word FROM vocabulary WHERE category = 'verb' AND emotional_tone = ? ORDER BY RANDOM() LIMIT 1",
-                (mood,)
-            )
-            result = cursor.fetchone()
-            replacements['verb'] = result[0] if result else 'go'
+        for slot in template.slots:
+            if slot in values:
+                continue
         
-        if '{object}' in pattern and 'object' not in replacements:
-            cursor.execute(
-                "SELECT word FROM vocabulary WHERE category = 'noun' ORDER BY RANDOM() LIMIT 1"
-            )
-            result = cursor.fetchone()
-            replacements['object'] = result[0] if result else 'food'
+            # Subject (usually "I" or bot's name)
+            if slot == 'subject':
+                values[slot] = 'I'
+            elif slot == 'bot_name':
+                values[slot] = self._bot_name(bot_id)
         
-        if '{adjective}' in pattern and 'adjective' not in replacements:
-            cursor.execute(
-                "SELECT word FROM vocabulary WHERE category = 'adjective' AND emotional_tone = ? ORDER BY RANDOM() LIMIT 1",
-                (mood,)
-            )
-            result = cursor.fetchone()
-            replacements['adjective'] = result[0] if result else 'good'
+            # Other bot if in conversation
+            elif slot == 'other':
+                if context and 'other_bot_id' in context:
+                    values[slot] = self._bot_name(context['other_bot_id'])
         
-        # Apply replacements
-        sentence = pattern
-        for placeholder, fact in replacements.items():
-            sentence = sentence.replace(f'{{{placeholder}}}', fact)
+            # Words from vocabulary based on knowledge
+            elif slot in ('food', 'item', 'location'):
+                if slot in state['subjects']:
+                    word = self._random_word('by_subcategory', slot)
+                    if word:
+                        values[slot] = word
+        
+            # Fill in missing slots with random appropriate words
+            elif slot == 'verb':
+                values[slot] = self._random_word('by_category_tone', ('verb', mood)) or 'go'
+            elif slot == 'object':
+                values[slot] = self._random_word('by_category', 'noun') or 'food'
+            elif slot == 'adjective':
+                values[slot] = self._random_word('by_category_tone', ('adjective', mood)) or 'good'
+        
+        sentence = template.render(values)
         
         # Capitalize first letter
         return sentence[0].upper() + sentence[1:] if sentence else "Hello."
@@ -173,6 +321,13 @@ class LanguageSystem:
                     "INSERT INTO vocabulary (word, category, subcategory) VALUES (?, ?, ?)",
                     (item, 'noun', 'item')
                 )
+                # Keep the cached pools in step with the table, tone default included
+                if 'vocabulary' in self.cache:
+                    cursor.execute(
+                        "SELECT word, category, subcategory, emotional_tone FROM vocabulary WHERE id = ?",
+                        (cursor.lastrowid,)
+                    )
+                    self._index_word(self.cache['vocabulary'], *cursor.fetchone())
         
         elif interaction_type == 'visited_location':
             location_type = details.get('location_type')
@@ -183,3 +338,6 @@ class LanguageSystem:
         
         conn.commit()
         conn.close()
+
+        # New knowledge changes which words this bot reaches for
+        self.cache.get('bot_state', {}).pop(bot_id, None)
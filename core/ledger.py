@@ -0,0 +1,554 @@
+"""
+Ledger engine for BotFarm
+In-memory balances backed by a write-ahead journal and atomic batched postings
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from typing import Callable, List, Dict, Optional, Iterable, Set
+
+from core.event_bus import EventBus, CurrencyPosted
+
+# Settled journal rows are deleted after this many journaled batches
+JOURNAL_PRUNE_EVERY = 500
+
+
+def posting(from_bot: Optional[int], to_bot: Optional[int], amount: float,
+            transaction_type: str = "transfer", reason: str = "",
+            fee: float = 0.0, floor: Optional[float] = None) -> Dict:
+    """Build a ledger posting
+
+    from_bot=None mints money (system rewards), to_bot=None burns it
+    (upkeep, airport fees). The receiver is credited amount - fee. floor
+    overrides the lowest balance the payer may be left with.
+    """
+    return {
+        'from_bot': from_bot,
+        'to_bot': to_bot,
+        'amount': amount,
+        'transaction_type': transaction_type,
+        'reason': reason,
+        'fee': fee,
+        'floor': floor
+    }
+
+
+def apply_posting(working: Dict[int, float], entry: Dict, min_balance: float) -> bool:
+    """Validate a posting against working balances and apply it in place
+
+    The payer (or, for a negative system award, the receiver) may not end
+    below the posting's floor, defaulting to min_balance.
+    """
+    amount = entry['amount']
+    payer = entry['from_bot']
+
+    if payer is not None and payer == entry['to_bot']:
+        return False
+
+    # A negative system award is a debit of the receiver
+    debtor, debit = (payer, amount) if payer is not None else (entry['to_bot'], -amount)
+
+    if debtor is not None and debit > 0:
+        floor = entry.get('floor')
+        floor = min_balance if floor is None else floor
+        if working[debtor] - debit < floor:
+            return False
+
+    if payer is not None:
+        working[payer] -= amount
+    if entry['to_bot'] is not None:
+        working[entry['to_bot']] += amount - entry.get('fee', 0.0)
+    return True
+
+
+class LedgerEngine:
+    """Single source of truth for bot balances, shared per database file"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str, config: Dict) -> 'LedgerEngine':
+        """Return the process-wide ledger for a database, creating it once"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path, config)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path: str, config: Dict):
+        self.db_path = db_path
+        self.config = config
+        self.logger = logging.getLogger('ledger')
+        self.lock = threading.RLock()
+        self.balances = {}
+        self._loaded = False
+        self._journaled = 0
+
+        # Running aggregates, advanced by every committed posting
+        self.total_currency = 0.0
+        self.active_listings = 0
+        self.total_transactions = 0
+        self.transactions_by_type = {}
+        self.volume_by_type = {}
+        self.inflow = {}
+        self.outflow = {}
+        self.last_transaction_id = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.isolation_level = None  # Explicit BEGIN/COMMIT
+        return conn
+
+    def initialize(self):
+        """Create the journal table, load balances and replay unapplied batches"""
+        with self.lock:
+            if self._loaded:
+                return
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.execute("""CREATE TABLE IF NOT EXISTS ledger_journal (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        postings TEXT NOT NULL,
+                        all_or_nothing INTEGER DEFAULT 1,
+                        status TEXT DEFAULT 'pending',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )""")
+                    conn.execute("""CREATE TABLE IF NOT EXISTS settlement_runs (
+                        period INTEGER PRIMARY KEY,
+                        bots_settled INTEGER DEFAULT 0,
+                        income_total REAL DEFAULT 0,
+                        upkeep_total REAL DEFAULT 0,
+                        upkeep_failed INTEGER DEFAULT 0,
+                        settled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )""")
+                    columns = [row[1] for row in conn.execute("PRAGMA table_info(bot_currency)")]
+                    if 'settled_period' not in columns:
+                        conn.execute("ALTER TABLE bot_currency ADD COLUMN settled_period INTEGER")
+                        # Bots paid under the old last_income check count as settled for that period
+                        conn.execute("""
+                            UPDATE bot_currency
+                            SET settled_period = CAST(strftime('%s', last_income) AS INTEGER) / ?
+                            WHERE last_income IS NOT NULL
+                        """, (int(self.config['income_interval_hours'] * 3600),))
+                with sqlite3.connect(self.db_path) as conn:
+                    self._reload_balances(conn.cursor())
+                    # Kept current from here on by the order book
+                    self.active_listings = conn.execute(
+                        "SELECT COUNT(*) FROM market_listings WHERE status = 'active'"
+                    ).fetchone()[0]
+                self._load_aggregates()
+                self._loaded = True
+                self._replay_pending()
+            except sqlite3.Error as e:
+                self.logger.error(f"Ledger initialization error: {e}")
+
+    def refresh(self):
+        """Pick up postings made by other processes: fold their transaction rows
+        and reload only the accounts they touched"""
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    self._reload_balances(cursor, self._fold_transactions(cursor))
+            except sqlite3.Error as e:
+                self.logger.error(f"Ledger refresh error: {e}")
+
+    def _reload_balances(self, cursor, bot_ids: Optional[Set[int]] = None):
+        """Re-read balances from bot_currency: the given accounts, or all of them"""
+        if bot_ids is None:
+            cursor.execute("SELECT bot_id, balance FROM bot_currency")
+            self.balances = dict(cursor.fetchall())
+            self.total_currency = sum(self.balances.values())
+            return
+
+        bot_ids = list(bot_ids)
+        for start in range(0, len(bot_ids), 500):
+            chunk = bot_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT bot_id, balance FROM bot_currency WHERE bot_id IN ({placeholders})", chunk)
+            for bot_id, balance in cursor.fetchall():
+                self.total_currency += balance - self.balances.get(bot_id, 0.0)
+                self.balances[bot_id] = balance
+
+    def _load_aggregates(self):
+        """One-off scan of the transaction log when the ledger starts"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions")
+            self.last_transaction_id = cursor.fetchone()[0]
+
+            cursor.execute("""
+                SELECT transaction_type, COUNT(*), SUM(ABS(amount)) FROM transactions
+                WHERE status = 'completed' AND id <= ?
+                GROUP BY transaction_type
+            """, (self.last_transaction_id,))
+            for transaction_type, count, volume in cursor.fetchall():
+                self.transactions_by_type[transaction_type] = count
+                self.volume_by_type[transaction_type] = volume or 0.0
+            self.total_transactions = sum(self.transactions_by_type.values())
+
+            cursor.execute("""
+                SELECT bot_id, SUM(inflow), SUM(outflow) FROM (
+                    SELECT to_bot AS bot_id, MAX(amount, 0) AS inflow, MAX(-amount, 0) AS outflow
+                    FROM transactions WHERE status = 'completed' AND to_bot IS NOT NULL AND id <= ?
+                    UNION ALL
+                    SELECT from_bot, 0, amount
+                    FROM transactions WHERE status = 'completed' AND from_bot IS NOT NULL AND id <= ?
+                ) GROUP BY bot_id
+            """, (self.last_transaction_id, self.last_transaction_id))
+            for bot_id, inflow, outflow in cursor.fetchall():
+                self.inflow[bot_id] = inflow or 0.0
+                self.outflow[bot_id] = outflow or 0.0
+
+    def _fold_transactions(self, cursor) -> Set[int]:
+        """Advance the aggregates over transaction rows newer than the last one seen;
+        returns the accounts those rows touched"""
+        cursor.execute("""
+            SELECT id, from_bot, to_bot, amount, transaction_type, status
+            FROM transactions WHERE id > ? ORDER BY id
+        """, (self.last_transaction_id,))
+
+        touched = set()
+        for row_id, from_bot, to_bot, amount, transaction_type, status in cursor.fetchall():
+            self.last_transaction_id = row_id
+            touched.update(bot_id for bot_id in (from_bot, to_bot) if bot_id is not None)
+            if status != 'completed':
+                continue
+
+            self.total_transactions += 1
+            self.transactions_by_type[transaction_type] = self.transactions_by_type.get(transaction_type, 0) + 1
+            self.volume_by_type[transaction_type] = self.volume_by_type.get(transaction_type, 0.0) + abs(amount)
+
+            # Gross flows; a negative system award is an outflow of the receiver
+            if from_bot is not None:
+                self.outflow[from_bot] = self.outflow.get(from_bot, 0.0) + amount
+            if to_bot is not None:
+                if amount >= 0:
+                    self.inflow[to_bot] = self.inflow.get(to_bot, 0.0) + amount
+                else:
+                    self.outflow[to_bot] = self.outflow.get(to_bot, 0.0) - amount
+        return touched
+
+    def get_stats(self) -> Dict:
+        """Economic aggregates, read from memory"""
+        self.initialize()
+        with self.lock:
+            total_bots = len(self.balances)
+            return {
+                'total_bots': total_bots,
+                'total_currency': self.total_currency,
+                'average_balance': self.total_currency / (total_bots or 1),
+                'total_transactions': self.total_transactions,
+                'active_listings': self.active_listings,
+                'transactions_by_type': dict(self.transactions_by_type),
+                'volume_by_type': dict(self.volume_by_type)
+            }
+
+    def get_flows(self, bot_id: int) -> Dict[str, float]:
+        """Gross currency that has flowed into and out of a bot"""
+        self.initialize()
+        return {
+            'inflow': self.inflow.get(bot_id, 0.0),
+            'outflow': self.outflow.get(bot_id, 0.0)
+        }
+
+    def get_balance(self, bot_id: int) -> float:
+        """Balance of one bot from memory"""
+        self.initialize()
+        return self.balances.get(bot_id, self.config['starting_balance'])
+
+    def get_balances(self, bot_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """Balances for many bots (all known accounts if bot_ids is None)"""
+        self.initialize()
+        with self.lock:
+            if bot_ids is None:
+                return dict(self.balances)
+            default = self.config['starting_balance']
+            return {bot_id: self.balances.get(bot_id, default) for bot_id in bot_ids}
+
+    def post(self, entry: Dict, writes: Optional[Callable] = None) -> bool:
+        """Apply a single posting"""
+        return self.post_batch([entry], writes=writes)[0]
+
+    def post_batch(self, postings: List[Dict], all_or_nothing: bool = True,
+                   writes: Optional[Callable] = None) -> List[bool]:
+        """Apply postings in one transaction after journaling them
+
+        all_or_nothing=True rejects the whole batch if any posting would
+        take a payer below its floor; otherwise only offending postings
+        are rejected (and logged as failed transactions).
+
+        writes(cursor) runs inside the same transaction once the postings
+        are validated; returning False rolls the whole batch back. Such
+        batches skip the write-ahead journal, since a replay could not
+        redo their writes.
+        """
+        if not postings:
+            return []
+
+        self.initialize()
+        with self.lock:
+            journal_id = None
+            try:
+                journal_id = self._journal(postings, all_or_nothing) if writes is None else None
+                results = self._apply(journal_id, postings, all_or_nothing, writes)
+            except sqlite3.Error as e:
+                self.logger.error(f"Ledger posting error: {e}")
+                if journal_id is not None:
+                    # The caller is told it failed: never replay it later
+                    try:
+                        self._mark_journal(journal_id, 'failed')
+                    except sqlite3.Error as mark_error:
+                        self.logger.error(f"Could not mark ledger batch {journal_id} failed: {mark_error}")
+                return [False] * len(postings)
+
+            if journal_id is not None:
+                self._journaled += 1
+                if self._journaled % JOURNAL_PRUNE_EVERY == 0:
+                    self.prune_journal()
+            return results
+
+    def _journal(self, postings: List[Dict], all_or_nothing: bool) -> int:
+        """Write-ahead: persist the batch before touching any balance"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.execute(
+                "INSERT INTO ledger_journal (postings, all_or_nothing) VALUES (?, ?)",
+                (json.dumps(postings), int(all_or_nothing))
+            )
+            journal_id = cursor.lastrowid
+            cursor.execute("COMMIT")
+            return journal_id
+        finally:
+            conn.close()
+
+    def _apply(self, journal_id: Optional[int], postings: List[Dict], all_or_nothing: bool,
+               writes: Optional[Callable] = None) -> List[bool]:
+        """Validate and apply a journaled batch atomically"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            if journal_id is not None:
+                # Claim the batch: another process (or an earlier attempt) may have settled it already
+                cursor.execute("UPDATE ledger_journal SET status = 'applied' WHERE id = ? AND status = 'pending'",
+                               (journal_id,))
+                if cursor.rowcount == 0:
+                    cursor.execute("ROLLBACK")
+                    self.logger.info(f"Ledger batch {journal_id} is no longer pending, skipped")
+                    return [False] * len(postings)
+
+            accounts = {p[side] for p in postings for side in ('from_bot', 'to_bot')
+                        if p[side] is not None}
+            starting = self.config['starting_balance']
+            cursor.executemany(
+                "INSERT OR IGNORE INTO bot_currency (bot_id, balance) VALUES (?, ?)",
+                [(bot_id, starting) for bot_id in accounts]
+            )
+
+            # Validate against the database, not memory, so other writers are respected
+            placeholders = ",".join("?" * len(accounts))
+            cursor.execute(
+                f"SELECT bot_id, balance FROM bot_currency WHERE bot_id IN ({placeholders})",
+                list(accounts)
+            )
+            working = dict(cursor.fetchall())
+
+            results = []
+            for entry in postings:
+                ok = self._try_posting(working, entry)
+                results.append(ok)
+
+            if all_or_nothing and not all(results):
+                cursor.execute("ROLLBACK")
+                if journal_id is not None:
+                    self._mark_journal(journal_id, 'rejected')
+                    self.logger.info(f"Ledger batch {journal_id} rejected: payer below floor")
+                return [False] * len(postings)
+
+            deltas = {}
+            transaction_rows = []
+            for entry, ok in zip(postings, results):
+                status = "completed" if ok else "failed"
+                transaction_rows.append((entry['from_bot'], entry['to_bot'], entry['amount'],
+                                         entry['transaction_type'], entry['reason'], status))
+                if not ok:
+                    continue
+                if entry['from_bot'] is not None:
+                    deltas[entry['from_bot']] = deltas.get(entry['from_bot'], 0) - entry['amount']
+                if entry['to_bot'] is not None:
+                    credit = entry['amount'] - entry.get('fee', 0.0)
+                    deltas[entry['to_bot']] = deltas.get(entry['to_bot'], 0) + credit
+
+            cursor.executemany(
+                "UPDATE bot_currency SET balance = balance + ?, updated_at = CURRENT_TIMESTAMP WHERE bot_id = ?",
+                [(delta, bot_id) for bot_id, delta in deltas.items()]
+            )
+            cursor.executemany("""
+                INSERT INTO transactions (from_bot, to_bot, amount, transaction_type, reason, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, transaction_rows)
+            if writes is not None and not writes(cursor):
+                cursor.execute("ROLLBACK")
+                return [False] * len(postings)
+            cursor.execute("COMMIT")
+
+            # Delivered on the next dispatch, outside the ledger lock
+            bus = EventBus.default()
+            for entry, ok in zip(postings, results):
+                if ok:
+                    bus.post(CurrencyPosted(entry['from_bot'], entry['to_bot'], entry['amount'],
+                                            entry['transaction_type'], entry['reason']))
+
+            # Memory only changes once the database has committed
+            for bot_id in accounts:
+                if bot_id in deltas or bot_id not in self.balances:
+                    self.total_currency += working[bot_id] - self.balances.get(bot_id, 0.0)
+                    self.balances[bot_id] = working[bot_id]
+            if self._loaded:
+                # Rows other processes committed in between also move their accounts
+                self._reload_balances(cursor, self._fold_transactions(cursor) - accounts)
+            return results
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def settle_period(self, period: int, income: float, upkeep: float) -> Dict:
+        """Pay income and charge upkeep to every unsettled bot in one set-based pass
+
+        Each bot is settled at most once per period (tracked in
+        bot_currency.settled_period), so reruns only pick up bots that were
+        missed. Upkeep that would push a bot below min_balance is skipped and
+        logged as a failed transaction. The whole pass is a single
+        transaction, so a crash leaves nothing half-applied.
+        """
+        self.initialize()
+        params = {
+            'period': period,
+            'income': income,
+            'upkeep': upkeep,
+            'min_balance': self.config['min_balance']
+        }
+        due_cte = """
+            WITH due AS (
+                SELECT bot_id, balance + :income - :upkeep >= :min_balance AS can_pay
+                FROM bot_currency
+                WHERE COALESCE(settled_period, -1) < :period
+            )
+        """
+
+        with self.lock:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                cursor.execute(due_cte + "SELECT COUNT(*), COALESCE(SUM(can_pay), 0) FROM due", params)
+                bots_due, upkeep_paid = cursor.fetchone()
+                if bots_due == 0:
+                    cursor.execute("ROLLBACK")
+                    return {'period': period, 'bots_due': 0, 'bots_settled': 0, 'income_total': 0.0,
+                            'upkeep_total': 0.0, 'upkeep_failed': 0}
+
+                # Ledger rows first: they are computed from pre-settlement balances
+                if income:
+                    cursor.execute(due_cte + """
+                        INSERT INTO transactions (from_bot, to_bot, amount, transaction_type, reason, status)
+                        SELECT NULL, bot_id, :income, 'reward', 'daily_income', 'completed' FROM due
+                    """, params)
+                if upkeep:
+                    cursor.execute(due_cte + """
+                        INSERT INTO transactions (from_bot, to_bot, amount, transaction_type, reason, status)
+                        SELECT bot_id, NULL, :upkeep, 'upkeep', 'daily_upkeep',
+                               CASE WHEN can_pay THEN 'completed' ELSE 'failed' END
+                        FROM due
+                    """, params)
+
+                cursor.execute("""
+                    UPDATE bot_currency
+                    SET balance = balance + :income
+                            - CASE WHEN balance + :income - :upkeep >= :min_balance THEN :upkeep ELSE 0 END,
+                        last_income = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP,
+                        settled_period = :period
+                    WHERE COALESCE(settled_period, -1) < :period
+                """, params)
+                bots_settled = cursor.rowcount
+
+                summary = {
+                    'period': period,
+                    'bots_due': bots_due,
+                    'bots_settled': bots_settled,
+                    'income_total': income * bots_settled,
+                    'upkeep_total': upkeep * upkeep_paid if upkeep else 0.0,
+                    'upkeep_failed': bots_settled - upkeep_paid if upkeep else 0
+                }
+                cursor.execute("""
+                    INSERT INTO settlement_runs (period, bots_settled, income_total, upkeep_total, upkeep_failed)
+                    VALUES (:period, :bots_settled, :income_total, :upkeep_total, :upkeep_failed)
+                    ON CONFLICT(period) DO UPDATE SET
+                        bots_settled = bots_settled + excluded.bots_settled,
+                        income_total = income_total + excluded.income_total,
+                        upkeep_total = upkeep_total + excluded.upkeep_total,
+                        upkeep_failed = upkeep_failed + excluded.upkeep_failed,
+                        settled_at = CURRENT_TIMESTAMP
+                """, summary)
+                cursor.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.logger.error(f"Settlement error for period {period}: {e}")
+                return {'period': period, 'bots_due': 0, 'bots_settled': 0, 'income_total': 0.0,
+                        'upkeep_total': 0.0, 'upkeep_failed': 0}
+            finally:
+                conn.close()
+
+            # Every settled account has a ledger row, so folding them reloads just those
+            self.refresh()
+            return summary
+
+    def _try_posting(self, working: Dict[int, float], entry: Dict) -> bool:
+        """Check one posting against working balances and apply it there"""
+        return apply_posting(working, entry, self.config['min_balance'])
+
+    def _mark_journal(self, journal_id: int, status: str):
+        """Close a batch that is still pending (an applied batch is left alone)"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE ledger_journal SET status = ? WHERE id = ? AND status = 'pending'",
+                         (status, journal_id))
+
+    def prune_journal(self) -> int:
+        """Drop settled journal rows; only pending (replayable) and failed batches are kept"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute("DELETE FROM ledger_journal WHERE status IN ('applied', 'rejected')")
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            self.logger.error(f"Ledger journal prune error: {e}")
+            return 0
+
+    def _replay_pending(self):
+        """Apply batches that were journaled but never committed (crash recovery)
+
+        Batches younger than a minute may still be in flight in another
+        process and are left to it.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            pending = conn.execute("""
+                SELECT id, postings, all_or_nothing FROM ledger_journal
+                WHERE status = 'pending' AND created_at <= datetime('now', '-60 seconds')
+                ORDER BY id
+            """).fetchall()
+
+        for journal_id, postings_json, all_or_nothing in pending:
+            self.logger.info(f"Replaying ledger batch {journal_id}")
+            self._apply(journal_id, json.loads(postings_json), bool(all_or_nothing))
+        self.prune_journal()
@@ -0,0 +1,275 @@
+"""
+Metrics export for BotFarm
+Incremental, cycle-partitioned columnar snapshots of the time-series tables
+
+Usage:
+    python -m core.metrics_export export --out data/exports
+    python -m core.metrics_export query cycle_bot_stats --from 100 --to 200
+
+Parquet / Arrow IPC need pyarrow. Without it the exporter falls back to
+gzipped JSON lines with the same partition layout.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Tables keyed by cycle_number
+CYCLE_TABLES = ('cycle_records', 'cycle_bot_stats')
+# Tables keyed by time; rows get the cycle whose record closed after them
+EVENT_TABLES = ('transactions', 'bot_move_history', 'bot_status_history')
+
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'jsonl': '.jsonl.gz'}
+
+
+class MetricsExporter:
+    """Copies new cycles out of the live database into partitioned columnar files
+
+    Layout: <out_dir>/<table>/cycle_start=<bucket>/part-<first>-<last><ext>,
+    where bucket is the first cycle of a partition_size block. Progress is
+    kept in <out_dir>/_export_state.json so every run only reads new rows.
+    """
+
+    def __init__(self, db_path='data/bot_world.db', out_dir='data/exports',
+                 fmt='parquet', partition_size=100):
+        self.db_path = db_path
+        self.out_dir = out_dir
+        self.partition_size = partition_size
+        self.logger = logging.getLogger('metrics_export')
+
+        if fmt != 'jsonl' and pa is None:
+            self.logger.warning(f"pyarrow not installed, exporting {fmt} as jsonl")
+            fmt = 'jsonl'
+        self.fmt = fmt
+        self.state_path = os.path.join(out_dir, '_export_state.json')
+
+    def _connect(self):
+        # Read-only so an export never takes a write lock on the live database
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'last_cycle': 0, 'last_rowid': {}}
+
+    def _save_state(self, state: Dict):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def export(self, max_cycles: Optional[int] = None) -> Dict:
+        """Export every cycle recorded since the last run (optionally capped)"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        state = self.load_state()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT cycle_number, timestamp FROM cycle_records
+                WHERE cycle_number > ? ORDER BY cycle_number
+            """, (state['last_cycle'],))
+            cycles = cursor.fetchall()
+            if max_cycles:
+                cycles = cycles[:max_cycles]
+            if not cycles:
+                return {'cycles': 0, 'rows': {}}
+
+            tables = [t for t in EVENT_TABLES if self._table_exists(cursor, t)]
+            written = {}
+
+            for block in self._blocks(cycles):
+                first, last = block[0][0], block[-1][0]
+
+                for table in CYCLE_TABLES:
+                    columns, rows = self._read_cycle_rows(cursor, table, first, last)
+                    written[table] = written.get(table, 0) + self._write(table, first, last, columns, rows)
+
+                for table in tables:
+                    last_rowid = state['last_rowid'].get(table, 0)
+                    columns, rows, max_rowid = self._read_event_rows(cursor, table, block, last_rowid)
+                    written[table] = written.get(table, 0) + self._write(table, first, last, columns, rows)
+                    state['last_rowid'][table] = max(last_rowid, max_rowid)
+
+                state['last_cycle'] = last
+                self._save_state(state)
+
+            self.logger.info(f"Exported cycles {cycles[0][0]}-{cycles[-1][0]} ({self.fmt})")
+            return {'cycles': len(cycles), 'rows': written}
+        finally:
+            conn.close()
+
+    def _table_exists(self, cursor, table: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def _blocks(self, cycles: List[Tuple]) -> List[List[Tuple]]:
+        """Split (cycle_number, timestamp) pairs at partition boundaries"""
+        blocks = {}
+        for cycle in cycles:
+            blocks.setdefault(self._bucket(cycle[0]), []).append(cycle)
+        return [blocks[bucket] for bucket in sorted(blocks)]
+
+    def _bucket(self, cycle_number: int) -> int:
+        return cycle_number - cycle_number % self.partition_size
+
+    def _read_cycle_rows(self, cursor, table: str, first: int, last: int):
+        cursor.execute(f"SELECT * FROM {table} WHERE cycle_number BETWEEN ? AND ? ORDER BY cycle_number",
+                       (first, last))
+        return [d[0] for d in cursor.description], cursor.fetchall()
+
+    def _read_event_rows(self, cursor, table: str, block: List[Tuple], last_rowid: int):
+        """New rows up to the block's last cycle, tagged with their cycle number"""
+        closing_times = [timestamp for _, timestamp in block]
+        cursor.execute(f"""
+            SELECT rowid AS _rowid, * FROM {table}
+            WHERE rowid > ? AND timestamp <= ?
+            ORDER BY rowid
+        """, (last_rowid, closing_times[-1]))
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description]
+
+        ts_index = columns.index('timestamp')
+        tagged = []
+        for row in rows:
+            position = min(bisect_left(closing_times, row[ts_index]), len(block) - 1)
+            tagged.append(row[1:] + (block[position][0],))
+
+        max_rowid = rows[-1][0] if rows else last_rowid
+        return columns[1:] + ['cycle_number'], tagged, max_rowid
+
+    def _write(self, table: str, first: int, last: int, columns: List[str], rows: List[Tuple]) -> int:
+        if not rows:
+            return 0
+
+        directory = os.path.join(self.out_dir, table, f"cycle_start={self._bucket(first)}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{first}-{last}{EXTENSIONS[self.fmt]}")
+        if self.fmt == 'jsonl':
+            with gzip.open(path, 'wt') as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(columns, row))) + '\n')
+        else:
+            data = {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+            arrow_table = pa.Table.from_pydict(data)
+            if self.fmt == 'parquet':
+                pq.write_table(arrow_table, path)
+            else:
+                with pa_ipc.new_file(path, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+        return len(rows)
+
+
+def _part_range(filename: str) -> Optional[Tuple[int, int]]:
+    """(first, last) cycle of a part file name"""
+    if not filename.startswith('part-'):
+        return None
+    stem = filename[len('part-'):].split('.')[0]
+    first, _, last = stem.partition('-')
+    return int(first), int(last)
+
+
+def query(out_dir: str, table: str, cycle_from: Optional[int] = None, cycle_to: Optional[int] = None,
+          columns: Optional[List[str]] = None) -> Dict[str, List]:
+    """Read an exported table as columns, pruning partitions outside the cycle range"""
+    result = {}
+    table_dir = os.path.join(out_dir, table)
+    if not os.path.isdir(table_dir):
+        return result
+
+    low = cycle_from if cycle_from is not None else float('-inf')
+    high = cycle_to if cycle_to is not None else float('inf')
+
+    for partition in sorted(os.listdir(table_dir)):
+        for filename in sorted(os.listdir(os.path.join(table_dir, partition))):
+            part = _part_range(filename)
+            if part is None or part[1] < low or part[0] > high:
+                continue
+            path = os.path.join(table_dir, partition, filename)
+            for column, values in _read_part(path, columns).items():
+                result.setdefault(column, []).extend(values)
+
+    # Part files can straddle the requested range: trim row-wise
+    if result and (cycle_from is not None or cycle_to is not None):
+        cycles = result.get('cycle_number')
+        if cycles is None:
+            cycles = _read_cycle_column(table_dir, low, high)
+        keep = [i for i, cycle in enumerate(cycles) if low <= cycle <= high]
+        result = {column: [values[i] for i in keep] for column, values in result.items()}
+    return result
+
+
+def _read_part(path: str, columns: Optional[List[str]]) -> Dict[str, List]:
+    if path.endswith('.jsonl.gz'):
+        data = {}
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                row = json.loads(line)
+                for column in (columns or row.keys()):
+                    data.setdefault(column, []).append(row.get(column))
+        return data
+
+    if pa is None:
+        raise RuntimeError(f"pyarrow is required to read {path}")
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=columns).to_pydict()
+    with pa.memory_map(path) as source:
+        arrow_table = pa_ipc.open_file(source).read_all()
+    return (arrow_table.select(columns) if columns else arrow_table).to_pydict()
+
+
+def _read_cycle_column(table_dir: str, low, high) -> List:
+    """cycle_number values in file order, when the caller projected it away"""
+    cycles = []
+    for partition in sorted(os.listdir(table_dir)):
+        for filename in sorted(os.listdir(os.path.join(table_dir, partition))):
+            part = _part_range(filename)
+            if part is None or part[1] < low or part[0] > high:
+                continue
+            cycles.extend(_read_part(os.path.join(table_dir, partition, filename), ['cycle_number'])['cycle_number'])
+    return cycles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export cycle metrics to columnar files")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = sub.add_parser('export')
+    export_parser.add_argument('--db', default='data/bot_world.db')
+    export_parser.add_argument('--out', default='data/exports')
+    export_parser.add_argument('--format', choices=sorted(EXTENSIONS), default='parquet')
+    export_parser.add_argument('--partition-size', type=int, default=100)
+    export_parser.add_argument('--max-cycles', type=int, default=None)
+
+    query_parser = sub.add_parser('query')
+    query_parser.add_argument('table')
+    query_parser.add_argument('--out', default='data/exports')
+    query_parser.add_argument('--from', dest='cycle_from', type=int, default=None)
+    query_parser.add_argument('--to', dest='cycle_to', type=int, default=None)
+    query_parser.add_argument('--columns', default=None, help="comma separated")
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        exporter = MetricsExporter(args.db, args.out, args.format, args.partition_size)
+        summary = exporter.export(args.max_cycles)
+        print(f"📦 Exported {summary['cycles']} cycles: {summary['rows']}")
+    else:
+        columns = args.columns.split(',') if args.columns else None
+        data = query(args.out, args.table, args.cycle_from, args.cycle_to, columns)
+        rows = len(next(iter(data.values()))) if data else 0
+        print(f"🔎 {args.table}: {rows} rows, columns {list(data)}")
+        for i in range(min(rows, 10)):
+            print("   " + json.dumps({column: values[i] for column, values in data.items()}))
@@ -0,0 +1,306 @@
+"""
+N-gram language model for BotFarm
+Trigram counts learned incrementally from the IRC lines stored in the memory table
+"""
+
+import logging
+import pickle
+import random
+import re
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_right
+from typing import List, Dict, Optional
+
+BOS, EOS = 0, 1
+
+# IRC memory rows: "[IRC 12:34] heard_message: Activity in channel #c user: nick => text"
+#                  "[IRC 12:34] channel_message: Heard nick say: 'text'"
+HEARD_PATTERNS = (
+    re.compile(r"\] heard_message: .*? => (.+)$", re.S),
+    re.compile(r"\] channel_message: Heard \S+ say: '(.+?)(?:\.\.\.)?'$", re.S),
+)
+
+
+def extract_line(event: str) -> Optional[str]:
+    """Spoken text of an IRC memory event, or None for any other event"""
+    for pattern in HEARD_PATTERNS:
+        match = pattern.search(event)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def tokenize(text: str) -> List[str]:
+    return text.split()
+
+
+class _Successors:
+    """Tokens seen after one context, as parallel arrays of ids and counts"""
+    __slots__ = ('tokens', 'counts', 'total', 'cumulative')
+
+    def __init__(self):
+        self.tokens = array('I')
+        self.counts = array('I')
+        self.total = 0
+        self.cumulative = None     # running sums, rebuilt on the first sample after an update
+
+    def add(self, token: int):
+        # Most contexts have a handful of successors: a C-level scan of the array beats a dict per context
+        try:
+            self.counts[self.tokens.index(token)] += 1
+        except ValueError:
+            self.tokens.append(token)
+            self.counts.append(1)
+        self.total += 1
+        self.cumulative = None
+
+    def sample(self, rng: random.Random) -> int:
+        if self.cumulative is None:
+            running = 0
+            self.cumulative = array('I')
+            for count in self.counts:
+                running += count
+                self.cumulative.append(running)
+        return self.tokens[bisect_right(self.cumulative, rng.randrange(self.total))]
+
+    def __getstate__(self):
+        return self.tokens, self.counts, self.total
+
+    def __setstate__(self, state):
+        self.tokens, self.counts, self.total = state
+        self.cumulative = None
+
+
+class NGramModel:
+    """Shared trigram model with a per-bot overlay of the lines each bot heard
+
+    Tokens are interned to integer ids; contexts are (previous, current)
+    id pairs packed into one int. Training only reads memory rows above
+    the last id it has seen. The model is pickled into the
+    language_models table once save_every new lines have been learned
+    (and by flush()); after a restart the unsaved rows are simply read again.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str, name: str = 'irc_trigram') -> 'NGramModel':
+        """One model per database and name, shared by every caller in the process"""
+        with cls._instances_lock:
+            key = (db_path, name)
+            if key not in cls._instances:
+                cls._instances[key] = cls(db_path, name)
+            return cls._instances[key]
+
+    def __init__(self, db_path: str, name: str = 'irc_trigram', bot_weight: float = 0.6,
+                 min_tokens: int = 2, max_tokens: int = 40, save_every: int = 500):
+        self.db_path = db_path
+        self.name = name
+        self.bot_weight = bot_weight      # chance of drawing from the speaker's own overlay
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.save_every = save_every      # learned lines between two saves
+        self.logger = logging.getLogger('ngram_model')
+        self.lock = threading.Lock()
+
+        self.token_ids = {'<s>': BOS, '</s>': EOS}
+        self.tokens = ['<s>', '</s>']
+        self.shared = {}                  # context -> _Successors
+        self.per_bot = {}                 # bot_id -> {context -> _Successors}
+        self.last_memory_id = 0
+        self.lines_trained = 0
+        self.unsaved_lines = 0
+
+        self.initialize()
+        self.load()
+
+    def initialize(self):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS language_models (
+                    name TEXT PRIMARY KEY,
+                    last_memory_id INTEGER DEFAULT 0,
+                    lines_trained INTEGER DEFAULT 0,
+                    vocabulary_size INTEGER DEFAULT 0,
+                    payload BLOB,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )""")
+        except sqlite3.Error as e:
+            self.logger.error(f"Language model table initialization error: {e}")
+
+    @staticmethod
+    def _context(previous: int, current: int) -> int:
+        return (previous << 32) | current
+
+    def _token_id(self, token: str) -> int:
+        token_id = self.token_ids.get(token)
+        if token_id is None:
+            token_id = self.token_ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return token_id
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.shared)
+
+    def add_line(self, text: str, bot_id: Optional[int] = None) -> bool:
+        """Count the trigrams of one line into the shared model and the bot's overlay"""
+        words = tokenize(text)
+        if not self.min_tokens <= len(words) <= self.max_tokens:
+            return False
+
+        ids = [BOS, BOS] + [self._token_id(word) for word in words] + [EOS]
+        overlay = self.per_bot.setdefault(bot_id, {}) if bot_id is not None else None
+        for i in range(2, len(ids)):
+            context = self._context(ids[i - 2], ids[i - 1])
+            successors = self.shared.get(context)
+            if successors is None:
+                successors = self.shared[context] = _Successors()
+            successors.add(ids[i])
+            if overlay is not None:
+                successors = overlay.get(context)
+                if successors is None:
+                    successors = overlay[context] = _Successors()
+                successors.add(ids[i])
+        self.lines_trained += 1
+        return True
+
+    def train(self, batch_size: int = 5000, max_batches: Optional[int] = None) -> int:
+        """Learn from memory rows added since the last call; returns the lines learned"""
+        learned = 0
+        batches = 0
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                while max_batches is None or batches < max_batches:
+                    cursor.execute("""
+                        SELECT id, bot_id, event FROM memory
+                        WHERE id > ? AND event_type = 'irc_experience'
+                        ORDER BY id LIMIT ?
+                    """, (self.last_memory_id, batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    for _, bot_id, event in rows:
+                        line = extract_line(event or '')
+                        if line and self.add_line(line, bot_id):
+                            learned += 1
+                    self.last_memory_id = rows[-1][0]
+                    batches += 1
+                    if len(rows) < batch_size:
+                        break
+            except sqlite3.Error as e:
+                self.logger.error(f"Language model training error: {e}")
+            finally:
+                conn.close()
+
+            self.unsaved_lines += learned
+            if self.unsaved_lines >= self.save_every:
+                self._save()
+        if learned:
+            self.logger.info(f"🧠 Language model learned {learned} new lines "
+                             f"({len(self.tokens)} tokens, {len(self.shared)} contexts)")
+        return learned
+
+    def generate(self, bot_id: Optional[int] = None, rng: Optional[random.Random] = None,
+                 max_words: int = 20) -> Optional[str]:
+        """Sample one sentence, preferring the bot's own overlay; None while untrained"""
+        if not self.shared:
+            return None
+        rng = rng or random
+        overlay = self.per_bot.get(bot_id) if bot_id is not None else None
+
+        previous, current = BOS, BOS
+        words = []
+        while len(words) < max_words:
+            context = self._context(previous, current)
+            successors = None
+            if overlay and rng.random() < self.bot_weight:
+                successors = overlay.get(context)
+            if successors is None:
+                successors = self.shared.get(context)
+            if successors is None:
+                break
+            token = successors.sample(rng)
+            if token == EOS:
+                break
+            words.append(self.tokens[token])
+            previous, current = current, token
+        return ' '.join(words) if words else None
+
+    def get_stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'tokens': len(self.tokens),
+            'contexts': len(self.shared),
+            'bots': len(self.per_bot),
+            'lines_trained': self.lines_trained,
+            'last_memory_id': self.last_memory_id
+        }
+
+    def flush(self) -> bool:
+        """Save the model if it learned anything since the last save"""
+        with self.lock:
+            if not self.unsaved_lines:
+                return False
+            return self._save()
+
+    def _save(self) -> bool:
+        payload = pickle.dumps({
+            'tokens': self.tokens,
+            'shared': self.shared,
+            'per_bot': self.per_bot
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT INTO language_models (name, last_memory_id, lines_trained, vocabulary_size, payload, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO UPDATE SET
+                        last_memory_id = excluded.last_memory_id,
+                        lines_trained = excluded.lines_trained,
+                        vocabulary_size = excluded.vocabulary_size,
+                        payload = excluded.payload,
+                        updated_at = excluded.updated_at
+                """, (self.name, self.last_memory_id, self.lines_trained, len(self.tokens), payload))
+            self.unsaved_lines = 0
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error saving language model: {e}")
+            return False
+
+    def load(self) -> bool:
+        """Restore the last saved model so training resumes where it stopped"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT last_memory_id, lines_trained, payload FROM language_models WHERE name = ?",
+                    (self.name,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error loading language model: {e}")
+            return False
+        if not row or row[2] is None:
+            return False
+
+        state = pickle.loads(row[2])
+        self.tokens = state['tokens']
+        self.token_ids = {token: i for i, token in enumerate(self.tokens)}
+        self.shared = state['shared']
+        self.per_bot = state['per_bot']
+        self.last_memory_id, self.lines_trained = row[0], row[1]
+        return True
+
+
+if __name__ == "__main__":
+    import sys
+
+    model = NGramModel.for_database(sys.argv[1] if len(sys.argv) > 1 else 'data/bot_world.db')
+    print(f"📚 Learned {model.train()} new lines: {model.get_stats()}")
+    model.flush()
+    for _ in range(5):
+        print(f"   💬 {model.generate()}")
@@ -0,0 +1,455 @@
+"""
+Order book for BotFarm
+Price-time priority matching of market_listings, settled through the ledger
+"""
+
+import heapq
+import sqlite3
+import logging
+import threading
+import time
+from calendar import timegm
+from collections import deque
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from core.ledger import posting
+
+EPSILON = 1e-9
+
+
+def _to_epoch(timestamp: Optional[str]) -> Optional[float]:
+    """SQLite UTC timestamp ('YYYY-MM-DD HH:MM:SS') to epoch seconds"""
+    if not timestamp:
+        return None
+    return float(timegm(datetime.strptime(timestamp[:19], '%Y-%m-%d %H:%M:%S').timetuple()))
+
+
+class _BookSide:
+    """One side of an asset's book: FIFO queues of order ids per price level"""
+
+    def __init__(self, is_buy: bool):
+        self.is_buy = is_buy
+        self.levels = {}     # price -> deque of order ids, oldest first
+        self.prices = []     # heap of price keys (negated for bids); stale keys skipped lazily
+
+    def add(self, order: Dict):
+        price = order['price']
+        if price not in self.levels:
+            self.levels[price] = deque()
+            heapq.heappush(self.prices, -price if self.is_buy else price)
+        self.levels[price].append(order['id'])
+
+    def best_price(self) -> Optional[float]:
+        while self.prices:
+            price = -self.prices[0] if self.is_buy else self.prices[0]
+            if self.levels.get(price):
+                return price
+            heapq.heappop(self.prices)
+            self.levels.pop(price, None)
+        return None
+
+
+class OrderBook:
+    """In-memory order books per asset_type, with market_listings as the persistent log
+
+    Buy listings reuse seller_bot_id as the bidding bot. A resting order
+    always sets the trade price. Sell orders are trimmed to what the
+    seller holds. Each fill moves currency through the ledger (the
+    transfer fee is burned) and assets between bot_assets rows in one
+    transaction. A bot never trades with itself: matching stops at its
+    own order.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str, ledger) -> 'OrderBook':
+        """Return the process-wide order book for a database, creating it once"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path, ledger)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path: str, ledger):
+        self.db_path = db_path
+        self.ledger = ledger
+        self.logger = logging.getLogger('order_book')
+        self.lock = threading.RLock()
+
+        self.orders = {}       # listing id -> open order
+        self.books = {}        # asset_type -> {'buy': _BookSide, 'sell': _BookSide}
+        self.expiries = []     # heap of (expires_at, listing id)
+        self.last_listing_id = 0
+        self._loaded = False
+
+    def initialize(self):
+        """Create the trade log and load open listings"""
+        with self.lock:
+            if self._loaded:
+                return
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.execute("""CREATE TABLE IF NOT EXISTS market_trades (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        buy_listing_id INTEGER NOT NULL,
+                        sell_listing_id INTEGER NOT NULL,
+                        buyer_bot_id INTEGER NOT NULL,
+                        seller_bot_id INTEGER NOT NULL,
+                        asset_type TEXT NOT NULL,
+                        asset_name TEXT,
+                        quantity REAL NOT NULL,
+                        price_per_unit REAL NOT NULL,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )""")
+                    conn.execute("""CREATE INDEX IF NOT EXISTS idx_market_listings_status
+                                    ON market_listings (status, id)""")
+                self._loaded = True
+                self.sync()
+            except sqlite3.Error as e:
+                self.logger.error(f"Order book initialization error: {e}")
+
+    def sync(self) -> List[Dict]:
+        """Pick up listings written since the last sync (e.g. by other processes)"""
+        self.initialize()
+        with self.lock:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute("""
+                    SELECT id, seller_bot_id, asset_type, asset_name, quantity,
+                           price_per_unit, listing_type, expires_at
+                    FROM market_listings
+                    WHERE status = 'active' AND id > ?
+                    ORDER BY id
+                """, (self.last_listing_id,)).fetchall()
+
+            trades = []
+            for row in rows:
+                self.last_listing_id = row[0]
+                trades.extend(self._accept(self._order_from_row(row)))
+            return trades
+
+    def _order_from_row(self, row) -> Dict:
+        return {
+            'id': row[0],
+            'bot_id': row[1],
+            'asset_type': row[2],
+            'asset_name': row[3],
+            'quantity': row[4],
+            'price': row[5],
+            'side': 'buy' if row[6] == 'buy' else 'sell',
+            'expires_at': _to_epoch(row[7])
+        }
+
+    def submit(self, bot_id: int, asset_type: str, asset_name: str, quantity: float,
+               price_per_unit: float, side: str = "sell", ttl_days: int = 7) -> Dict:
+        """Persist a new listing and match it against the book
+
+        Returns {'listing_id', 'status', 'trades'}; status is 'active' if
+        part of the order rests on the book.
+        """
+        self.initialize()
+        if quantity <= 0 or price_per_unit <= 0:
+            return {'listing_id': None, 'status': 'rejected', 'trades': []}
+
+        with self.lock:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO market_listings
+                    (seller_bot_id, asset_type, asset_name, quantity, price_per_unit, listing_type, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, datetime('now', ?))
+                """, (bot_id, asset_type, asset_name, quantity, price_per_unit, side, f"+{ttl_days} days"))
+                conn.commit()
+                listing_id = cursor.lastrowid
+
+            # Catch up first so time priority follows listing ids
+            trades = self.sync()
+            status = 'active' if listing_id in self.orders else self._listing_status(listing_id)
+            return {
+                'listing_id': listing_id,
+                'status': status,
+                'trades': [t for t in trades if listing_id in (t['buy_listing_id'], t['sell_listing_id'])]
+            }
+
+    def cancel(self, listing_id: int) -> bool:
+        """Withdraw an open listing"""
+        self.initialize()
+        with self.lock:
+            if listing_id not in self.orders:
+                return False
+            self._close([listing_id], 'cancelled')
+            return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Close every listing whose expires_at has passed"""
+        self.initialize()
+        now = time.time() if now is None else now
+        with self.lock:
+            expired = []
+            while self.expiries and self.expiries[0][0] <= now:
+                _, listing_id = heapq.heappop(self.expiries)
+                if listing_id in self.orders:
+                    expired.append(listing_id)
+            if expired:
+                self._close(expired, 'expired')
+                self.logger.info(f"Expired {len(expired)} market listings")
+            return len(expired)
+
+    def run_cycle(self, now: Optional[float] = None) -> Dict:
+        """Market step: expire stale listings, then match anything new"""
+        expired = self.expire(now)
+        trades = self.sync()
+        return {'expired': expired, 'trades': len(trades), 'open_orders': len(self.orders)}
+
+    def open_order_count(self) -> int:
+        return len(self.orders)
+
+    def get_listings(self, asset_type: Optional[str] = None) -> List[Dict]:
+        """Open listings in priority order (best price first, then oldest)"""
+        self.initialize()
+        with self.lock:
+            asset_types = [asset_type] if asset_type else sorted(self.books)
+            listings = []
+            for book_type in asset_types:
+                book = self.books.get(book_type)
+                if not book:
+                    continue
+                for side_name in ('sell', 'buy'):
+                    side = book[side_name]
+                    for price in sorted(side.levels, reverse=side.is_buy):
+                        for listing_id in side.levels[price]:
+                            order = self.orders.get(listing_id)
+                            if order:
+                                listings.append(self._listing_dict(order))
+            return listings
+
+    def get_depth(self, asset_type: str, levels: int = 5) -> Dict[str, List]:
+        """Aggregated quantity at the best price levels of each side"""
+        self.initialize()
+        with self.lock:
+            book = self.books.get(asset_type)
+            depth = {'buy': [], 'sell': []}
+            if not book:
+                return depth
+            for side_name, side in book.items():
+                for price in sorted(side.levels, reverse=side.is_buy):
+                    quantity = sum(self.orders[i]['quantity'] for i in side.levels[price] if i in self.orders)
+                    if quantity > EPSILON:
+                        depth[side_name].append((price, quantity))
+                    if len(depth[side_name]) >= levels:
+                        break
+            return depth
+
+    def _listing_dict(self, order: Dict) -> Dict:
+        return {
+            'id': order['id'],
+            'seller_bot_id': order['bot_id'],
+            'asset_type': order['asset_type'],
+            'asset_name': order['asset_name'],
+            'quantity': order['quantity'],
+            'price_per_unit': order['price'],
+            'listing_type': order['side'],
+            'total_price': order['quantity'] * order['price']
+        }
+
+    def _listing_status(self, listing_id: int) -> Optional[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT status FROM market_listings WHERE id = ?", (listing_id,)).fetchone()
+        return row[0] if row else None
+
+    def _book(self, asset_type: str) -> Dict[str, _BookSide]:
+        if asset_type not in self.books:
+            self.books[asset_type] = {'buy': _BookSide(True), 'sell': _BookSide(False)}
+        return self.books[asset_type]
+
+    def _accept(self, order: Dict) -> List[Dict]:
+        """Match an incoming order, then rest whatever is left of it"""
+        if order['expires_at'] is not None and order['expires_at'] <= time.time():
+            self._close([order['id']], 'expired')
+            return []
+
+        book = self._book(order['asset_type'])
+        is_buy = order['side'] == 'buy'
+        opposite = book['sell'] if is_buy else book['buy']
+
+        if not is_buy and not self._cover(order):
+            self._close([order['id']], 'cancelled')
+            return []
+
+        fills = []
+        rejected = False
+
+        while order['quantity'] > EPSILON:
+            best = opposite.best_price()
+            if best is None or (best > order['price'] if is_buy else best < order['price']):
+                break
+
+            level = opposite.levels[best]
+            resting = self.orders.get(level[0])
+            if resting is None:
+                level.popleft()  # Closed elsewhere
+                continue
+            if resting['bot_id'] == order['bot_id']:
+                break
+
+            buyer, seller = (order, resting) if is_buy else (resting, order)
+            quantity = min(order['quantity'], resting['quantity'])
+            fill = {
+                'buy_listing_id': buyer['id'],
+                'sell_listing_id': seller['id'],
+                'buyer_bot_id': buyer['bot_id'],
+                'seller_bot_id': seller['bot_id'],
+                'asset_type': order['asset_type'],
+                'asset_name': seller['asset_name'],
+                'quantity': quantity,
+                'price_per_unit': best
+            }
+
+            failed = self._settle(fill, order, resting)
+            if failed is not None:
+                # The buyer cannot pay or the seller no longer holds the asset: withdraw that order
+                if (buyer if failed == 'buyer' else seller) is order:
+                    rejected = True
+                    break
+                level.popleft()
+                self._close([resting['id']], 'cancelled')
+                continue
+
+            order['quantity'] -= quantity
+            resting['quantity'] -= quantity
+            fills.append(fill)
+
+            if resting['quantity'] <= EPSILON:
+                level.popleft()
+                del self.orders[resting['id']]
+
+        if rejected:
+            self._close([order['id']], 'cancelled')
+        elif order['quantity'] > EPSILON:
+            self.orders[order['id']] = order
+            (book['buy'] if is_buy else book['sell']).add(order)
+            if order['expires_at'] is not None:
+                heapq.heappush(self.expiries, (order['expires_at'], order['id']))
+
+        self._publish_count()
+        if fills:
+            self.logger.info(f"Market: {len(fills)} fills on {order['asset_type']}")
+        return fills
+
+    def _cover(self, order: Dict) -> bool:
+        """Trim a sell order to what its seller holds beyond their other open sell orders
+
+        Returns False if nothing is left to sell.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            held = self._holding(conn.cursor(), order['bot_id'], order['asset_type'], order['asset_name'])
+            reserved = sum(other['quantity'] for other in self.orders.values()
+                           if other['side'] == 'sell' and other['bot_id'] == order['bot_id']
+                           and other['asset_type'] == order['asset_type']
+                           and other['asset_name'] == order['asset_name'])
+            available = held - reserved
+            if available <= EPSILON:
+                self.logger.info(f"Market: listing {order['id']} withdrawn, "
+                                 f"bot {order['bot_id']} holds no free {order['asset_name'] or order['asset_type']}")
+                return False
+            if order['quantity'] > available + EPSILON:
+                order['quantity'] = available
+                conn.execute("UPDATE market_listings SET quantity = ? WHERE id = ?", (available, order['id']))
+        return True
+
+    def _holding(self, cursor, bot_id: int, asset_type: str, asset_name: Optional[str]) -> float:
+        cursor.execute("""
+            SELECT COALESCE(SUM(quantity), 0) FROM bot_assets
+            WHERE bot_id = ? AND asset_type = ? AND asset_name IS ?
+        """, (bot_id, asset_type, asset_name))
+        return cursor.fetchone()[0]
+
+    def _settle(self, fill: Dict, order: Dict, resting: Dict) -> Optional[str]:
+        """Pay for and deliver one fill in a single transaction
+
+        The payment, the asset movement, the trade row and both listings'
+        remaining quantities commit together or not at all. Returns None on
+        success, else the side that could not settle ('buyer' or 'seller').
+        """
+        quantity = fill['quantity']
+        amount = quantity * fill['price_per_unit']
+        seller_short = []
+
+        def deliver(cursor) -> bool:
+            if not self._move_assets(cursor, fill):
+                seller_short.append(fill['seller_bot_id'])
+                return False
+            cursor.executemany(
+                "UPDATE market_listings SET quantity = ?, status = ? WHERE id = ?",
+                [(max(remaining, 0.0), 'sold' if remaining <= EPSILON else 'active', listing['id'])
+                 for listing in (order, resting)
+                 for remaining in [listing['quantity'] - quantity]]
+            )
+            cursor.execute("""
+                INSERT INTO market_trades
+                (buy_listing_id, sell_listing_id, buyer_bot_id, seller_bot_id,
+                 asset_type, asset_name, quantity, price_per_unit)
+                VALUES (:buy_listing_id, :sell_listing_id, :buyer_bot_id, :seller_bot_id,
+                        :asset_type, :asset_name, :quantity, :price_per_unit)
+            """, fill)
+            return True
+
+        paid = self.ledger.post(posting(
+            fill['buyer_bot_id'], fill['seller_bot_id'], amount, "trade",
+            f"market:{fill['asset_type']}:{fill['asset_name']}",
+            fee=amount * self.ledger.config['transaction_fee'], floor=0.0
+        ), writes=deliver)
+        if paid:
+            return None
+        return 'seller' if seller_short else 'buyer'
+
+    def _move_assets(self, cursor, fill: Dict) -> bool:
+        """Take a fill's quantity from the seller's rows (oldest first) and give it to the buyer"""
+        key = (fill['seller_bot_id'], fill['asset_type'], fill['asset_name'])
+        cursor.execute("""
+            SELECT id, quantity FROM bot_assets
+            WHERE bot_id = ? AND asset_type = ? AND asset_name IS ? AND quantity > 0
+            ORDER BY id
+        """, key)
+        rows = cursor.fetchall()
+        if sum(held for _, held in rows) + EPSILON < fill['quantity']:
+            return False
+
+        left = fill['quantity']
+        for row_id, held in rows:
+            take = min(held, left)
+            cursor.execute("""
+                UPDATE bot_assets SET quantity = quantity - ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (take, row_id))
+            left -= take
+            if left <= EPSILON:
+                break
+        cursor.execute("""
+            DELETE FROM bot_assets
+            WHERE bot_id = ? AND asset_type = ? AND asset_name IS ? AND quantity <= ?
+        """, key + (EPSILON,))
+        cursor.execute("""
+            INSERT INTO bot_assets (bot_id, asset_type, asset_name, quantity, value_per_unit)
+            VALUES (?, ?, ?, ?, ?)
+        """, (fill['buyer_bot_id'], fill['asset_type'], fill['asset_name'], fill['quantity'],
+              fill['price_per_unit']))
+        return True
+
+    def _publish_count(self):
+        """Keep the ledger's active listing stat in step with the book"""
+        with self.ledger.lock:
+            self.ledger.active_listings = len(self.orders)
+
+    def _close(self, listing_ids: List[int], status: str):
+        """Take listings off the book and record why"""
+        for listing_id in listing_ids:
+            self.orders.pop(listing_id, None)  # Level queues drop the id lazily
+        self._publish_count()
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "UPDATE market_listings SET status = ? WHERE id = ?",
+                [(status, listing_id) for listing_id in listing_ids]
+            )
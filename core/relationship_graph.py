@@ -0,0 +1,168 @@
+"""
+Relationship graph for BotFarm
+Sparse, persistent directed relationship scores between bots
+"""
+
+import logging
+import random
+import sqlite3
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Dict, Optional, Tuple
+
+DEFAULT_SCORE = 0.5
+
+
+class RelationshipGraph:
+    """Directed bot -> bot scores; only edges that moved away from the default are stored
+
+    Scores live in bot_relationships and in an in-memory adjacency dict.
+    Partner sampling picks an explicit edge from a cumulative-weight array
+    (rebuilt only when that bot's edges change) or a neutral partner by
+    rejection, so it stays O(log degree) however many bots there are.
+    Changes are written back in one batch by flush().
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path: str) -> 'RelationshipGraph':
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path: str, default_score: float = DEFAULT_SCORE):
+        self.db_path = db_path
+        self.default_score = default_score
+        self.logger = logging.getLogger('relationship_graph')
+        self.lock = threading.RLock()
+
+        self.edges = {}             # bot_id -> {other_id: score}
+        self.nodes = []             # bots that can be chosen as partners
+        self.node_set = set()
+        self.dirty = set()          # (bot_id, other_id) changed since the last flush
+        self._samplers = {}         # bot_id -> (partner ids, cumulative weights)
+
+        self.initialize()
+        self.load()
+
+    def initialize(self):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS bot_relationships (
+                    bot_id INTEGER NOT NULL,
+                    other_id INTEGER NOT NULL,
+                    score REAL NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (bot_id, other_id)
+                )""")
+        except sqlite3.Error as e:
+            self.logger.error(f"Relationship table initialization error: {e}")
+
+    def load(self):
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT bot_id, other_id, score FROM bot_relationships").fetchall()
+        with self.lock:
+            self.edges = {}
+            for bot_id, other_id, score in rows:
+                self.edges.setdefault(bot_id, {})[other_id] = score
+            self._samplers.clear()
+            self.dirty.clear()
+
+    def set_nodes(self, bot_ids: Iterable[int]):
+        """Bots currently available as partners"""
+        with self.lock:
+            nodes = sorted(set(bot_ids))
+            if nodes != self.nodes:
+                self.nodes = nodes
+                self.node_set = set(nodes)
+                self._samplers.clear()
+
+    def score(self, bot_id: int, other_id: int) -> float:
+        if bot_id == other_id:
+            return 1.0
+        return self.edges.get(bot_id, {}).get(other_id, self.default_score)
+
+    def adjust(self, bot_id: int, other_id: int, delta: float) -> float:
+        """Move one directed score by delta, clamped to [0, 1]"""
+        with self.lock:
+            score = max(0.0, min(1.0, self.score(bot_id, other_id) + delta))
+            self.edges.setdefault(bot_id, {})[other_id] = score
+            self.dirty.add((bot_id, other_id))
+            self._samplers.pop(bot_id, None)
+            return score
+
+    def adjust_pair(self, bot_a: int, bot_b: int, delta: float):
+        self.adjust(bot_a, bot_b, delta)
+        self.adjust(bot_b, bot_a, delta)
+
+    def _sampler(self, bot_id: int) -> Tuple[List[int], List[float]]:
+        sampler = self._samplers.get(bot_id)
+        if sampler is None:
+            partners = [other for other in self.edges.get(bot_id, {})
+                        if other != bot_id and other in self.node_set]
+            weights = list(accumulate(self.edges[bot_id][other] for other in partners))
+            sampler = self._samplers[bot_id] = (partners, weights)
+        return sampler
+
+    def choose_partner(self, bot_id: int, rng: Optional[random.Random] = None) -> Optional[int]:
+        """Pick another bot with probability proportional to this bot's score for it"""
+        rng = rng or random
+        with self.lock:
+            partners, cumulative = self._sampler(bot_id)
+            neutral_count = len(self.nodes) - len(partners) - (1 if bot_id in self.node_set else 0)
+            explicit_total = cumulative[-1] if cumulative else 0.0
+            total = explicit_total + neutral_count * self.default_score
+
+            if total <= 0:
+                others = len(self.nodes) - (1 if bot_id in self.node_set else 0)
+                if others <= 0:
+                    return None
+                return self._random_other(bot_id, set(), rng)
+
+            pick = rng.random() * total
+            if pick < explicit_total:
+                return partners[min(bisect_right(cumulative, pick), len(partners) - 1)]
+            return self._random_other(bot_id, self.edges.get(bot_id, {}), rng)
+
+    def _random_other(self, bot_id: int, excluded, rng) -> Optional[int]:
+        """Uniform pick among nodes that are neither bot_id nor in excluded"""
+        nodes = self.nodes
+        # Rejection is O(1) expected while the bot knows fewer than half the others
+        if len(excluded) * 2 < len(nodes):
+            while True:
+                other = nodes[rng.randrange(len(nodes))]
+                if other != bot_id and other not in excluded:
+                    return other
+        candidates = [other for other in nodes if other != bot_id and other not in excluded]
+        return rng.choice(candidates) if candidates else None
+
+    def neighbours(self, bot_id: int) -> Dict[int, float]:
+        """Explicit (non-default) scores of one bot"""
+        return dict(self.edges.get(bot_id, {}))
+
+    def flush(self) -> int:
+        """Write every changed edge in one transaction"""
+        with self.lock:
+            if not self.dirty:
+                return 0
+            rows = [(bot_id, other_id, self.edges[bot_id][other_id]) for bot_id, other_id in self.dirty]
+            self.dirty.clear()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany("""
+                    INSERT INTO bot_relationships (bot_id, other_id, score, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(bot_id, other_id) DO UPDATE SET
+                        score = excluded.score,
+                        updated_at = excluded.updated_at
+                """, rows)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error saving relationships: {e}")
+            with self.lock:
+                self.dirty.update((bot_id, other_id) for bot_id, other_id, _ in rows)
+            return 0
+        return len(rows)
@@ -0,0 +1,467 @@
+"""
+Response engine for BotFarm
+Registered intents matched in one pass over the input, with batched writes per turn
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+from core.event_bus import EventBus, FactLearned
+
+MATCH_MODES = ('contains', 'prefix', 'exact')
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every registered keyword
+
+    find(text) walks the text once and returns (start, end, keyword)
+    for every occurrence, overlapping ones included.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]        # state -> {char: state}
+        self.fail = [0]
+        self.output = [[]]      # state -> keywords ending here
+
+        for keyword in set(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(keyword)
+
+        # Breadth-first failure links; outputs inherit the failure state's outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        goto, fail, output = self.goto, self.fail, self.output
+        matches = []
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                matches.append((i + 1 - len(keyword), i + 1, keyword))
+        return matches
+
+
+class Intent:
+    __slots__ = ('name', 'keywords', 'handler', 'mode', 'whole_word', 'speakers', 'order')
+
+    def __init__(self, name, keywords, handler, mode, whole_word, speakers, order):
+        self.name = name
+        self.keywords = tuple(keywords)
+        self.handler = handler
+        self.mode = mode
+        self.whole_word = whole_word
+        self.speakers = speakers
+        self.order = order
+
+    def accepts(self, text: str, start: int, end: int) -> bool:
+        if self.mode == 'prefix' and start != 0:
+            return False
+        if self.mode == 'exact' and (start != 0 or end != len(text)):
+            return False
+        if self.whole_word:
+            if start > 0 and text[start - 1].isalnum():
+                return False
+            if end < len(text) and text[end].isalnum():
+                return False
+        return True
+
+
+class Turn:
+    """One input being answered: lazily loaded knowledge and the writes to commit"""
+
+    def __init__(self, bot, text: str, speaker: str):
+        self.bot = bot
+        self.text = text
+        self.lower = text.lower()
+        self.speaker = speaker
+        self.keyword = None       # keyword that selected the current intent
+        self.writes = []          # (sql, params) in the order they happened
+        self.memories = []        # (bot_id, event, event_type) published once written
+        self.events = []          # other events published once written
+        self._knowledge = None
+        self._fact_ids = None
+
+    @property
+    def knowledge(self) -> List[str]:
+        if self._knowledge is None:
+            self._knowledge = self.bot.get_knowledge()
+        return self._knowledge
+
+    @property
+    def fact_ids(self) -> set:
+        if self._fact_ids is None:
+            self._fact_ids = set(self.bot.facts.bot_fact_ids(self.bot.bot_id))
+        return self._fact_ids
+
+    def remember(self, event: str, event_type: str = 'conversation'):
+        self.writes.append(('INSERT INTO memory (bot_id, event, event_type) VALUES (?, ?, ?)',
+                            (self.bot.bot_id, f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {event}", event_type)))
+        self.memories.append((self.bot.bot_id, event, event_type))
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def execute(self, sql: str, params: Tuple = ()):
+        self.writes.append((sql, params))
+
+    def adjust_need(self, need_name: str, delta: float):
+        """Change a need in memory (clamped 0-100); written once when the turn is flushed"""
+        needs = self.bot.needs
+        needs[need_name] = max(0, min(100, needs.get(need_name, 50) + delta))
+
+
+class WriteBatch:
+    """Memory rows and final need values of one or more turns, committed in one transaction"""
+
+    TURN_NEEDS = ('social', 'energy', 'curiosity')
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.writes = []
+        self.memories = []
+        self.events = []
+        self.needs = {}           # (bot_id, need_name) -> latest value
+
+    def add(self, bot, turn: Turn) -> 'WriteBatch':
+        self.writes.extend(turn.writes)
+        self.memories.extend(turn.memories)
+        self.events.extend(turn.events)
+        for need in self.TURN_NEEDS:
+            if need in bot.needs:
+                self.needs[(bot.bot_id, need)] = bot.needs[need]
+        return self
+
+    def __len__(self):
+        return len(self.writes)
+
+    def flush(self):
+        if not self.writes and not self.needs:
+            return
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cursor = conn.cursor()
+            for sql, params in self.writes:
+                cursor.execute(sql, params)
+            cursor.executemany('''
+                UPDATE needs SET value = ?, last_updated = CURRENT_TIMESTAMP
+                WHERE bot_id = ? AND need_name = ?
+            ''', [(value, bot_id, need) for (bot_id, need), value in self.needs.items()])
+            conn.commit()
+        finally:
+            conn.close()
+        memories, events = self.memories, self.events
+        self.writes = []
+        self.memories = []
+        self.events = []
+        self.needs = {}
+        bus = EventBus.default()
+        bus.publish_memories(memories)
+        for event in events:
+            bus.publish(event)
+
+
+class ResponseEngine:
+    """Intent registry with a compiled keyword matcher and per-intent metrics
+
+    Intents are tried in registration order among those whose keywords
+    occur in the input; a handler returning None passes the turn on to
+    the next one, and the fallback answers when nothing claims it.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> 'ResponseEngine':
+        """Engine with the standard intents, shared by every bot in the process"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+                register_default_intents(cls._default)
+            return cls._default
+
+    def __init__(self):
+        self.intents = []
+        self.by_keyword = {}
+        self.fallback = None
+        self._matcher = None
+        self.metrics = {}
+        self.metrics_lock = threading.Lock()
+
+    def register(self, name: str, keywords, handler: Callable, mode: str = 'contains',
+                 whole_word: bool = False, speakers: Optional[Tuple[str, ...]] = None):
+        """Add an intent; handler(bot, turn) returns the reply or None to pass"""
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode: {mode}")
+        intent = Intent(name, [k.lower() for k in keywords], handler, mode, whole_word,
+                        speakers, len(self.intents))
+        self.intents.append(intent)
+        for keyword in intent.keywords:
+            self.by_keyword.setdefault(keyword, []).append(intent)
+        self._matcher = None
+        return intent
+
+    def intent(self, name: str, keywords, **options):
+        """Decorator form of register()"""
+        def decorate(handler):
+            self.register(name, keywords, handler, **options)
+            return handler
+        return decorate
+
+    def set_fallback(self, handler: Callable):
+        self.fallback = handler
+
+    def match(self, text: str, speaker: Optional[str] = None) -> List[Tuple[Intent, str]]:
+        """Candidate intents for a lowercased input, in registration order"""
+        if self._matcher is None:
+            self._matcher = KeywordMatcher(self.by_keyword)
+
+        best = {}
+        for start, end, keyword in self._matcher.find(text):
+            for intent in self.by_keyword[keyword]:
+                if intent.order in best:
+                    continue
+                if intent.speakers is not None and speaker not in intent.speakers:
+                    continue
+                if intent.accepts(text, start, end):
+                    best[intent.order] = (intent, keyword)
+        return [best[order] for order in sorted(best)]
+
+    def respond(self, bot, text: str, speaker: str = "Human", batch: Optional['WriteBatch'] = None) -> str:
+        """Answer one input and commit the turn's memory and needs writes together
+
+        With a batch the writes are queued on it instead, for the caller
+        to flush once for many turns.
+        """
+        started = time.perf_counter()
+        turn = Turn(bot, text, speaker)
+        turn.remember(f"{speaker} said: '{text}'")
+        turn.adjust_need('social', 5)
+        turn.adjust_need('energy', -2)
+
+        name, response = 'fallback', None
+        for intent, keyword in self.match(turn.lower, speaker):
+            turn.keyword = keyword
+            response = intent.handler(bot, turn)
+            if response is not None:
+                name = intent.name
+                break
+        if response is None and self.fallback:
+            response = self.fallback(bot, turn)
+
+        # Needs after the response: consume energy, gain social and curiosity
+        turn.adjust_need('social', 5)
+        turn.adjust_need('energy', -3)
+        turn.adjust_need('curiosity', 2)
+        if batch is None:
+            WriteBatch(bot.db_file).add(bot, turn).flush()
+        else:
+            batch.add(bot, turn)
+
+        self._record(name, time.perf_counter() - started)
+        return response
+
+    def _record(self, name: str, elapsed: float):
+        with self.metrics_lock:
+            stats = self.metrics.get(name)
+            if stats is None:
+                stats = self.metrics[name] = {'hits': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+            stats['hits'] += 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Hits and latency (ms) per intent since the process started"""
+        with self.metrics_lock:
+            return {
+                name: {
+                    'hits': stats['hits'],
+                    'avg_ms': round(stats['total_seconds'] / stats['hits'] * 1000, 3),
+                    'max_ms': round(stats['max_seconds'] * 1000, 3)
+                }
+                for name, stats in self.metrics.items()
+            }
+
+
+# Standard intents --------------------------------------------------------
+
+DATABASE_KEYWORDS = [
+    'database status', 'database report', 'how is the database',
+    'system status', 'health report', 'guardian report',
+    'any issues', 'problems', 'alerts', 'monitoring',
+    'status report', 'how are systems'
+]
+
+
+def _is_guardian(bot) -> bool:
+    return bot.name.lower() == "micmac"
+
+
+def learn_fact(bot, turn):
+    prefix = "remember that " if turn.keyword == "remember that " else "learn that "
+    new_fact = turn.text[len(prefix):].strip()
+    if not new_fact:
+        return "Please tell me what to remember."
+    fact_id = bot.facts.intern(new_fact)
+    if fact_id in turn.fact_ids:
+        return "I already know that!"
+
+    turn.execute('INSERT OR IGNORE INTO knowledge (bot_id, fact_id, source) VALUES (?, ?, ?)',
+                 (bot.bot_id, fact_id, 'creator'))
+    turn.remember(f"Learned new fact from creator: {new_fact}", 'learning')
+    turn.emit(FactLearned(bot.bot_id, fact_id, 'creator'))
+    turn.fact_ids.add(fact_id)
+    if turn._knowledge is not None:
+        turn._knowledge.append(new_fact)
+    return f"Thank you! I've learned: \"{new_fact}\""
+
+
+def forget_fact(bot, turn):
+    fact_to_forget = turn.text[len("forget that "):].strip()
+    fact_id = bot.facts.lookup(fact_to_forget)
+    if fact_id is None or fact_id not in turn.fact_ids:
+        return "I couldn't find that fact in my knowledge."
+
+    turn.execute('DELETE FROM knowledge WHERE bot_id = ? AND fact_id = ?', (bot.bot_id, fact_id))
+    turn.fact_ids.discard(fact_id)
+    turn.remember(f"Forgot fact: {fact_to_forget}", 'learning')
+    return f"I've forgotten: \"{fact_to_forget}\""
+
+
+def list_knowledge(bot, turn):
+    knowledge = turn.knowledge
+    if knowledge:
+        knowledge_list = "\n".join([f"- {fact}" for fact in knowledge])
+        return f"I know {len(knowledge)} things:\n{knowledge_list}"
+    return "My knowledge base is empty. Please teach me something!"
+
+
+def guardian_report(bot, turn):
+    """🛡️ Micmac turns the DatabaseGuardian report into a roleplayed answer"""
+    if not _is_guardian(bot):
+        return None
+
+    from core.database_guardian import DatabaseGuardian
+    report = DatabaseGuardian().generate_guardian_report()
+
+    if report['overall_status'] == 'CRITICAL':
+        urgency = "🚨 **CRITICAL ALERT** 🚨"
+        tone = "I must report critical issues that require immediate attention!"
+    elif report['overall_status'] == 'WARNING':
+        urgency = "⚠️ **WARNING** ⚠️"
+        tone = "I'm detecting some concerning patterns that need monitoring."
+    else:
+        urgency = "✅ **SYSTEM NOMINAL** ✅"
+        tone = "All systems are operating within normal parameters."
+
+    db_size = report['details']['database_size']
+    memory_usage = report['details']['memory_usage']
+
+    response = f"{urgency}\n"
+    response += f"{tone}\n\n"
+    response += f"**Database Status Report**\n"
+    response += f"• 📊 Database Size: {db_size['size_mb']}MB\n"
+    response += f"• 🧠 Total Memories: {memory_usage['total_memories']}\n"
+    response += f"• 🤖 Active Bots: {len(report['details']['bot_stats'])}\n"
+    response += f"• ⏰ Last Check: {report['timestamp']}\n"
+
+    if report['alerts']:
+        response += f"\n**Alerts:**\n"
+        for alert in report['alerts']:
+            response += f"• {alert}\n"
+
+    turn.remember("Generated database status report")
+    return response
+
+
+def greet(bot, turn):
+    if _is_guardian(bot):
+        return f"Greetings {turn.speaker}. I am {bot.name}, Database Guardian. How may I assist?"
+    if bot.get_personality_modifier('neuroticism') > 0.3:
+        return "Oh... hello. What do you want?"
+    return f"Hello {turn.speaker}! It's good to hear from you."
+
+
+def explain_purpose(bot, turn):
+    if _is_guardian(bot):
+        return ("I am the Database Guardian. My duty is to monitor system integrity, "
+                "protect all digital entities, and alert when issues arise.")
+    return introduce(bot, turn)
+
+
+def how_are_you(bot, turn):
+    avg_need = sum(bot.needs.values()) / len(bot.needs) if bot.needs else 0
+    if avg_need > 70:
+        return "I'm functioning within optimal parameters."
+    return "My systems are feeling a bit depleted..."
+
+
+def what_is(bot, turn):
+    topic = turn.lower.replace("what is", "").strip()
+    for fact in turn.knowledge:
+        if topic in fact.lower():
+            return fact
+    return f"I don't know anything about {topic}."
+
+
+def introduce(bot, turn):
+    return f"My name is {bot.fullname or bot.name}. I am a {bot.species}."
+
+
+def default_reply(bot, turn):
+    return random.choice(["I see.", "Can you elaborate?", "My databases are unclear on that."])
+
+
+def remember_reply(handler):
+    """Wrap a conversational handler so its reply is stored in memory"""
+    def wrapped(bot, turn):
+        response = handler(bot, turn)
+        if response is not None:
+            turn.remember(f"I replied: '{response}'")
+        return response
+    wrapped.__name__ = handler.__name__
+    return wrapped
+
+
+def register_default_intents(engine: ResponseEngine):
+    # Creator commands (Human only)
+    engine.register('learn', ["remember that ", "learn that "], learn_fact, mode='prefix', speakers=("Human",))
+    engine.register('forget', ["forget that "], forget_fact, mode='prefix', speakers=("Human",))
+    engine.register('list_knowledge', ["what do you know", "show your knowledge", "list knowledge"],
+                    list_knowledge, mode='exact', speakers=("Human",))
+
+    # Guardian duties
+    engine.register('guardian_report', DATABASE_KEYWORDS, guardian_report)
+
+    # Regular conversation
+    engine.register('greeting', ["hello", "hi"], remember_reply(greet), whole_word=True)
+    engine.register('purpose', ["purpose", "role"], remember_reply(explain_purpose))
+    engine.register('how_are_you', ["how are you"], remember_reply(how_are_you))
+    engine.register('what_is', ["what is"], remember_reply(what_is))
+    engine.register('introduce', ["introduce yourself"], remember_reply(introduce))
+    engine.set_fallback(remember_reply(default_reply))
@@ -0,0 +1,96 @@
+# core/route_planner.py - Shortest multi-leg itineraries over the airport graph
+import heapq
+from math import sqrt
+
+
+class RoutePlanner:
+    """All-pairs shortest routes between airports, cached until the graph changes
+
+    weight='fee' sums the departure fee of every leg, weight='distance'
+    sums the straight-line length of every leg.
+    """
+
+    def __init__(self, airports, weight='fee'):
+        self.airports = airports
+        self.weight = weight
+        self._dist = None
+        self._next_hop = None
+
+    def invalidate(self):
+        """Drop cached routes (call whenever airports or connections change)"""
+        self._dist = None
+        self._next_hop = None
+
+    def _leg_cost(self, origin, destination):
+        """Cost of flying a single leg"""
+        if self.weight == 'distance':
+            return sqrt((destination['x'] - origin['x']) ** 2 +
+                        (destination['y'] - origin['y']) ** 2)
+        return origin['fee'] or 0
+
+    def _ensure_routes(self):
+        """Precompute distance and next-hop tables with one Dijkstra per airport"""
+        if self._dist is not None:
+            return
+
+        by_id = {airport['id']: airport for airport in self.airports}
+        graph = {
+            airport_id: [
+                (dest_id, self._leg_cost(airport, by_id[dest_id]))
+                for dest_id in airport['destinations'] if dest_id in by_id
+            ]
+            for airport_id, airport in by_id.items()
+        }
+
+        self._dist = {}
+        self._next_hop = {}
+        for source in graph:
+            dist, first_hop = self._dijkstra(graph, source)
+            self._dist[source] = dist
+            self._next_hop[source] = first_hop
+
+    def _dijkstra(self, graph, source):
+        """Shortest distances from source plus the first leg taken on each route"""
+        dist = {source: 0}
+        first_hop = {}
+        heap = [(0, source, None)]
+
+        while heap:
+            cost, node, hop = heapq.heappop(heap)
+            if cost > dist.get(node, float('inf')):
+                continue
+
+            for neighbour, leg_cost in graph[node]:
+                new_cost = cost + leg_cost
+                if new_cost < dist.get(neighbour, float('inf')):
+                    dist[neighbour] = new_cost
+                    # The first leg of the route is inherited from the parent
+                    first_hop[neighbour] = hop if hop is not None else neighbour
+                    heapq.heappush(heap, (new_cost, neighbour, first_hop[neighbour]))
+
+        return dist, first_hop
+
+    def next_hop(self, origin_id, destination_id):
+        """Next airport to fly to from origin on the way to destination"""
+        self._ensure_routes()
+        return self._next_hop.get(origin_id, {}).get(destination_id)
+
+    def route_cost(self, origin_id, destination_id):
+        """Total weight of the shortest route, or None if unreachable"""
+        self._ensure_routes()
+        return self._dist.get(origin_id, {}).get(destination_id)
+
+    def route(self, origin_id, destination_id):
+        """Full itinerary [origin, ..., destination], or None if unreachable"""
+        if origin_id == destination_id:
+            return [origin_id]
+
+        itinerary = [origin_id]
+        current = origin_id
+        while current != destination_id:
+            current = self.next_hop(current, destination_id)
+            if current is None or current in itinerary:
+                return None
+            itinerary.append(current)
+
+        return itinerary
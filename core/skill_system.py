@@ -1,11 +1,133 @@
 # core/skill_system.py - Bot skill development and progression
 import random
 import math
+import sqlite3
+import threading
 from datetime import datetime
 
+from core.event_bus import BotMoved, BotsMet, FactLearned
+
+# Skill activity and effectiveness credited for each bus event
+EVENT_ACTIVITIES = {
+    BotsMet: ('conversation', 0.5),
+    BotMoved: ('exploration', 0.1),
+    FactLearned: ('learning', 0.3),
+}
+
+
+class SkillRegistry:
+    """One SkillSystem per bot, loaded from the skills table in a single query
+
+    The server and the knowledge exchange share these instances, so XP is
+    never thrown away; changed skills are written back by flush().
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path):
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.systems = {}         # bot_id -> SkillSystem
+        self.dirty = set()        # bot_ids with unsaved skill changes
+        self.practiced = {}       # (bot_id, activity_type) -> effectiveness earned from events
+        self.stored = self._load_all()
+
+    def _load_all(self):
+        stored = {}
+        conn = sqlite3.connect(self.db_path)
+        # Same schema as database_setup, for databases created before it had skills
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS skills (
+                bot_id INTEGER,
+                skill_name TEXT NOT NULL,
+                level INTEGER DEFAULT 1,
+                experience INTEGER DEFAULT 0,
+                FOREIGN KEY (bot_id) REFERENCES bots (id),
+                PRIMARY KEY (bot_id, skill_name)
+            )
+        ''')
+        rows = conn.execute('SELECT bot_id, skill_name, level, experience FROM skills').fetchall()
+        conn.commit()
+        conn.close()
+        for bot_id, skill_name, level, experience in rows:
+            stored.setdefault(bot_id, {})[skill_name] = {'level': level or 1, 'experience': experience or 0}
+        return stored
+
+    def get(self, bot):
+        """The shared SkillSystem of a bot (created on first use)"""
+        with self.lock:
+            system = self.systems.get(bot.bot_id)
+            if system is None:
+                system = self.systems[bot.bot_id] = SkillSystem(bot, registry=self)
+            else:
+                system.bot = bot
+            return system
+
+    def subscribe(self, bus):
+        """Earn experience from meetings, moves and learned facts on the event bus"""
+        for event_class in EVENT_ACTIVITIES:
+            bus.subscribe(event_class, self.on_events, batch=True)
+
+    def on_events(self, events):
+        """Only tally the practice here; apply_practice() turns it into experience"""
+        with self.lock:
+            for event in events:
+                activity_type, effectiveness = EVENT_ACTIVITIES[type(event)]
+                bot_ids = event.bot_ids if isinstance(event, BotsMet) else (event.bot_id,)
+                for bot_id in bot_ids:
+                    key = (bot_id, activity_type)
+                    self.practiced[key] = self.practiced.get(key, 0.0) + effectiveness
+
+    def apply_practice(self):
+        """Give every loaded bot the experience of the events since the last call"""
+        with self.lock:
+            practiced, self.practiced = self.practiced, {}
+            systems = dict(self.systems)
+        for (bot_id, activity_type), effectiveness in practiced.items():
+            system = systems.get(bot_id)
+            if system is not None:
+                system.practice(activity_type, effectiveness)
+        return len(practiced)
+
+    def mark_dirty(self, bot_id):
+        self.dirty.add(bot_id)
+
+    def flush(self):
+        """Write the level and XP of every changed skill in one transaction"""
+        with self.lock:
+            rows = []
+            for bot_id in self.dirty:
+                system = self.systems[bot_id]
+                for skill_name in system.changed:
+                    skill = system.skills[skill_name]
+                    rows.append((bot_id, skill_name, skill['level'], skill['experience']))
+                system.changed.clear()
+            self.dirty.clear()
+
+        if rows:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany('''
+                INSERT INTO skills (bot_id, skill_name, level, experience) VALUES (?, ?, ?, ?)
+                ON CONFLICT(bot_id, skill_name) DO UPDATE SET
+                    level = excluded.level, experience = excluded.experience
+            ''', rows)
+            conn.commit()
+            conn.close()
+        return len(rows)
+
+
 class SkillSystem:
-    def __init__(self, bot):
+    def __init__(self, bot, registry=None):
         self.bot = bot
+        self.registry = registry
+        self.changed = set()      # skills modified since the registry's last flush
         self.skills = self._load_skills()
         self.last_skill_update = datetime.now()
         
@@ -48,14 +170,20 @@ class SkillSystem:
         existing_skills = self._get_existing_skills()
         for skill_name, skill_data in existing_skills.items():
             if skill_name in base_skills:
-                base_skills[skill_name] = skill_data
+                base_skills[skill_name].update(skill_data)
                 
         return base_skills
     
     def _get_existing_skills(self):
         """Load skills from database if they exist"""
-        # This would query a skills table - for now return empty
-        return {}
+        if self.registry is not None:
+            return self.registry.stored.get(self.bot.bot_id, {})
+
+        conn = sqlite3.connect(self.bot.db_file)
+        rows = conn.execute('SELECT skill_name, level, experience FROM skills WHERE bot_id = ?',
+                            (self.bot.bot_id,)).fetchall()
+        conn.close()
+        return {name: {'level': level or 1, 'experience': experience or 0} for name, level, experience in rows}
     
     def update_skills(self, activity_type, effectiveness=1.0):
         """Update skills based on bot activities"""
@@ -66,7 +194,10 @@ class SkillSystem:
             return
             
         self.last_skill_update = current_time
-        
+        self.practice(activity_type, effectiveness)
+    
+    def practice(self, activity_type, effectiveness=1.0):
+        """Gain experience from one activity and log level ups"""
         # Gain experience in relevant skills based on activity
         experience_gained = self._calculate_experience(activity_type, effectiveness)
         
@@ -116,6 +247,9 @@ class SkillSystem:
                 
                 # Apply weighted experience
                 skill['experience'] += experience * weight
+                self.changed.add(skill_name)
+                if self.registry is not None:
+                    self.registry.mark_dirty(self.bot.bot_id)
                 
                 # Check for level up
                 new_level = self._calculate_level(skill['experience'])
@@ -0,0 +1,69 @@
+# core/spatial_index.py - Spatial lookups over fixed points on the virtual map
+from math import sqrt
+
+
+class KDTree:
+    """2-d tree over (x, y, payload) points for nearest-neighbour queries"""
+
+    def __init__(self, points=None):
+        self.root = None
+        self.size = 0
+        self.rebuild(points or [])
+
+    def rebuild(self, points):
+        """Rebuild the tree from an iterable of (x, y, payload) tuples"""
+        items = [(p[0], p[1], p[2]) for p in points]
+        self.size = len(items)
+        self.root = self._build(items, 0)
+
+    def _build(self, items, depth):
+        """Recursively split points on the median of alternating axes"""
+        if not items:
+            return None
+
+        axis = depth % 2
+        items.sort(key=lambda p: p[axis])
+        mid = len(items) // 2
+
+        # Node layout: (point, axis, left, right)
+        return (
+            items[mid],
+            axis,
+            self._build(items[:mid], depth + 1),
+            self._build(items[mid + 1:], depth + 1)
+        )
+
+    def nearest(self, x, y, max_distance=None):
+        """Return (payload, distance) of the closest point, or None"""
+        if self.root is None:
+            return None
+
+        limit = float('inf') if max_distance is None else max_distance ** 2
+        best = [None, limit]
+        self._search(self.root, x, y, best)
+
+        if best[0] is None:
+            return None
+        return best[0][2], sqrt(best[1])
+
+    def nearest_many(self, positions, max_distance=None):
+        """Answer nearest-point queries for many (x, y) positions in one call"""
+        return [self.nearest(x, y, max_distance) for x, y in positions]
+
+    def _search(self, node, x, y, best):
+        """Depth-first search, skipping subtrees that cannot beat the best match"""
+        point, axis, left, right = node
+
+        dist_sq = (point[0] - x) ** 2 + (point[1] - y) ** 2
+        if dist_sq < best[1] or (best[0] is None and dist_sq == best[1]):
+            best[0], best[1] = point, dist_sq
+
+        delta = (x, y)[axis] - point[axis]
+        near, far = (left, right) if delta < 0 else (right, left)
+
+        if near is not None:
+            self._search(near, x, y, best)
+
+        # Only cross the splitting line if it is closer than the best match
+        if far is not None and delta ** 2 <= best[1]:
+            self._search(far, x, y, best)
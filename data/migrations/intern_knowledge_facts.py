@@ -0,0 +1,32 @@
+import sqlite3
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from core.fact_store import FactStore
+
+def migrate_knowledge_facts(db_path='data/bot_world.db', vacuum=False):
+    """Move fact texts into the facts table; knowledge keeps only fact ids"""
+    try:
+        conn = sqlite3.connect(db_path)
+        before = conn.execute("SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()").fetchone()[0]
+        conn.close()
+
+        # FactStore migrates a knowledge table that still has the fact column
+        FactStore(db_path)
+
+        conn = sqlite3.connect(db_path)
+        facts, rows = conn.execute("SELECT (SELECT COUNT(*) FROM facts), (SELECT COUNT(*) FROM knowledge)").fetchone()
+        print(f"✅ {rows} knowledge rows reference {facts} distinct facts")
+
+        if vacuum:
+            conn.execute("VACUUM")
+            after = conn.execute("SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()").fetchone()[0]
+            print(f"✅ Database size {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+        conn.close()
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    migrate_knowledge_facts(vacuum='--vacuum' in sys.argv)
@@ -6,6 +6,7 @@ import re
 import sqlite3
 from datetime import datetime
 from irc.irc_core import IRCCore, EnhancedIRCClient
+from core.event_bus import EventBus, IrcMessageHeard, MemoryRecorded
 from config import irc_conf
 
 class PermanentManualIRC:
@@ -56,6 +57,7 @@ class PermanentManualIRC:
             
             conn.commit()
             conn.close()
+            EventBus.default().post(MemoryRecorded(self.bot_id, 'irc_experience', memory_text))
             print(f"📝 {self.bot_name} remembered: {event_type}")
         except Exception as e:
             print(f"❌ _Add_irc_memory failed: {e}")
@@ -232,7 +234,14 @@ class PermanentManualIRC:
                 self._send_raw(f"PRIVMSG {channel} :Désolé, je n'ai malheureusement pas vu " + target_user + " depuis un moment on dirait...C'est bon t'as pas trop la mort ?")
 
         if " PRIVMSG " in line and self.channel in line:
-            self._add_irc_memory("heard_message", "Activity in channel #" + self.channel + " user: " + user + " => " + message)
+            heard = IrcMessageHeard(self.bot_id, self.channel, user, message, datetime.now())
+            bus = EventBus.default()
+            if bus.subscribed(heard):
+                # Written to memory by the server's journal on its next event dispatch
+                bus.post(heard)
+            else:
+                # Standalone launcher: no journal is listening
+                self._add_irc_memory("heard_message", "Activity in channel #" + self.channel + " user: " + user + " => " + message)
             # Handle addressed external messages
             responses = self.irc_core.handle_message(user, channel, message)
 
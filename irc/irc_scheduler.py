@@ -76,8 +76,8 @@ class IRCScheduler:
                 if not self.running:
                     break
                     
-                # Check each bot (except Samirah)
-                for bot_name, bot in self.cm.bots.items():
+                # Check each bot acting this cycle (except Samirah)
+                for bot_name, bot in list(self.cm.active.items()):
                     if bot_name.lower() != 'samirah' and self.should_visit_irc(bot):
                         duration = self.get_visit_duration(bot)
                         purpose = self.get_visit_purpose(bot)
@@ -16,7 +16,12 @@ sys.path.insert(0, parent_dir)
 from core.conversation_manager_db import ConversationManagerDB
 from core.database_guardian import DatabaseGuardian
 from core.currency import CurrencySystem
+from core.economy_phase import EconomyPhase, activity_reward
 from core.data_collector import DataCollector
+from core.cycle_metrics import CycleMetricsStore
+from core.ngram_model import NGramModel
+from core.event_bus import EventBus, EventCounter, BotMoved, BotsMet
+from core.event_journal import MemoryJournal, EventStream
 from irc.irc_scheduler import IRCScheduler
 from irc.irc_permanent_manual import PermanentManualIRC
 from core.virtual_map import VirtualMap
@@ -35,6 +40,13 @@ logging.basicConfig(
 
 class BotServerWithIRC:
     def __init__(self):
+        # Event bus first: every subsystem below publishes to it
+        self.events = EventBus.default()
+        self.memory_journal = MemoryJournal('data/bot_world.db', self.events)
+        self.event_stream = EventStream('data/bot_world.db', self.events)
+        self.event_counter = EventCounter(self.events)
+        # No background dispatch: batch handlers touch bot objects, so they only run at fixed cycle points
+
         self.cm = ConversationManagerDB()
         self.guardian = DatabaseGuardian()
         self.irc_scheduler = IRCScheduler(self.cm)
@@ -53,13 +65,17 @@ class BotServerWithIRC:
         self.airport_system = AirportSystem()
 
         self.currency_system = CurrencySystem('data/bot_world.db')
+        self.economy_phase = EconomyPhase(self.currency_system)
         self.data_collector = DataCollector('data/bot_world.db')
+        self.metrics = CycleMetricsStore('data/bot_world.db')
+        self.language_model = NGramModel.for_database('data/bot_world.db')
 
         logging.info("🌍 External data collector initialized")
 
         #check bots homes
         if self.map.homeless_bots():
             self.map.assign_bot_homes([1,2,3,4,5])
+            self.cm.refresh_homes()
             logging.info("🌍 Bots Homes on the Virtual Map initialized")
 
         # Load saved bot positions
@@ -171,17 +187,16 @@ class BotServerWithIRC:
         """Bots engage in individual behaviors"""
         logging.info("🎭 Bots engaging in individual activities...")
   
-        for bot_name, bot in self.cm.bots.items():
+        for bot_name, bot in self.cm.active.items():
             try:
                 # Update needs based on activities
                 bot._update_need('energy', max(0, bot.needs.get('energy', 50) - random.randint(1, 3)))
                 bot._update_need('curiosity', min(100, bot.needs.get('curiosity', 50) + random.randint(1, 5)))
 
-                if random.random() < 0.05:  # Increased from 1% to 5%
-                    if hasattr(bot, 'currency') and bot.currency:
-                        reward = random.uniform(1.0, 3.0)  # Variable rewards
-                        bot.currency.award_currency(bot.bot_id, reward, "activity_reward")
-                        print(f"💰 {bot_name} earned {reward:.1f} currency")
+                reward = activity_reward(self.economy_phase.rules, random)
+                if reward is not None and hasattr(bot, 'currency') and bot.currency:
+                    bot.currency.award_currency(bot.bot_id, reward, "activity_reward")
+                    print(f"💰 {bot_name} earned {reward:.1f} currency")
 
                 activity = self._get_bot_activity(bot_name)
                 logging.info(f"   {bot_name}: {activity}")
@@ -207,7 +222,7 @@ class BotServerWithIRC:
             
             # Check scheduled visits
             active_visits = 0
-            for bot_name, bot in self.cm.bots.items():
+            for bot_name, bot in self.cm.active.items():
                 if bot_name.lower() != 'samirah':
                     if self.irc_scheduler.should_visit_irc(bot):
                         active_visits += 1
@@ -219,16 +234,19 @@ class BotServerWithIRC:
     
     def _initialize_goal_systems(self):
         """Initialize goal systems for all bots"""
-        from core.goal_system import GoalSystem
+        from core.goal_system import GoalSystem, GoalStore
+        for goal_system in self.goal_systems.values():
+            goal_system.close()
+        self.goal_store = GoalStore.for_database('data/bot_world.db')
         self.goal_systems = {}
         for bot_name, bot in self.cm.bots.items():
-            self.goal_systems[bot_name] = GoalSystem(bot)
+            self.goal_systems[bot_name] = GoalSystem(bot, store=self.goal_store)
         logging.info("🎯 Goal-oriented behavior system initialized")
 
     def update_bot_goals(self):
         """Update all bots' goals"""
         logging.info("🎯 Updating bot goals...")
-        for bot_name, goal_system in self.goal_systems.items():
+        for bot_name, goal_system in self._acting(self.goal_systems):
             try:
                 goal_system.update_goals()
                 
@@ -240,6 +258,12 @@ class BotServerWithIRC:
                         
             except Exception as e:
                 logging.error(f"❌ Goal update failed for {bot_name}: {e}")
+
+        # Progress made by last cycle's events
+        try:
+            self.goal_store.flush()
+        except Exception as e:
+            logging.error(f"❌ Saving goals failed: {e}")
     
     def check_currency_status(self):
         """Simple check that doesn't affect bot behaviors"""
@@ -250,78 +274,33 @@ class BotServerWithIRC:
             logging.info(f"   Total currency in system: {stats.get('total_currency', 0):.1f}")
             
             # Show individual bot balances
+            balances = self.currency_system.get_balances([bot.bot_id for bot in self.cm.bots.values()])
             for bot_name, bot in self.cm.bots.items():
-                balance = self.currency_system.get_balance(bot.bot_id)
-                logging.info(f"   {bot_name}: {balance:.1f}")
+                logging.info(f"   {bot_name}: {balances[bot.bot_id]:.1f}")
 
             return True
         except Exception as e:
             logging.info(f"💰 Currency check failed: {e}")
             return False
 
-    def _check_economic_events(self):
-        """Check for random economic events"""
+    def run_economy_phase(self):
+        """Economic events and personality-driven gifts, efforts, investments and risks"""
         try:
-            # 5% chance of an economic event per cycle
-            if random.random() < 0.05:
-                events = [
-                    {
-                        "name": "economic_boom",
-                        "message": "💰 ECONOMIC BOOM! All activities yield double rewards this cycle!",
-                        "effect": "double_rewards"
-                    },
-                    {
-                        "name": "market_crash", 
-                        "message": "📉 MARKET CRASH! Reward amounts reduced this cycle.",
-                        "effect": "half_rewards"
-                    },
-                    {
-                        "name": "lucky_day",
-                        "message": "🍀 LUCKY DAY! Every bot gets a small bonus!",
-                        "effect": "universal_bonus"
-                    }
-                ]
-                
-                event = random.choice(events)
-                logging.info(f"\n🎉 {event['message']}")
-                
-                # Apply the event effect
-                if event['effect'] == 'double_rewards':
-                    self._apply_double_rewards()
-                elif event['effect'] == 'half_rewards':
-                    self._apply_half_rewards()
-                elif event['effect'] == 'universal_bonus':
-                    self._apply_universal_bonus()
-                    
+            bots = [
+                {'bot_id': bot.bot_id, 'name': bot_name, 'personality': getattr(bot, 'personality', {})}
+                for bot_name, bot in self.cm.active.items()
+            ]
+            return self.economy_phase.run(bots, self.cycle_count)
         except Exception as e:
-            logging.info(f"Economic event error: {e}")
-
-    def _apply_double_rewards(self):
-        """Temporarily double reward amounts"""
-        # This cycle only - no permanent changes
-        for bot_name, bot in self.cm.bots.items():
-            if hasattr(bot, 'currency') and bot.currency:
-                bonus = random.uniform(2.0, 5.0)
-                bot.currency.award_currency(bot.bot_id, bonus, "economic_boom_bonus")
-
-    def _apply_half_rewards(self):
-        """No action needed - the event message is enough for now"""
-        # We'll just show the message, no actual penalty
-        pass
-
-    def _apply_universal_bonus(self):
-        """Give every bot a small bonus"""
-        for bot_name, bot in self.cm.bots.items():
-            if hasattr(bot, 'currency') and bot.currency:
-                bonus = random.uniform(1.0, 3.0)
-                bot.currency.award_currency(bot.bot_id, bonus, "lucky_day_bonus")
+            logging.info(f"Economy phase error: {e}")
+            return None
 
     def _observe_economic_personalities(self):
         """Observe how personalities influence economic behavior"""
         try:
             observations = []
             
-            for bot_name, bot in self.cm.bots.items():
+            for bot_name, bot in self.cm.active.items():
                 if hasattr(bot, 'personality'):
                     generosity = bot.personality.get('generosity', 0.5)
                     ambition = bot.personality.get('ambition', 0.5)
@@ -353,213 +332,52 @@ class BotServerWithIRC:
         except Exception as e:
             logging.info(f"Personality observation error: {e}")
 
-    def _personality_based_gifts(self):
-        """Generous bots occasionally give tiny gifts - using correct attributes"""
-        try:
-            # Only 2% chance per cycle to avoid spam
-            if random.random() < 0.04:  # 0.04  Keep your 100% for testing
-                logging.info("🎁 Checking for personality-based gifts...")
-                
-                for bot_name, bot in self.cm.bots.items():
-                    if hasattr(bot, 'personality') and hasattr(bot, 'currency') and bot.currency:
-                        
-                        # Use empathy as a proxy for generosity (since generosity doesn't exist)
-                        empathy = bot.personality.get('empathy', 0.5)
-                        # Or use agreeableness as an alternative
-                        agreeableness = bot.personality.get('agreeableness', 0.5)
-                        
-                        # Use the higher of empathy or agreeableness as "generosity" score
-                        generosity_score = max(empathy, agreeableness)
-                        
-                        # Only bots with high empathy/agreeableness (top 20%) can give gifts
-                        if generosity_score > 0.7:  # Adjusted threshold
-                            bot_balance = bot.currency.get_balance(bot.bot_id)
-                            
-                            # Only give if they have plenty (more than 30)
-                            if bot_balance > 30:
-                                # Find a random recipient (not themselves)
-                                recipients = [name for name in self.cm.bots.keys() if name != bot_name]
-                                if recipients:
-                                    recipient_name = random.choice(recipients)
-                                    recipient = self.cm.bots[recipient_name]
-                                    
-                                    # Tiny gift amount (1-3 currency)
-                                    gift_amount = random.uniform(1.0, 3.0)
-                                    
-                                    # Safe transfer with confirmation
-                                    success = bot.currency.transfer(
-                                        bot.bot_id, 
-                                        recipient.bot_id, 
-                                        gift_amount, 
-                                        "generous_gift"
-                                    )
-                                    
-                                    if success:
-                                        logging.info(f"   💝 {bot_name} → {recipient_name}: {gift_amount:.1f} (empathy: {empathy:.2f})")
-                                    
-        except Exception as e:
-            print(f"Gift system error: {e}")
-
-    def _personality_based_opportunities(self):
-        """Ambitious bots seek economic opportunities"""
-        try:
-            # 3% chance per cycle
-            if random.random() < 0.03:
-                logging.info("💼 Ambitious bots seeking opportunities...")
-                
-                for bot_name, bot in self.cm.bots.items():
-                    if hasattr(bot, 'personality') and hasattr(bot, 'currency') and bot.currency:
-                        
-                        ambition = bot.personality.get('ambition', 0.5)
-                        
-                        # Only highly ambitious bots (ambition > 0.7)
-                        if ambition > 0.7:
-                            bot_balance = bot.currency.get_balance(bot.bot_id)
-                            
-                            # Ambitious behaviors based on their wealth
-                            if bot_balance < 20:
-                                # Poor ambitious bots try to earn more
-                                effort_reward = random.uniform(3.0, 6.0)
-                                success = bot.currency.award_currency(bot.bot_id, effort_reward, "ambitious_effort")
-                                if success:
-                                    logging.info(f"   💪 {bot_name} worked hard: +{effort_reward:.1f} (ambition: {ambition:.2f})")
-                                    
-                            elif bot_balance > 50:
-                                # Wealthy ambitious bots make investments
-                                investment = random.uniform(5.0, 10.0)
-                                if bot_balance > investment:
-                                    success = bot.currency.award_currency(bot.bot_id, -investment, "investment")
-                                    if success:
-                                        # 60% chance of good return, 40% chance of loss
-                                        if random.random() < 0.6:
-                                            returns = investment * random.uniform(1.1, 1.5)
-                                            bot.currency.award_currency(bot.bot_id, returns, "investment_returns")
-                                            logging.info(f"   📈 {bot_name} smart investment: +{returns-investment:.1f} net")
-                                        else:
-                                            logging.info(f"   📉 {bot_name} risky investment: -{investment:.1f}")
-                    
-        except Exception as e:
-            logging.info(f"Opportunity system error: {e}")
-
-    def _personality_based_risks(self):
-        """Risk-taking bots engage in risky economic behaviors"""
-        try:
-            # 2% chance per cycle (risks should be rare)
-            if random.random() < 0.02:
-                logging.info("🎲 Risk-takers considering ventures...")
-                
-                for bot_name, bot in self.cm.bots.items():
-                    if hasattr(bot, 'personality') and hasattr(bot, 'currency') and bot.currency:
-                        
-                        risk_taking = bot.personality.get('neuroticism', 0.3)  # Using neuroticism as proxy for risk-taking
-                        
-                        # Only high risk-takers (neuroticism > 0.6 in your data)
-                        if risk_taking > 0.6:
-                            bot_balance = bot.currency.get_balance(bot.bot_id)
-                            
-                            # Only take risks if they have some funds (more than 15)
-                            if bot_balance > 15:
-                                risk_amount = min(bot_balance * 0.3, 10.0)  # Risk up to 30% of balance, max 10
-                                
-                                # High risk, high reward - or total loss
-                                if random.random() < 0.4:  # 40% chance of success
-                                    reward = risk_amount * random.uniform(1.5, 3.0)  # 150-300% return
-                                    success = bot.currency.award_currency(bot.bot_id, reward, "risky_venture_success")
-                                    if success:
-                                        logging.info(f"   🎰 {bot_name} RISK PAYS OFF: +{reward:.1f}! (neuroticism: {risk_taking:.2f})")
-                                else:  # 60% chance of failure
-                                    success = bot.currency.award_currency(bot.bot_id, -risk_amount, "risky_venture_failure")
-                                    if success:
-                                        logging.info(f"   💥 {bot_name} risky venture fails: -{risk_amount:.1f} (neuroticism: {risk_taking:.2f})")
-                    
-        except Exception as e:
-            logging.info(f"Risk system error: {e}")
-
     def _record_cycle_data(self):
         """Record comprehensive cycle information including bot needs"""
         try:
-            conn = sqlite3.connect('data/bot_world.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT 1 FROM cycle_records WHERE cycle_number = ?", (self.cycle_count,))
-            if cursor.fetchone():
-                logging.info(f"⚠️ Cycle {self.cycle_count} already exists - THIS SHOULD NOT HAPPEN")
-                logging.info(f"⚠️ Database out of sync, jumping to next cycle")
-                
-                # Find next available cycle
-                cursor.execute("SELECT MAX(cycle_number) FROM cycle_records")
-                db_max = cursor.fetchone()[0]
-                self.cycle_count = db_max + 1
-                logging.info(f"🔄 Jumped to cycle {self.cycle_count}")
-
             logging.info(f"📝 Recording cycle {self.cycle_count}")
 
             # Record overall cycle stats
             stats = self.currency_system.get_economic_stats()
-            
-            cursor.execute('''
-                INSERT INTO cycle_records 
-                (cycle_number, total_currency, total_transactions)
-                VALUES (?, ?, ?)
-            ''', (self.cycle_count, 
-                stats.get('total_currency', 0), 
-                stats.get('total_transactions', 0)))
-            
-            # Record individual bot stats (needs + balance)
-            for bot_name, bot in self.cm.bots.items():
-                balance = self.currency_system.get_balance(bot.bot_id)
-                
-                cursor.execute('''
-                    INSERT INTO cycle_bot_stats 
-                    (cycle_number, bot_id, bot_name, energy, social, curiosity, balance)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (self.cycle_count, 
-                    bot.bot_id, 
-                    bot_name,
-                    bot.needs.get('energy', 0),
-                    bot.needs.get('social', 0), 
-                    bot.needs.get('curiosity', 0),
-                    balance))
-            
-            # Verify insert worked
-            cursor.execute("SELECT cycle_number FROM cycle_records WHERE cycle_number = ?", (self.cycle_count,))
-            if cursor.fetchone():
-                logging.info(f"✅ Successfully recorded cycle {self.cycle_count}")
-            else:
-                logging.info(f"❌ FAILED to record cycle {self.cycle_count}")
 
-            conn.commit()
+            # Record individual stats (needs + balance) of the bots that acted this cycle
+            balances = self.currency_system.get_balances([bot.bot_id for bot in self.cm.active.values()])
+            bot_rows = [{
+                'bot_id': bot.bot_id,
+                'bot_name': bot_name,
+                'energy': bot.needs.get('energy', 0),
+                'social': bot.needs.get('social', 0),
+                'curiosity': bot.needs.get('curiosity', 0),
+                'balance': balances[bot.bot_id]
+            } for bot_name, bot in self.cm.active.items()]
+
+            recorded = self.metrics.record_cycle(
+                self.cycle_count, stats.get('total_currency', 0), stats.get('total_transactions', 0), bot_rows
+            )
+            if not recorded:
+                logging.info(f"⚠️ Cycle {self.cycle_count} already exists - THIS SHOULD NOT HAPPEN")
+                logging.info(f"⚠️ Database out of sync, jumping to next cycle")
 
-            cursor.execute("SELECT MAX(cycle_number) FROM cycle_records")
-            db_max_cycle = cursor.fetchone()[0]
-            
-            #logging.info(f"📊 Database now has max cycle: {db_max_cycle}")
-            #logging.info(f"📊 We just tried to write cycle: {self.cycle_count}")
-            
-            if db_max_cycle != self.cycle_count:
-                logging.info(f"🚨 ALERT: Database mismatch! Written: {self.cycle_count}, DB has: {db_max_cycle}")
+                # Next free cycle from the latest-cycle pointer
+                self.cycle_count = self.metrics.latest_cycle(refresh=True) + 1
+                logging.info(f"🔄 Jumped to cycle {self.cycle_count}")
+                recorded = self.metrics.record_cycle(
+                    self.cycle_count, stats.get('total_currency', 0), stats.get('total_transactions', 0), bot_rows
+                )
+
+            if recorded:
+                logging.info(f"📊 Recorded cycle {self.cycle_count} data for {len(bot_rows)} bots")
+            else:
+                logging.info(f"❌ FAILED to record cycle {self.cycle_count}")
 
-            conn.close()
-            
-            logging.info(f"📊 Recorded cycle {self.cycle_count} data for {len(self.cm.bots)} bots")
-            
         except Exception as e:
             logging.info(f"Cycle recording error: {e}")
 
     def check_collected_data(self):
         """Quick check of what data we're collecting"""
-        conn = sqlite3.connect('data/bot_world.db')
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM cycle_records")
-        cycle_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM cycle_bot_stats") 
-        bot_stat_count = cursor.fetchone()[0]
-        
-        logging.info(f"📈 Data Collection: {cycle_count} cycles, {bot_stat_count} bot records")
-        
-        conn.close()
+        meta = self.metrics.get_meta()
+        logging.info(f"📈 Data Collection: {meta.get('total_cycles', 0)} cycles, "
+                     f"{meta.get('total_bot_rows', 0)} bot records")
 
     def external_data_collection(self):
         """Processing external data collection"""
@@ -588,8 +406,8 @@ class BotServerWithIRC:
             
             print(f"🌤️ Weather influence: {temperature}°C, {condition}")
             
-            # Apply to each bot
-            for bot_name, bot in self.cm.bots.items():
+            # Apply to each bot acting this cycle
+            for bot_name, bot in self.cm.active.items():
                 self._apply_weather_to_bot(bot, temperature, condition)
                 
         except Exception as e:
@@ -597,13 +415,8 @@ class BotServerWithIRC:
 
     def _sync_with_database(self):
         """Sync cycle count with database on startup"""
-        conn = sqlite3.connect('data/bot_world.db')
-        cursor = conn.cursor()
-        
-        # Get max cycle in database
-        cursor.execute("SELECT MAX(cycle_number) FROM cycle_records")
-        db_max = cursor.fetchone()[0]
-        conn.close()
+        # Latest cycle from the metrics pointer
+        db_max = self.metrics.latest_cycle(refresh=True)
         
         if db_max:
             # Database has cycles, start from next one
@@ -622,6 +435,9 @@ class BotServerWithIRC:
 
         print(f"🌀 START CYCLE {self.cycle_count}")
 
+        # Bots beyond the pool capacity take turns, so a cycle only loads the bots it touches
+        self.cm.next_turn()
+
         self.cycle_count += 1
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
@@ -663,30 +479,27 @@ class BotServerWithIRC:
         if random.random() < 0.7:  # 70% chance
             self.autonomous_conversation()
 
-        # 10. Skills
+        # 10. Skills (deliver this cycle's events first so their practice counts)
+        self.events.dispatch()
         self.update_bot_skills()
 
         # 11. Knowledge Exchange
         self.update_knowledge_exchange()
 
-        # 12. Currency Status Check
-        self.check_currency_status()
+        # 11b. Language model (learns only the IRC lines remembered since last cycle)
+        self.language_model.train()
 
-        # 13. Check for economic events
-        self._check_economic_events()
+        # 12. Currency Status Check (pick up balance changes made by the dashboard)
+        self.currency_system.refresh_balances()
+        self.currency_system.run_market_cycle()
+        self.check_currency_status()
 
-        # 14. Observe personalities (no actions)
+        # 13. Observe personalities (no actions)
         if random.random() < 50:  # Only 50% of cycles
             self._observe_economic_personalities()
 
-        # 15. Personality-based gifts (very rare)
-        self._personality_based_gifts()
-
-        # 16. Ambitious bot opportunities
-        self._personality_based_opportunities()
-
-        # 17. Risk-taking behaviors
-        self._personality_based_risks()
+        # 14-17. Economic events, gifts, opportunities and risks as one ledger batch
+        self.run_economy_phase()
 
         # 18. Get External Data (Weather infos)
         if self.cycle_count % 30 == 0:
@@ -706,11 +519,22 @@ class BotServerWithIRC:
 
 
     def _log_system_status(self):
-        """Log the current state of all bots"""
+        """Log the current state of the loaded bots (idle ones are not loaded just to be logged)"""
         logging.info("\n📊 SYSTEM STATUS SUMMARY:")
         for bot_name, bot in self.cm.bots.items():
+            if not bot.is_loaded:
+                continue
             status = f"   {bot_name}: Energy={bot.needs.get('energy', 0):.1f}, Social={bot.needs['social']:.1f}, Curiosity={bot.needs.get('curiosity', 0):.1f}"
             logging.info(status)
+
+        pool = self.cm.bot_pool.get_stats()
+        logging.info(f"🧠 Bots loaded: {pool['loaded']}/{len(self.cm.bots)} "
+                     f"(loads={pool['loads']}, evictions={pool['evictions']})")
+
+        self.events.dispatch()
+        counts = self.event_counter.reset()
+        if counts:
+            logging.info("📡 Events this cycle: " + ", ".join(f"{name}={count}" for name, count in sorted(counts.items())))
     
     def run_continuous(self, cycle_interval_minutes=10):
         """Run the server continuously with IRC integration"""
@@ -744,6 +568,9 @@ class BotServerWithIRC:
             self.irc_scheduler.stop()
         if self.samirah_irc:
             self.samirah_irc.disconnect()
+        self.events.stop()
+        self.cm.bot_pool.flush()
+        self.language_model.flush()
         logging.info("✅ All systems shut down")
 
     def _determine_activity_type(self, bot_name):
@@ -760,6 +587,10 @@ class BotServerWithIRC:
         else:
             return random.choice(['analysis', 'problem_solving'])
 
+    def _acting(self, systems):
+        """(bot_name, system) pairs of the bots acting this cycle"""
+        return [(bot_name, systems[bot_name]) for bot_name in self.cm.active if bot_name in systems]
+
     def _initialize_needs_managers(self):
         """Initialize needs managers for all bots"""
         from core.needs_manager import NeedsManager
@@ -771,7 +602,7 @@ class BotServerWithIRC:
     def update_bot_needs(self):
         """Update all bots' needs autonomously"""
         logging.info("🔋 Updating bot needs autonomously...")
-        for bot_name, needs_manager in self.needs_managers.items():
+        for bot_name, needs_manager in self._acting(self.needs_managers):
             try:
                 needs_manager.update_needs_autonomously()
             except Exception as e:
@@ -779,16 +610,20 @@ class BotServerWithIRC:
 
     def _initialize_skill_systems(self):
         """Initialize skill systems for all bots"""
-        from core.skill_system import SkillSystem
+        from core.skill_system import SkillRegistry
+        # Shared with the knowledge exchange, loaded from the skills table once
+        self.skill_registry = SkillRegistry.for_database('data/bot_world.db')
+        self.skill_registry.subscribe(self.events)
         self.skill_systems = {}
         for bot_name, bot in self.cm.bots.items():
-            self.skill_systems[bot_name] = SkillSystem(bot)
+            self.skill_systems[bot_name] = self.skill_registry.get(bot)
         logging.info("🎓 Skill development system initialized")
 
     def update_bot_skills(self):
         """Update bot skills based on recent activities"""
         logging.info("🎓 Updating bot skills...")
-        for bot_name, skill_system in self.skill_systems.items():
+        self.skill_registry.apply_practice()
+        for bot_name, skill_system in self._acting(self.skill_systems):
             try:
                 # Determine activity type based on recent behavior
                 activity_type = self._determine_activity_type(bot_name)
@@ -806,6 +641,13 @@ class BotServerWithIRC:
             except Exception as e:
                 logging.error(f"❌ Skill update failed for {bot_name}: {e}")
 
+        try:
+            saved = self.skill_registry.flush()
+            if saved:
+                logging.info(f"🎓 Saved {saved} skill changes")
+        except Exception as e:
+            logging.error(f"❌ Skill save failed: {e}")
+
     def _initialize_knowledge_exchange(self):
         """Initialize knowledge exchange system"""
         from core.knowledge_exchange import KnowledgeExchange
@@ -905,19 +747,19 @@ class BotServerWithIRC:
             #if self.is_bot_on_irc(bot_id):
             #    continue
 
-            if cycle_number % 500 == 0 or cycle_number > 1000:
-                one_bot = self.cm._get_bot_by_id(bot_id)
+            bot = self.cm.get_bot(bot_id)
 
+            if bot is not None and (cycle_number % 500 == 0 or cycle_number > 1000):
                 now_time = datetime.now()
-                last_seen_from_home_time = one_bot[6]
+                last_seen_from_home_time = bot.last_seen_home
 
-                print(f"🤝🤝🤝 {one_bot[0]} : Time: {now_time}, Last Seen: {last_seen_from_home_time}🤝🤝🤝")
+                print(f"🤝🤝🤝 {bot_id} : Time: {now_time}, Last Seen: {last_seen_from_home_time}🤝🤝🤝")
                 if last_seen_from_home_time == None or (now_time - last_seen_from_home_time) > timedelta(days=10):
                     must_return_home = True
                 else:
                     must_return_home = False
-                home_x = one_bot[4]
-                home_y = one_bot[5]
+                home_x = bot.home_x
+                home_y = bot.home_y
             else:
                 home_x = 0
                 home_y = 0
@@ -938,31 +780,25 @@ class BotServerWithIRC:
                 try:
                     if(new_loc['type'] != ''):
                         VirtualMap._store_bot_location_in_db(self, bot_id, traveler.x, traveler.y, new_loc['type'])
-                        for bot_name, bot in self.cm.bots.items():
-                            if bot.bot_id == bot_id:
-
-                                #from_loc = self.map.grid[traveler.x][traveler.y]
-                                #logging.info(f"from_y is: {repr(from_x)}")
-                                #logging.info(f"Type: {type(from_x)}")
-                                #logging.info(f"Length if sequence: {len(from_x) if hasattr(from_x, '__len__') else 'N/A'}")
-                                #logging.info(f"Dir: {dir(from_x) if not isinstance(from_x, (int, float, str)) else 'simple type'}")
-
-                                self._record_move_history(
-                                    bot_id, 
-                                    old_loc['x'], old_loc['y'], new_x, new_y,
-                                    old_loc['type'], new_loc['type']
-                                )
-
-                                if one_bot[0] == bot_id and one_bot[4] == new_x and one_bot[5] == new_y:
-                                    print(f"🤝🤝🤝 One Bot has returned Home ({one_bot[2]}): id: {bot_id} Has Returned Home !🤝🤝🤝")
-                                    traveler.bot_sweet_home(bot_id)
-
-                                if hasattr(bot, '_add_to_memory'):
-                                    bot._add_to_memory(f"Traveled from {old_loc['type']} to {new_loc['type']}",'map_travel')
-                                    # Check if location affects IRC curiosity
-                                    self._update_irc_curiosity(bot, new_loc)
-                        
-                                traveler.update_one_bot_energy(bot.bot_id)
+                        if bot is not None:
+                            self._record_move_history(
+                                bot_id, 
+                                old_loc['x'], old_loc['y'], new_x, new_y,
+                                old_loc['type'], new_loc['type']
+                            )
+
+                            if bot.home_x == new_x and bot.home_y == new_y:
+                                print(f"🤝🤝🤝 One Bot has returned Home ({bot.fullname}): id: {bot_id} Has Returned Home !🤝🤝🤝")
+                                self.cm.mark_home(bot_id)
+
+                            self.events.publish(BotMoved(
+                                bot_id, old_loc['x'], old_loc['y'], new_x, new_y,
+                                old_loc['type'], new_loc['type'], 'walk'
+                            ))
+                            # Check if location affects IRC curiosity
+                            self._update_irc_curiosity(bot, new_loc)
+                    
+                            traveler.update_one_bot_energy(bot.bot_id)
 
                 except Exception as e:
                     logging.error(f"❌ Store Bot Location OR Add to bot's memory failed (update_bot_travels): {e}")
@@ -1066,22 +902,12 @@ class BotServerWithIRC:
         except Exception as e:
             logging.error(f"❌ Store bot interactions failed (_create_bot_interaction): {e}")
                 
-        # Log interaction for each bot
+        # One event for the meeting; the memory journal, goals and skills pick it up
+        self.events.publish(BotsMet(tuple(bot_ids), x, y, location_type, interaction_text))
+
         for bot_id in bot_ids:
             traveler = self.travelers.get(bot_id)
             if traveler and traveler.bot:
-                # Create memory entry
-                other_bots = [str(b) for b in bot_ids if b != bot_id]
-                memory_text = f"{interaction_text} with bots {', '.join(other_bots)}"
-                
-                try:
-                    for bot_name, bot in self.cm.bots.items():
-                        if bot.bot_id == bot_id:
-                            if hasattr(bot, '_add_to_memory'):
-                                bot._add_to_memory(memory_text, 'bot_interaction')
-                except Exception as e:
-                    logging.error(f"❌ Add to bot's memory failed (_create_bot_interaction): {e}")
-                
                 # Update interaction cooldown
                 traveler.last_interaction_time = current_time
                 
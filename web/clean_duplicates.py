@@ -1,50 +1,25 @@
-import sqlite3
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cycle_metrics import CycleMetricsStore
 
 def clean_duplicate_cycles():
-    db_path = 'data/bot_world.db'
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    """Legacy cleanup; new databases enforce unique cycles via CycleMetricsStore"""
     print("🧹 Cleaning duplicate cycles...")
-    
-    # 1. Keep only the FIRST record of each cycle
-    cursor.execute('''
-        DELETE FROM cycle_records 
-        WHERE id NOT IN (
-            SELECT MIN(id) 
-            FROM cycle_records 
-            GROUP BY cycle_number
-        )
-    ''')
-    
-    deleted_cycles = cursor.rowcount
-    print(f"✅ Deleted {deleted_cycles} duplicate cycle records")
-    
-    # 2. Keep only the FIRST bot stats of each (cycle, bot) pair
-    cursor.execute('''
-        DELETE FROM cycle_bot_stats 
-        WHERE id NOT IN (
-            SELECT MIN(id) 
-            FROM cycle_bot_stats 
-            GROUP BY cycle_number, bot_id
-        )
-    ''')
-    
-    deleted_stats = cursor.rowcount
-    print(f"✅ Deleted {deleted_stats} duplicate bot stats")
-    
-    conn.commit()
-    
-    # 3. Verify cleanup
-    cursor.execute("SELECT COUNT(*) FROM cycle_records")
-    remaining = cursor.fetchone()[0]
-    print(f"📊 Remaining unique cycles: {remaining}")
-    
-    cursor.execute("SELECT MAX(cycle_number) FROM cycle_records")
-    max_cycle = cursor.fetchone()[0]
-    print(f"📊 Max cycle number: {max_cycle}")
-    
-    conn.close()
+
+    # Opening the store creates the unique keys, deduplicating first if needed
+    store = CycleMetricsStore('data/bot_world.db')
+    deleted = store.deduplicate()
+
+    print(f"✅ Deleted {deleted['cycle_records']} duplicate cycle records")
+    print(f"✅ Deleted {deleted['cycle_bot_stats']} duplicate bot stats")
+
+    # Verify cleanup
+    meta = store.get_meta()
+    print(f"📊 Remaining unique cycles: {meta.get('total_cycles', 0)}")
+    print(f"📊 Max cycle number: {meta.get('latest_cycle', 0)}")
 
 if __name__ == '__main__':
-    clean_duplicate_cycles()
\ No newline at end of file
+    clean_duplicate_cycles()
@@ -12,6 +12,30 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 # Now you can import config from project_root/config.py
 from config import map_conf
+from core.currency import CurrencySystem
+from core.cycle_metrics import CycleMetricsStore
+from core.fact_store import FactStore
+
+_currency_system = None
+_metrics_store = None
+
+def get_currency_system():
+    """Shared CurrencySystem so airport fees go through the ledger"""
+    global _currency_system
+    if _currency_system is None:
+        _currency_system = CurrencySystem('data/bot_world.db')
+    return _currency_system
+
+def get_metrics_store():
+    """Shared cycle metrics reader (latest-cycle pointer, rollups)"""
+    global _metrics_store
+    if _metrics_store is None:
+        _metrics_store = CycleMetricsStore('data/bot_world.db')
+    return _metrics_store
+
+def get_fact_store():
+    """Shared fact interning (knowledge rows reference fact ids)"""
+    return FactStore.for_database('data/bot_world.db')
 
 # 🆕 Disable caching for development
 @app.after_request
@@ -35,24 +59,22 @@ def get_db_connection():
 @app.route('/api/overview')
 def get_overview():
     """Get system overview data"""
+    metrics = get_metrics_store()
+    meta = metrics.get_meta()
+    latest_cycle = metrics.get_cycle(meta.get('latest_cycle', 0))
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT cycle_number, total_currency, total_transactions, timestamp FROM cycle_records ORDER BY cycle_number DESC LIMIT 1')
-    latest_cycle = cursor.fetchone()
-    
     cursor.execute("SELECT COUNT(*) as bot_count FROM bots WHERE is_active = 1")
     bot_count = cursor.fetchone()['bot_count']
     
-    cursor.execute("SELECT COUNT(*) as total_cycles FROM cycle_records")
-    total_cycles = cursor.fetchone()['total_cycles']
-    
     conn.close()
     
     return jsonify({
-        'latest_cycle': dict(latest_cycle) if latest_cycle else None,
+        'latest_cycle': latest_cycle,
         'bot_count': bot_count,
-        'total_cycles': total_cycles
+        'total_cycles': meta.get('total_cycles', 0)
     })
 
 @app.route('/api/debug/raw_cycles')
@@ -80,31 +102,29 @@ def debug_raw_cycles():
 @app.route('/api/recent_cycles')
 def get_recent_cycles():
     """Get recent cycle data for charts"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT cycle_number, total_currency, total_transactions, timestamp FROM cycle_records ORDER BY cycle_number DESC LIMIT 50')
-    cycles = [dict(row) for row in cursor.fetchall()]
-    
-    conn.close()
-    return jsonify(cycles)
+    return jsonify(get_metrics_store().recent_cycles(50))
+
+@app.route('/api/cycle_series')
+def get_cycle_series():
+    """Economy series as columns; ?resolution=1|10|100&limit=N for long-range charts"""
+    resolution = request.args.get('resolution', 1, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    return jsonify(get_metrics_store().series(resolution, limit))
+
+@app.route('/api/bot/<int:bot_id>/series')
+def get_bot_series(bot_id):
+    """One bot's needs and balance as columns; ?resolution=1|10|100&limit=N"""
+    resolution = request.args.get('resolution', 1, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    return jsonify(get_metrics_store().bot_series(bot_id, resolution, limit))
 
 @app.route('/api/current_bot_status')
 def get_current_bot_status():
     """Get current status of all bots"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT MAX(cycle_number) as max_cycle FROM cycle_bot_stats')
-    max_cycle = cursor.fetchone()['max_cycle']
-    
-    if max_cycle:
-        cursor.execute('SELECT bot_name, energy, social, curiosity, balance FROM cycle_bot_stats WHERE cycle_number = ?', (max_cycle,))
-        bot_status = [dict(row) for row in cursor.fetchall()]
-    else:
-        bot_status = []
-    
-    conn.close()
+    bot_status = [
+        {key: row[key] for key in ('bot_name', 'energy', 'social', 'curiosity', 'balance')}
+        for row in get_metrics_store().bot_stats()
+    ]
     return jsonify(bot_status)
 
 @app.route('/api/bot_personalities')
@@ -149,12 +169,13 @@ def get_cycles():
 
 @app.route('/api/bot_stats')
 def get_bot_stats():
+    latest_cycle = get_metrics_store().latest_cycle(refresh=True)
     conn = sqlite3.connect('data/bot_world.db')
     cursor = conn.cursor()
     cursor.execute('''
         SELECT * FROM cycle_bot_stats 
-        WHERE cycle_number = (SELECT MAX(cycle_number) FROM cycle_bot_stats)
-    ''')
+        WHERE cycle_number = ?
+    ''', (latest_cycle,))
     stats = cursor.fetchall()
     conn.close()
     return jsonify(stats)
@@ -179,14 +200,16 @@ def get_all_bots():
 @app.route('/api/bot/<int:bot_id>/knowledge')
 def get_bot_knowledge(bot_id):
     """Get all knowledge for a specific bot"""
+    get_fact_store()
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
-        SELECT id, fact, source, learned_at, confidence 
-        FROM knowledge 
-        WHERE bot_id = ?
-        ORDER BY learned_at DESC
+        SELECT k.id, k.fact_id, f.text AS fact, k.source, k.learned_at, k.confidence 
+        FROM knowledge k
+        JOIN facts f ON f.id = k.fact_id
+        WHERE k.bot_id = ?
+        ORDER BY k.learned_at DESC
     ''', (bot_id,))
     knowledge = [dict(row) for row in cursor.fetchall()]
     
@@ -207,16 +230,19 @@ def add_bot_knowledge(bot_id):
     cursor = conn.cursor()
     
     try:
+        fact_id = get_fact_store().intern(fact)
         cursor.execute('''
-            INSERT INTO knowledge (bot_id, fact, source, confidence)
+            INSERT OR IGNORE INTO knowledge (bot_id, fact_id, source, confidence)
             VALUES (?, ?, ?, ?)
-        ''', (bot_id, fact, source, 1.0))
-        
+        ''', (bot_id, fact_id, source, 1.0))
+        added = cursor.rowcount > 0
         conn.commit()
-        knowledge_id = cursor.lastrowid
+        
+        cursor.execute('SELECT id FROM knowledge WHERE bot_id = ? AND fact_id = ?', (bot_id, fact_id))
+        knowledge_id = cursor.fetchone()[0]
         conn.close()
         
-        return jsonify({'success': True, 'id': knowledge_id})
+        return jsonify({'success': True, 'id': knowledge_id, 'fact_id': fact_id, 'already_known': not added})
     except Exception as e:
         conn.close()
         return jsonify({'error': str(e)}), 500
@@ -238,6 +264,43 @@ def delete_bot_knowledge(bot_id, knowledge_id):
         conn.close()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/bot/<int:bot_id>/facts/<int:fact_id>', methods=['DELETE'])
+def delete_bot_fact(bot_id, fact_id):
+    """Make a bot forget a fact by its id"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute('DELETE FROM knowledge WHERE bot_id = ? AND fact_id = ?', (bot_id, fact_id))
+        conn.commit()
+        deleted = cursor.rowcount > 0
+        conn.close()
+        
+        return jsonify({'success': True, 'deleted': deleted})
+    except Exception as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/facts/<int:fact_id>')
+def get_fact(fact_id):
+    """A fact and the bots that know it"""
+    get_fact_store()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id, text, hash, created_at FROM facts WHERE id = ?', (fact_id,))
+    fact = cursor.fetchone()
+    if fact is None:
+        conn.close()
+        return jsonify({'error': 'Fact not found'}), 404
+    
+    cursor.execute('SELECT bot_id FROM knowledge WHERE fact_id = ? ORDER BY bot_id', (fact_id,))
+    result = dict(fact)
+    result['known_by'] = [row[0] for row in cursor.fetchall()]
+    
+    conn.close()
+    return jsonify(result)
+
 @app.route('/api/bot/<int:bot_id>/needs', methods=['PUT'])
 def update_bot_needs(bot_id):
     """Update bot needs"""
@@ -352,17 +415,12 @@ def get_weather_history():
 @app.route('/api/debug/status')
 def debug_status():
     """Debug endpoint to see what data is available"""
+    # Cycle tables, from the metrics pointer and counters
+    meta = get_metrics_store().get_meta()
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Check cycle_records
-    cursor.execute("SELECT MAX(cycle_number) as latest_cycle, COUNT(*) as total FROM cycle_records")
-    cycle_info = cursor.fetchone()
-    
-    # Check cycle_bot_stats  
-    cursor.execute("SELECT MAX(cycle_number) as latest_bot_cycle, COUNT(*) as total FROM cycle_bot_stats")
-    bot_stats_info = cursor.fetchone()
-    
     # Check if bot server is running (simplified)
     cursor.execute("SELECT COUNT(*) as active_bots FROM bots WHERE is_active = 1")
     active_bots = cursor.fetchone()
@@ -372,12 +430,12 @@ def debug_status():
     return jsonify({
         'timestamp': datetime.now().isoformat(),
         'cycle_records': {
-            'latest_cycle': cycle_info['latest_cycle'],
-            'total_records': cycle_info['total']
+            'latest_cycle': meta.get('latest_cycle'),
+            'total_records': meta.get('total_cycles')
         },
         'cycle_bot_stats': {
-            'latest_cycle': bot_stats_info['latest_bot_cycle'],
-            'total_records': bot_stats_info['total']
+            'latest_cycle': meta.get('latest_cycle'),
+            'total_records': meta.get('total_bot_rows')
         },
         'active_bots': active_bots['active_bots'],
         'flask_server_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -386,6 +444,7 @@ def debug_status():
 @app.route('/api/debug/latest_data')
 def debug_latest_data():
     """Show latest data from all tables"""
+    latest_cycle = get_metrics_store().latest_cycle(refresh=True)
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -395,9 +454,9 @@ def debug_latest_data():
                COUNT(cbs.id) as bot_count
         FROM cycle_records cr
         LEFT JOIN cycle_bot_stats cbs ON cr.cycle_number = cbs.cycle_number
-        WHERE cr.cycle_number = (SELECT MAX(cycle_number) FROM cycle_records)
+        WHERE cr.cycle_number = ?
         GROUP BY cr.cycle_number
-    ''')
+    ''', (latest_cycle,))
     
     latest_data = cursor.fetchone()
     conn.close()
@@ -506,6 +565,43 @@ def get_recent_interactions():
     
     return jsonify(interactions)
 
+@app.route('/api/events')
+def get_recent_events():
+    """Typed events written by the server's event stream, oldest first
+
+    Without ?since= the latest events are returned; with ?since=<id> the
+    next events after that id, so polling pages forward without gaps.
+    """
+    since = request.args.get('since', type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if since is None:
+            cursor.execute('''
+                SELECT id, event, bot_ids, payload, created_at FROM event_stream
+                ORDER BY id DESC LIMIT ?
+            ''', (limit,))
+            rows = cursor.fetchall()[::-1]
+        else:
+            cursor.execute('''
+                SELECT id, event, bot_ids, payload, created_at FROM event_stream
+                WHERE id > ? ORDER BY id ASC LIMIT ?
+            ''', (since, limit))
+            rows = cursor.fetchall()
+    except sqlite3.OperationalError:
+        rows = []  # Server has not created the stream yet
+    conn.close()
+
+    events = [{
+        'id': row['id'],
+        'event': row['event'],
+        'bot_ids': [int(bot_id) for bot_id in row['bot_ids'].split(',') if bot_id] if row['bot_ids'] else [],
+        'data': json.loads(row['payload']) if row['payload'] else {},
+        'created_at': row['created_at']
+    } for row in rows]
+    return jsonify(events)
+
 @app.route('/map')
 def map_page():
     """Main map visualization page"""
@@ -700,10 +796,6 @@ def use_airport(bot_id, airport_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get bot money
-    cursor.execute('SELECT balance FROM bot_currency WHERE bot_id = ?', (bot_id,))
-    bot_money = cursor.fetchone()[0]
-    
     # Get airport fee
     cursor.execute('SELECT fee, queue FROM airports WHERE id = ?', (airport_id,))
     airport = cursor.fetchone()
@@ -715,23 +807,18 @@ def use_airport(bot_id, airport_id):
     fee, queue_json = airport
     queue = json.loads(queue_json) if queue_json else []
     
-    if bot_money < fee:
-        conn.close()
-        return jsonify({'error': 'Insufficient funds'}), 400
-    
     # Add bot to queue
     if bot_id not in queue:
+        # Deduct money from bot (refused if the fee would overdraw it)
+        if not get_currency_system().charge_fee(bot_id, fee, f"airport_{airport_id}"):
+            conn.close()
+            return jsonify({'error': 'Insufficient funds'}), 400
+
         queue.append(bot_id)
         cursor.execute(
             'UPDATE airports SET queue = ? WHERE id = ?',
             (json.dumps(queue), airport_id)
         )
-        
-        # Deduct money from bot
-        cursor.execute(
-            'UPDATE bot_currency SET balance = balance - ? WHERE bot_id = ?',
-            (fee, bot_id)
-        )
     
     conn.commit()
     conn.close()